@@ -0,0 +1,223 @@
+"""
+Vectorized Element Verification and Batch Health Reports
+SPCE 5025 - Fundamentals of Astronautics
+
+Batch version of `hw1_solution.verify_elements`. The same four physical
+checks, computed column-wise for whole arrays of states and elements:
+
+    radius_error_m          |r| vs the trajectory equation p/(1 + e cos nu)
+    velocity_error_m_s      |v| vs vis-viva sqrt(mu (2/r - 1/a))
+    angular_momentum_error  |r x v| vs sqrt(mu a (1 - e^2))
+    apse_sum_error_m        r_p + r_a vs 2a
+
+`health_report` turns the residual arrays into a summary — how many rows are
+over tolerance, which rows are worst, and the residual percentiles — so every
+conversion can be checked instead of spot-checking a sample.
+"""
+
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Union
+
+from batch_conversion import SMALL
+from element_store import ElementStore
+
+CHECKS = ('radius_error_m', 'velocity_error_m_s',
+          'angular_momentum_error', 'apse_sum_error_m')
+
+# Absolute tolerances, in each check's own units. Round-off for a catalog
+# out to GEO distances is ~1e-8 m and ~1e-12 m/s, so these leave plenty of
+# room for ill-conditioned (near-parabolic) rows before flagging anything.
+DEFAULT_TOLERANCES = {
+    'radius_error_m': 1e-3,
+    'velocity_error_m_s': 1e-6,
+    'angular_momentum_error': 1e-2,
+    'apse_sum_error_m': 1e-3,
+}
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+# ============================================================================
+# RESIDUALS
+# ============================================================================
+
+def verify_elements_batch(r_vecs: np.ndarray, v_vecs: np.ndarray,
+                          elements: Union[ElementStore, Sequence],
+                          mu: float) -> Dict[str, np.ndarray]:
+    """
+    Residuals of the four `verify_elements` checks for N states at once.
+
+    Bound orbits get the scalar function's numbers (to round-off — the norms
+    are summed in a different order). Two cases the scalar version can't
+    handle are given a meaningful check instead of NaN:
+
+    - circular equatorial rows have nu = NaN, but with e ~ 0 the radius
+      doesn't depend on nu, so e*cos(nu) is taken as 0 there
+    - unbound rows have r_apoapsis = inf, so the apse check becomes
+      r_p vs a(1 - e), which holds for hyperbolas too
+
+    Parameters
+    ----------
+    r_vecs, v_vecs : np.ndarray
+        Original position [m] and velocity [m/s] vectors, shape (N, 3)
+    elements : ElementStore or list of KeplerianElements
+        Computed elements, in the same order
+    mu : float
+        Gravitational parameter [m^3/s^2]
+
+    Returns
+    -------
+    dict
+        One residual array of shape (N,) per name in CHECKS
+    """
+    if not isinstance(elements, ElementStore):
+        elements = ElementStore.from_elements(elements)
+    r_vecs = np.atleast_2d(np.asarray(r_vecs, dtype=np.float64))
+    v_vecs = np.atleast_2d(np.asarray(v_vecs, dtype=np.float64))
+    if len(r_vecs) != len(elements):
+        raise ValueError(f"{len(r_vecs)} states but {len(elements)} element rows")
+
+    a, e, nu = elements.a, elements.e, elements.nu
+    r_mag = np.sqrt(np.einsum('ij,ij->i', r_vecs, r_vecs))
+    v_mag = np.sqrt(np.einsum('ij,ij->i', v_vecs, v_vecs))
+    h_mag = np.linalg.norm(np.cross(r_vecs, v_vecs), axis=1)
+    one_minus_e2 = 1 - e**2
+
+    with np.errstate(invalid='ignore'):
+        e_cos_nu = np.where(e > SMALL, e * np.cos(nu), 0.0)
+        r_from_elements = a * one_minus_e2 / (1 + e_cos_nu)
+        v_expected = np.sqrt(mu * (2.0/r_mag - 1.0/a))
+        h_expected = np.sqrt(mu * a * one_minus_e2)
+
+        bound = np.isfinite(elements.r_apoapsis)
+        apse_error = np.where(bound,
+                              np.abs(elements.r_periapsis + elements.r_apoapsis - 2*a),
+                              np.abs(elements.r_periapsis - a*(1 - e)))
+
+    return {
+        'radius_error_m': np.abs(r_mag - r_from_elements),
+        'velocity_error_m_s': np.abs(v_mag - v_expected),
+        'angular_momentum_error': np.abs(h_mag - h_expected),
+        'apse_sum_error_m': apse_error,
+    }
+
+
+# ============================================================================
+# HEALTH REPORT
+# ============================================================================
+
+@dataclass
+class CheckSummary:
+    """How one check did across a batch."""
+    name: str
+    tolerance: float
+    count: int              # rows checked
+    over_tolerance: int     # rows with residual > tolerance (NaN/inf count too)
+    non_finite: int         # rows whose residual is NaN or inf
+    worst_rows: np.ndarray  # row indices, worst first
+    worst_values: np.ndarray
+    percentiles: Dict[float, float]  # over the finite residuals
+    max: float
+
+    @property
+    def passed(self) -> bool:
+        return self.over_tolerance == 0
+
+
+@dataclass
+class HealthReport:
+    """Residual arrays plus a `CheckSummary` per check."""
+    residuals: Dict[str, np.ndarray]
+    checks: Dict[str, CheckSummary] = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        return all(summary.passed for summary in self.checks.values())
+
+    def failing_mask(self) -> np.ndarray:
+        """True for every row that fails at least one check."""
+        mask = np.zeros(len(next(iter(self.residuals.values()))), dtype=bool)
+        for name, summary in self.checks.items():
+            mask |= ~(self.residuals[name] <= summary.tolerance)
+        return mask
+
+    def format(self) -> str:
+        """Plain-text table, handy for logs."""
+        lines = [f"{'check':<24} {'tol':>9} {'over':>8} {'nonfin':>7} "
+                 + ' '.join(f"{'p' + format(p, 'g'):>10}" for p in
+                            next(iter(self.checks.values())).percentiles)
+                 + f" {'max':>10}  worst rows"]
+        for s in self.checks.values():
+            pct = ' '.join(f"{value:10.3e}" for value in s.percentiles.values())
+            worst = ', '.join(str(i) for i in s.worst_rows[:5])
+            lines.append(f"{s.name:<24} {s.tolerance:9.1e} {s.over_tolerance:>8} "
+                         f"{s.non_finite:>7} {pct} {s.max:10.3e}  {worst}")
+        return '\n'.join(lines)
+
+
+def summarize_check(name: str, residual: np.ndarray, tolerance: float,
+                    worst: int = 10,
+                    percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> CheckSummary:
+    """Counts, worst offenders and percentiles for one residual array."""
+    finite = np.isfinite(residual)
+    # NaN/inf sort as the worst possible rows
+    ranked = np.where(finite, residual, np.inf)
+    k = min(worst, len(residual))
+    if k:
+        top = np.argpartition(-ranked, k - 1)[:k]
+        top = top[np.argsort(-ranked[top], kind='stable')]
+    else:
+        top = np.empty(0, dtype=np.intp)
+
+    finite_values = residual[finite]
+    if finite_values.size:
+        values = np.percentile(finite_values, percentiles)
+        largest = float(finite_values.max())
+    else:
+        values = np.full(len(percentiles), np.nan)
+        largest = np.nan
+
+    return CheckSummary(
+        name=name,
+        tolerance=tolerance,
+        count=len(residual),
+        over_tolerance=int(np.count_nonzero(~(residual <= tolerance))),
+        non_finite=int(np.count_nonzero(~finite)),
+        worst_rows=top,
+        worst_values=residual[top],
+        percentiles=dict(zip(percentiles, values.tolist())),
+        max=largest,
+    )
+
+
+def health_report(r_vecs: np.ndarray, v_vecs: np.ndarray,
+                  elements: Union[ElementStore, Sequence], mu: float,
+                  tolerances: Optional[Dict[str, float]] = None, worst: int = 10,
+                  percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> HealthReport:
+    """
+    Verify a whole batch and summarize it.
+
+    Parameters
+    ----------
+    r_vecs, v_vecs, elements, mu
+        As for `verify_elements_batch`
+    tolerances : dict, optional
+        Overrides for DEFAULT_TOLERANCES, by check name
+    worst : int
+        How many worst-offending rows to keep per check
+    percentiles : sequence of float
+        Residual percentiles to report
+
+    Returns
+    -------
+    HealthReport
+        `.passed`, `.checks[name].over_tolerance`, `.format()`...
+    """
+    tol = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+    residuals = verify_elements_batch(r_vecs, v_vecs, elements, mu)
+    report = HealthReport(residuals)
+    for name in CHECKS:
+        report.checks[name] = summarize_check(name, residuals[name], tol[name],
+                                              worst, percentiles)
+    return report
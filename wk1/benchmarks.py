@@ -0,0 +1,534 @@
+"""
+Throughput Benchmarks for the Orbit Conversion Code
+SPCE 5025 - Fundamentals of Astronautics
+
+Times the scalar hot paths (`state_to_keplerian`, `keplerian_to_position`,
+`generate_orbit_points`, per-object propagation) against their batch
+counterparts on seeded orbit populations, so we can tell whether a change
+actually made things faster. Each (case, path, N) gets a throughput and a
+peak-memory number, and a run can be saved as JSON and diffed against an
+earlier one:
+
+    python benchmarks.py --output before.json
+    ... change something ...
+    python benchmarks.py --output after.json --compare before.json
+
+`--round-trip` and `--scaling` add the older round-trip and process-pool
+scaling tables, and `--import-budget` checks cold-start import times (exit
+status 1 if a module is over budget or drags in matplotlib).
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hw1_solution import state_to_keplerian
+from batch_conversion import state_to_keplerian_batch
+from element_store import ElementStore
+from orbit_geometry import keplerian_to_state, sample_orbits
+from propagation import propagate, propagate_chunks
+from parallel_conversion import SharedArray, available_cores, convert_shared
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+R_EARTH = 6.371e6  # Earth's mean radius [m]
+# Relative round-trip tolerance; random_elements never draws equatorial rows,
+# which keplerian_to_state can't reproduce (see its docstring)
+ROUND_TRIP_TOL = 1e-9
+
+
+# ============================================================================
+# TEST POPULATIONS
+# ============================================================================
+
+def random_elements(n: int, seed: int = 0) -> ElementStore:
+    """
+    Seeded population of bound Earth orbits (LEO out to beyond GEO).
+
+    Semi-major axes are uniform in 6,700-45,000 km, eccentricity is capped so
+    periapsis stays above the surface, and the angles are uniform.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(6.7e6, 4.5e7, n)
+    e = rng.uniform(0.0, 1.0, n) * np.clip(1.0 - (R_EARTH + 1e5) / a, 0.0, 0.9)
+    columns = {
+        'a': a, 'e': e,
+        'inc': rng.uniform(0.0, np.pi, n),
+        'raan': rng.uniform(0.0, 2*np.pi, n),
+        'omega': rng.uniform(0.0, 2*np.pi, n),
+        'nu': rng.uniform(0.0, 2*np.pi, n),
+        'period': 2*np.pi*np.sqrt(a**3 / MU_EARTH),
+        'r_periapsis': a * (1 - e),
+        'r_apoapsis': a * (1 + e),
+    }
+    return ElementStore.from_columns(columns)
+
+
+def random_states(n: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """(N, 3) position and velocity arrays for `random_elements(n, seed)`."""
+    return keplerian_to_state(random_elements(n, seed), MU_EARTH)
+
+
+# Orbit regimes as (a [m], e, inc [rad]) ranges. The last three are the edge
+# cases `state_to_keplerian` branches on: exactly circular, exactly
+# equatorial (prograde and retrograde), and both at once.
+REGIMES = {
+    'LEO': ((6.58e6, 8.37e6), (0.0, 0.02), (0.0, np.pi)),
+    'MEO': ((2.0e7, 3.0e7), (0.0, 0.05), (0.85, 1.1)),
+    'GEO': ((4.2114e7, 4.2214e7), (0.0, 1e-3), (0.0, 0.1)),
+    'HEO': ((2.4e7, 4.5e7), (0.6, 0.74), (1.0, 1.2)),
+    'circular': ((6.6e6, 4.5e7), (0.0, 0.0), (0.0, np.pi)),
+    'equatorial': ((6.6e6, 4.5e7), (0.0, 0.3), (0.0, 0.0)),
+    'circular_equatorial': ((6.6e6, 4.5e7), (0.0, 0.0), (0.0, 0.0)),
+}
+
+# Fraction of each regime in the default population
+DEFAULT_MIX = {'LEO': 0.45, 'MEO': 0.15, 'GEO': 0.1, 'HEO': 0.1,
+               'circular': 0.07, 'equatorial': 0.07, 'circular_equatorial': 0.06}
+
+
+def orbit_population(n: int, seed: int = 0,
+                     mix: Dict[str, float] = DEFAULT_MIX) -> ElementStore:
+    """
+    Seeded LEO/MEO/GEO/HEO mix with the circular and equatorial edge cases.
+
+    Rows are shuffled so the regimes are interleaved, the way a real catalog
+    would be. Half of the equatorial rows are retrograde (inc = pi), and
+    periapsis always stays at least 200 km up.
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.array(list(mix.values()), dtype=np.float64)
+    counts = rng.multinomial(n, weights / weights.sum())
+
+    blocks = []
+    for (name, count) in zip(mix, counts):
+        (a_lo, a_hi), (e_lo, e_hi), (i_lo, i_hi) = REGIMES[name]
+        a = rng.uniform(a_lo, a_hi, count)
+        e = np.minimum(rng.uniform(e_lo, e_hi, count), 1.0 - (R_EARTH + 2e5) / a)
+        inc = rng.uniform(i_lo, i_hi, count)
+        if i_hi == 0.0:
+            inc[rng.random(count) < 0.5] = np.pi
+        blocks.append((a, np.maximum(e, 0.0), inc))
+
+    a, e, inc = (np.concatenate(x)[rng.permutation(n)] for x in zip(*blocks))
+    columns = {
+        'a': a, 'e': e, 'inc': inc,
+        'raan': rng.uniform(0.0, 2*np.pi, n),
+        'omega': rng.uniform(0.0, 2*np.pi, n),
+        'nu': rng.uniform(0.0, 2*np.pi, n),
+        'period': 2*np.pi*np.sqrt(a**3 / MU_EARTH),
+        'r_periapsis': a * (1 - e),
+        'r_apoapsis': a * (1 + e),
+    }
+    return ElementStore.from_columns(columns)
+
+
+# ============================================================================
+# TIMING HELPERS
+# ============================================================================
+
+def best_time(func: Callable[[], object], repeats: int = 3) -> float:
+    """Best-of-N wall time for func() [s]."""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """Peak bytes allocated (Python objects and NumPy buffers) while func() runs."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def scalar_round_trip(r: np.ndarray, v: np.ndarray) -> None:
+    """Scalar reference: state_to_keplerian per state, then back to a state."""
+    for r_i, v_i in zip(r, v):
+        keplerian_to_state(state_to_keplerian(r_i, v_i, MU_EARTH), MU_EARTH)
+
+
+def batch_round_trip(r: np.ndarray, v: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized path: one batch conversion each way."""
+    return keplerian_to_state(state_to_keplerian_batch(r, v, MU_EARTH), MU_EARTH)
+
+
+def round_trip_error(r: np.ndarray, v: np.ndarray) -> float:
+    """Worst relative position/velocity error over one batch round trip."""
+    r2, v2 = batch_round_trip(r, v)
+    r_err = np.linalg.norm(r2 - r, axis=1) / np.linalg.norm(r, axis=1)
+    v_err = np.linalg.norm(v2 - v, axis=1) / np.linalg.norm(v, axis=1)
+    return float(max(r_err.max(), v_err.max()))
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_round_trip(sizes: List[int] = (100, 10_000, 1_000_000),
+                     scalar_limit: int = 10_000) -> List[Dict[str, float]]:
+    """
+    State -> elements -> state throughput for the scalar and batch paths.
+
+    The scalar path is only timed up to `scalar_limit` states (it's linear,
+    so bigger N just takes longer without telling us anything new). Each
+    size also checks the states actually come back: a fast round trip that
+    returns the wrong orbit fails with an AssertionError instead of timing.
+    """
+    results = []
+    for n in sizes:
+        r, v = random_states(n)
+        error = round_trip_error(r, v)
+        if not error <= ROUND_TRIP_TOL:
+            raise AssertionError(f"round trip off by {error:.3g} (relative) at N={n}")
+        row = {'n': n, 'max_rel_error': error,
+               'batch_states_per_s': n / best_time(lambda: batch_round_trip(r, v))}
+        if n <= scalar_limit:
+            row['scalar_states_per_s'] = n / best_time(lambda: scalar_round_trip(r, v), repeats=1)
+        results.append(row)
+    return results
+
+
+def bench_parallel_scaling(n: int = 10_000_000, process_counts: List[int] = None,
+                           repeats: int = 1) -> List[Dict[str, float]]:
+    """
+    Process-pool conversion throughput versus worker count.
+
+    The states are generated straight into shared memory and only
+    `convert_shared` is timed, so this measures how the conversion itself
+    scales (a 1e8 job needs ~12 GB of /dev/shm for input plus output).
+    Worker counts default to powers of two up to the available cores.
+    """
+    if process_counts is None:
+        cores = available_cores()
+        process_counts = sorted({min(2**k, cores) for k in range(cores.bit_length() + 1)})
+
+    results = []
+    with SharedArray.create((n, 6)) as states, SharedArray.create((9, n)) as out:
+        # Fill in slices so generating the population never needs 2x the memory
+        for start in range(0, n, 1_000_000):
+            stop = min(start + 1_000_000, n)
+            r, v = random_states(stop - start, seed=start)
+            states.array[start:stop, :3] = r
+            states.array[start:stop, 3:] = v
+        out.array[:] = 0.0   # touch the pages so the first run isn't penalized
+
+        for p in process_counts:
+            seconds = best_time(lambda: convert_shared(states, out, MU_EARTH, processes=p),
+                                repeats=repeats)
+            results.append({'processes': p, 'seconds': seconds, 'states_per_s': n / seconds})
+
+    base = results[0]['seconds'] * results[0]['processes']
+    for row in results:
+        row['speedup'] = base / row['seconds']
+        row['efficiency'] = row['speedup'] / row['processes']
+    return results
+
+
+# ============================================================================
+# BENCHMARK SUITE
+# ============================================================================
+# Each case takes a population and returns its scalar and batch callables.
+# The batch callables work through the population in BATCH_CHUNK-orbit
+# pieces wherever the output would otherwise be N x (many) points.
+
+ORBIT_POINTS = 360       # generate_orbit_points default
+PROPAGATION_EPOCHS = 16
+BATCH_CHUNK = 10_000
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _case_state_to_keplerian(elements: ElementStore):
+    r, v = keplerian_to_state(elements, MU_EARTH)
+    def scalar():
+        # The circular-equatorial rows hit a 0/0 for nu (NaN, by design)
+        with np.errstate(invalid='ignore'):
+            return [state_to_keplerian(r_i, v_i, MU_EARTH) for r_i, v_i in zip(r, v)]
+
+    batch = lambda: state_to_keplerian_batch(r, v, MU_EARTH)
+    return scalar, batch
+
+
+def _case_keplerian_to_position(elements: ElementStore):
+    from orbit_geometry import keplerian_to_position
+    rows = elements.to_elements()
+    scalar = lambda: [keplerian_to_position(el, el.nu) for el in rows]
+    batch = lambda: keplerian_to_state(elements, MU_EARTH)[0]
+    return scalar, batch
+
+
+def _case_generate_orbit_points(elements: ElementStore):
+    from orbit_geometry import generate_orbit_points
+    rows = elements.to_elements()
+    nu_values = np.linspace(0, 2*np.pi, ORBIT_POINTS)
+
+    def batch():
+        for start in range(0, len(elements), BATCH_CHUNK):
+            sample_orbits(elements[start:start + BATCH_CHUNK], nu_values)
+
+    scalar = lambda: [generate_orbit_points(el, ORBIT_POINTS) for el in rows]
+    return scalar, batch
+
+
+def _case_propagate(elements: ElementStore):
+    r, v = keplerian_to_state(elements, MU_EARTH)
+    times = np.linspace(0.0, 86400.0, PROPAGATION_EPOCHS)
+    scalar = lambda: [propagate(r[i:i+1], v[i:i+1], times, MU_EARTH) for i in range(len(r))]
+
+    def batch():
+        for _ in propagate_chunks(r, v, times, MU_EARTH, chunk_objects=BATCH_CHUNK):
+            pass
+
+    return scalar, batch
+
+
+# name -> (setup, largest N worth running the batch path at)
+CASES = {
+    'state_to_keplerian': (_case_state_to_keplerian, 10_000_000),
+    'keplerian_to_position': (_case_keplerian_to_position, 10_000_000),
+    'generate_orbit_points': (_case_generate_orbit_points, 1_000_000),
+    'propagate': (_case_propagate, 1_000_000),
+}
+
+
+def _measure(func: Callable[[], object], n: int, repeats: int) -> Dict[str, float]:
+    seconds = best_time(func, repeats)
+    return {'seconds': seconds, 'per_s': n / seconds, 'peak_bytes': peak_memory(func)}
+
+
+def run_suite(sizes: List[int] = DEFAULT_SIZES, cases: Optional[List[str]] = None,
+              scalar_limit: int = 10_000, seed: int = 0) -> dict:
+    """
+    Run every (case, path, N) combination and return machine-readable results.
+
+    The scalar path is only run up to `scalar_limit` (it's linear, so bigger N
+    just takes longer), and each case has its own batch cap (see CASES).
+    Small N get best-of-5 timings, N >= 1e6 (and scalar runs over 1e3) a
+    single run. Peak memory comes
+    from a separate `tracemalloc` run so tracing doesn't skew the timings.
+
+    Returns
+    -------
+    dict
+        {'meta': {...}, 'results': [{'case', 'path', 'n', 'seconds',
+        'per_s', 'peak_bytes'}, ...]}
+    """
+    cases = list(CASES) if cases is None else cases
+    results = []
+    for n in sizes:
+        elements = orbit_population(n, seed)
+        repeats = 5 if n <= 10_000 else 3 if n < 1_000_000 else 1
+        for name in cases:
+            setup, batch_limit = CASES[name]
+            if n > batch_limit:
+                continue
+            scalar, batch = setup(elements)
+            paths = [('batch', batch)]
+            if n <= scalar_limit:
+                paths.insert(0, ('scalar', scalar))
+            for path, func in paths:
+                row = {'case': name, 'path': path, 'n': n}
+                row.update(_measure(func, n, repeats if path == 'batch' or n <= 1_000 else 1))
+                results.append(row)
+        del elements
+
+    meta = {
+        'seed': seed,
+        'mix': DEFAULT_MIX,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare_results(old: dict, new: dict, threshold: float = 0.10) -> List[Dict]:
+    """
+    Throughput and peak-memory changes between two `run_suite` results.
+
+    Returns one row per (case, path, N) present in both runs, with the
+    relative change in each and a 'regression' flag when throughput dropped
+    or peak memory grew by more than `threshold`.
+    """
+    key = lambda row: (row['case'], row['path'], row['n'])
+    before = {key(row): row for row in old['results']}
+    diffs = []
+    for row in new['results']:
+        prev = before.get(key(row))
+        if prev is None:
+            continue
+        speed = row['per_s'] / prev['per_s'] - 1.0
+        memory = row['peak_bytes'] / max(prev['peak_bytes'], 1) - 1.0
+        diffs.append({'case': row['case'], 'path': row['path'], 'n': row['n'],
+                      'throughput_change': speed, 'memory_change': memory,
+                      'regression': speed < -threshold or memory > threshold})
+    return diffs
+
+
+def print_suite(suite: dict) -> None:
+    print("=" * 78)
+    print("BENCHMARK SUITE (seeded LEO/MEO/GEO/HEO + edge-case population)")
+    print("=" * 78)
+    print(f"{'case':<24} {'path':<7} {'N':>10} {'time [s]':>11} {'items/s':>14} {'peak [MB]':>10}")
+    for row in suite['results']:
+        print(f"{row['case']:<24} {row['path']:<7} {row['n']:>10} {row['seconds']:11.4f} "
+              f"{row['per_s']:14.0f} {row['peak_bytes'] / 2**20:10.1f}")
+
+
+def print_comparison(diffs: List[Dict]) -> None:
+    print()
+    print(f"{'case':<24} {'path':<7} {'N':>10} {'throughput':>11} {'peak mem':>10}")
+    for d in diffs:
+        flag = '  REGRESSION' if d['regression'] else ''
+        print(f"{d['case']:<24} {d['path']:<7} {d['n']:>10} {d['throughput_change']:+11.1%} "
+              f"{d['memory_change']:+10.1%}{flag}")
+
+
+def print_round_trip() -> None:
+    print()
+    print("=" * 70)
+    print("ROUND TRIP THROUGHPUT (state -> elements -> state)")
+    print("=" * 70)
+    print(f"{'N':>10}  {'scalar [states/s]':>20}  {'batch [states/s]':>20}  {'max rel err':>12}")
+    for row in bench_round_trip():
+        scalar = row.get('scalar_states_per_s')
+        scalar_text = f"{scalar:20.0f}" if scalar is not None else f"{'-':>20}"
+        print(f"{row['n']:>10}  {scalar_text}  {row['batch_states_per_s']:20.0f}  "
+              f"{row['max_rel_error']:12.2e}")
+
+
+def print_scaling() -> None:
+    print()
+    print("=" * 70)
+    print(f"PARALLEL SCALING (state -> elements, {available_cores()} cores available)")
+    print("=" * 70)
+    print(f"{'workers':>8}  {'time [s]':>10}  {'states/s':>14}  {'speedup':>8}  {'efficiency':>10}")
+    for row in bench_parallel_scaling():
+        print(f"{row['processes']:>8}  {row['seconds']:10.3f}  {row['states_per_s']:14.0f}  "
+              f"{row['speedup']:8.2f}  {row['efficiency']:10.2f}")
+
+
+# ============================================================================
+# IMPORT-TIME BUDGET
+# ============================================================================
+# The compute modules should cost little more than `import numpy` to load,
+# and must never pull in matplotlib (~0.5 s and a display backend) — that
+# only happens once a plot is drawn.
+
+IMPORT_BUDGETS = {
+    'orbit_geometry': 0.35,
+    'batch_conversion': 0.35,
+    'propagation': 0.35,
+    'state_io': 0.35,
+    'hw1_visualizations': 0.40,
+}
+HEAVY_MODULES = ('matplotlib',)
+
+_IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(elapsed, ','.join(heavy))
+"""
+
+
+def measure_import(module: str, repeats: int = 3) -> Tuple[float, List[str]]:
+    """
+    Best cold-start import time of `module` in a fresh interpreter [s], and
+    which HEAVY_MODULES it loaded.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.path.dirname(os.path.abspath(__file__)), os.environ.get('PYTHONPATH', '')]))
+    best, heavy = np.inf, []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', _IMPORT_PROBE.format(
+                                 module=module, heavy=HEAVY_MODULES)],
+                             capture_output=True, text=True, check=True, env=env).stdout.split()
+        best = min(best, float(out[0]))
+        heavy = out[1].split(',') if len(out) > 1 else []
+    return best, heavy
+
+
+def check_import_budget(budgets: Dict[str, float] = IMPORT_BUDGETS) -> List[Dict]:
+    """
+    Measure every module in `budgets`; each row says whether it passed.
+
+    A module fails if its import is over budget or loads a heavy module.
+    """
+    rows = []
+    for module, budget in budgets.items():
+        seconds, heavy = measure_import(module)
+        rows.append({'module': module, 'seconds': seconds, 'budget': budget,
+                     'heavy': heavy, 'passed': seconds <= budget and not heavy})
+    return rows
+
+
+def print_import_budget() -> bool:
+    print()
+    print("=" * 70)
+    print(f"COLD-START IMPORT TIMES (numpy alone: {measure_import('numpy')[0]:.3f} s)")
+    print("=" * 70)
+    rows = check_import_budget()
+    for row in rows:
+        status = 'ok' if row['passed'] else 'OVER BUDGET' if not row['heavy'] \
+            else 'loads ' + ', '.join(row['heavy'])
+        print(f"{row['module']:<22} {row['seconds']:8.3f} s  (budget {row['budget']:.2f} s)  {status}")
+    return all(row['passed'] for row in rows)
+
+
+def main(argv=None):
+    """Run the suite, optionally saving it as JSON and diffing against a previous run."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the orbit conversion hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=None)
+    parser.add_argument('--scalar-limit', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', help="previous JSON results to diff against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative change flagged as a regression")
+    parser.add_argument('--round-trip', action='store_true',
+                        help="also print the round-trip throughput table")
+    parser.add_argument('--scaling', action='store_true',
+                        help="also print the process-pool scaling table")
+    parser.add_argument('--import-budget', action='store_true',
+                        help="only check cold-start import times (exit 1 on failure)")
+    args = parser.parse_args(argv)
+
+    if args.import_budget:
+        sys.exit(0 if print_import_budget() else 1)
+
+    suite = run_suite(args.sizes, args.cases, args.scalar_limit, args.seed)
+    print_suite(suite)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(suite, fh, indent=1)
+        print(f"\nResults written to: {args.output}")
+    if args.compare:
+        with open(args.compare) as fh:
+            print_comparison(compare_results(json.load(fh), suite, args.threshold))
+    if args.round_trip:
+        print_round_trip()
+    if args.scaling:
+        print_scaling()
+
+
+if __name__ == "__main__":
+    main()
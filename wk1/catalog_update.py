@@ -0,0 +1,461 @@
+"""
+Incremental Catalog Updates
+SPCE 5025 - Fundamentals of Astronautics
+
+An hourly catalog snapshot is ~99% the same as the last one, but a normal
+run converts, verifies and reports every object again. This module keeps
+the results in a `CatalogStore` — a directory of memory-mapped arrays plus
+the text report — and updates it from each new snapshot:
+
+1. diff: every snapshot row is looked up by object ID. A row is new if
+   the ID isn't in the store, and changed if its epoch or any bit of its
+   state differs. IDs missing from the snapshot are removed.
+2. recompute: only new and changed rows go through the conversion, the
+   verification and the derived products (J2 secular rates and the
+   report record).
+3. patch: results are written into those rows of the mapped arrays, and
+   their report records are overwritten where they sit in the file.
+
+The report is the `hw1_results.txt` layout, but each object gets a
+fixed-size slot (the record padded with spaces), so one object can be
+rewritten without moving the others. Removed objects leave a blank slot
+that the next new object reuses.
+
+Diffing still reads the whole snapshot, but that's a few vectorized
+compares per object. The conversion, verification and formatting work
+scales with the churn.
+
+Snapshots carry an ID and an epoch with each state:
+
+- CSV: id, epoch, rx, ry, rz, vx, vy, vz per line ('#' comments and a
+  header line are skipped, as in `state_io`)
+- binary: packed SNAPSHOT_DTYPE records (int64 id, then 7 float64)
+
+    python hw1_solution.py snapshot.bin --incremental catalog/
+"""
+
+import json
+import os
+import time
+import numpy as np
+from dataclasses import dataclass
+from numpy.lib.format import open_memmap
+from typing import Optional, Tuple
+
+from batch_conversion import state_to_keplerian_batch
+from batch_verification import CHECKS, DEFAULT_TOLERANCES, verify_elements_batch
+from element_archive import _table_bits, build_id_table, lookup_rows
+from element_store import ElementStore, FIELDS
+from instrumentation import stage
+from j2_secular import RATE_NAMES, secular_rates
+from results_export import TEXT_HEADER, text_records
+from state_io import _csv_data_lines, detect_format
+
+SNAPSHOT_DTYPE = np.dtype([('id', '<i8'), ('epoch', '<f8'),
+                           ('r', '<f8', (3,)), ('v', '<f8', (3,))])
+
+STORE_VERSION = 1
+
+# Per-row arrays of a store: name -> (leading shape, dtype). Columns are
+# stored the `ElementStore` way, one contiguous row per field.
+ARRAYS = {
+    'ids': ((), np.int64),
+    'epochs': ((), np.float64),
+    'live': ((), np.bool_),
+    'states': ((6,), np.float64),
+    'elements': ((len(FIELDS),), np.float64),
+    'residuals': ((len(CHECKS),), np.float64),
+    'j2_rates': ((len(RATE_NAMES),), np.float64),
+}
+
+REPORT_FILE = 'results.txt'
+
+# Room to grow before the arrays have to be copied into bigger files
+HEADROOM = 1.25
+
+# Report slots are at least this big and a multiple of SLOT_ALIGN bytes; a
+# record is ~700 bytes with a short name
+MIN_SLOT_BYTES = 768
+SLOT_ALIGN = 64
+
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+@dataclass
+class Snapshot:
+    """One catalog snapshot: N object IDs, epochs and ECI states."""
+    ids: np.ndarray
+    epochs: np.ndarray
+    r: np.ndarray
+    v: np.ndarray
+
+    def __post_init__(self):
+        self.ids = np.asarray(self.ids, dtype=np.int64)
+        self.epochs = np.asarray(self.epochs, dtype=np.float64)
+        self.r = np.asarray(self.r, dtype=np.float64).reshape(-1, 3)
+        self.v = np.asarray(self.v, dtype=np.float64).reshape(-1, 3)
+        if not len(self.ids) == len(self.epochs) == len(self.r) == len(self.v):
+            raise ValueError("Snapshot ids, epochs and states differ in length")
+        if len(np.unique(self.ids)) != len(self.ids):
+            raise ValueError("Snapshot object IDs must be unique")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def states(self) -> np.ndarray:
+        """(N, 6) rx, ry, rz, vx, vy, vz."""
+        return np.hstack([self.r, self.v])
+
+
+def read_snapshot(path: str, fmt: Optional[str] = None) -> Snapshot:
+    """Load a CSV or binary snapshot file (format guessed as in `state_io`)."""
+    fmt = fmt or detect_format(path)
+    if fmt == 'csv':
+        with open(path, 'r') as fh:
+            lines = list(_csv_data_lines(fh))
+        values = np.loadtxt(lines, delimiter=',', dtype=np.float64, ndmin=2) \
+            if lines else np.empty((0, 8))
+        if values.shape[1] != 8:
+            raise ValueError(f"{path}: expected 8 columns (id, epoch, r, v), "
+                             f"got {values.shape[1]}")
+        return Snapshot(values[:, 0].astype(np.int64), values[:, 1],
+                        values[:, 2:5], values[:, 5:8])
+
+    size = os.path.getsize(path)
+    if size % SNAPSHOT_DTYPE.itemsize:
+        raise ValueError(f"{path}: {size} bytes is not a whole number of "
+                         f"{SNAPSHOT_DTYPE.itemsize}-byte snapshot records")
+    records = np.fromfile(path, dtype=SNAPSHOT_DTYPE)
+    return Snapshot(records['id'], records['epoch'], records['r'], records['v'])
+
+
+def write_snapshot(path: str, snapshot: Snapshot) -> None:
+    """Write a binary snapshot file."""
+    records = np.empty(len(snapshot), dtype=SNAPSHOT_DTYPE)
+    records['id'] = snapshot.ids
+    records['epoch'] = snapshot.epochs
+    records['r'] = snapshot.r
+    records['v'] = snapshot.v
+    records.tofile(path)
+
+
+# ============================================================================
+# CATALOG STORE
+# ============================================================================
+
+@dataclass
+class UpdateSummary:
+    """What one `CatalogStore.update` did."""
+    new: int
+    changed: int
+    unchanged: int
+    removed: int
+    over_tolerance: int
+    seconds: float
+
+    @property
+    def recomputed(self) -> int:
+        return self.new + self.changed
+
+    def format(self) -> str:
+        return (f"{self.new} new, {self.changed} changed, {self.removed} removed, "
+                f"{self.unchanged} unchanged; {self.recomputed} recomputed "
+                f"({self.over_tolerance} over tolerance) in {self.seconds:.3f} s")
+
+
+class CatalogStore:
+    """
+    The output of incremental runs: per-object arrays and the report.
+
+    Rows are slots. `count` slots have been handed out so far, and `live`
+    marks which of them hold a current object. Use `create` for a new store
+    and the constructor to open an existing one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as fh:
+            meta = json.load(fh)
+        if meta.get('version') != STORE_VERSION or meta.get('fields') != list(FIELDS):
+            raise ValueError(f"{path}: not a version {STORE_VERSION} catalog store")
+        self.mu = meta['mu']
+        self.count = meta['count']
+        self.slot_bytes = meta['slot_bytes']
+        self.name_format = meta['name_format']
+        self._open_arrays()
+        self._index()
+
+    @classmethod
+    def create(cls, path: str, mu: float, capacity: int,
+               name_format: str = 'Object {}') -> 'CatalogStore':
+        """Make an empty store with room for `capacity` objects."""
+        os.makedirs(path, exist_ok=True)
+        capacity = max(int(capacity), 1)
+        for name, (shape, dtype) in ARRAYS.items():
+            array = open_memmap(cls._array_path(path, name), mode='w+', dtype=dtype,
+                                shape=shape + (capacity,))
+            array[...] = False if dtype is np.bool_ else 0
+            array.flush()
+        header = TEXT_HEADER.format(mu=mu).encode()
+        with open(os.path.join(path, REPORT_FILE), 'wb') as fh:
+            fh.write(header)
+        cls._write_meta(path, mu, 0, MIN_SLOT_BYTES, name_format)
+        store = cls(path)
+        store._blank_slots(0, capacity)
+        return store
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.isfile(os.path.join(path, 'meta.json'))
+
+    @staticmethod
+    def _array_path(path: str, name: str) -> str:
+        return os.path.join(path, name + '.npy')
+
+    @staticmethod
+    def _write_meta(path: str, mu: float, count: int, slot_bytes: int,
+                    name_format: str) -> None:
+        with open(os.path.join(path, 'meta.json'), 'w') as fh:
+            json.dump({'version': STORE_VERSION, 'fields': list(FIELDS), 'mu': mu,
+                       'count': count, 'slot_bytes': slot_bytes,
+                       'name_format': name_format}, fh)
+
+    def _open_arrays(self) -> None:
+        for name in ARRAYS:
+            setattr(self, name, np.load(self._array_path(self.path, name), mmap_mode='r+'))
+        self.report_header = len(TEXT_HEADER.format(mu=self.mu).encode())
+
+    @property
+    def capacity(self) -> int:
+        return len(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.live_slots)
+
+    # ------------------------------------------------------------------
+    # ID lookup
+    # ------------------------------------------------------------------
+
+    def _index(self) -> None:
+        """Rebuild the in-memory ID -> slot table over the live slots."""
+        self.live_slots = np.flatnonzero(self.live[:self.count])
+        self.bits = _table_bits(len(self.live_slots))
+        self.live_ids = np.array(self.ids[self.live_slots])
+        self.table = build_id_table(self.live_ids, self.bits)
+
+    def slots(self, ids: np.ndarray) -> np.ndarray:
+        """Slot of each object ID, -1 where it isn't in the store."""
+        found = lookup_rows(self.table, self.live_ids, self.bits, ids)
+        hit = found >= 0
+        slots = np.full(len(found), -1, dtype=np.int64)
+        slots[hit] = self.live_slots[found[hit]]
+        return slots
+
+    def current(self) -> Tuple[np.ndarray, ElementStore]:
+        """(ids, elements) of the current objects, in slot order."""
+        return np.array(self.ids[self.live_slots]), \
+            ElementStore(np.array(self.elements[:, self.live_slots]))
+
+    # ------------------------------------------------------------------
+    # Updating
+    # ------------------------------------------------------------------
+
+    def diff(self, snapshot: Snapshot) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compare a snapshot with the store.
+
+        Returns
+        -------
+        (slots, changed, removed)
+            Store slot of each snapshot row (-1 for new objects), a mask of
+            known rows whose epoch or state changed, and the slots of live
+            objects the snapshot no longer has
+        """
+        slots = self.slots(snapshot.ids)
+        known = np.flatnonzero(slots >= 0)
+        old = slots[known]
+
+        # Bitwise, so NaNs and signed zeros count as unchanged when identical
+        same = (np.asarray(self.epochs[old]).view(np.uint64)
+                == snapshot.epochs[known].view(np.uint64))
+        stored = np.asarray(self.states[:, old]).T
+        same &= np.all(stored.view(np.uint64) == snapshot.states()[known].view(np.uint64),
+                       axis=1)
+        changed = np.zeros(len(snapshot), dtype=bool)
+        changed[known[~same]] = True
+
+        still_here = np.zeros(self.capacity, dtype=bool)
+        still_here[old] = True
+        removed = self.live_slots[~still_here[self.live_slots]]
+        return slots, changed, removed
+
+    def update(self, snapshot: Snapshot) -> UpdateSummary:
+        """Bring the store up to date with a snapshot, touching only what changed."""
+        start = time.perf_counter()
+        with stage('diff', len(snapshot)):
+            slots, changed, removed = self.diff(snapshot)
+        new = slots < 0
+
+        if len(removed):
+            self.live[removed] = False
+            self._blank_slots_at(removed)
+        if new.any():
+            slots[new] = self._allocate(int(new.sum()))
+
+        rows = np.flatnonzero(new | changed)
+        over = self._recompute(rows, slots[rows], snapshot) if len(rows) else 0
+
+        if new.any() or len(removed):
+            self._index()   # changed objects keep their slots
+        self.flush()
+        return UpdateSummary(new=int(new.sum()), changed=int(changed.sum()),
+                             unchanged=len(snapshot) - len(rows), removed=len(removed),
+                             over_tolerance=over, seconds=time.perf_counter() - start)
+
+    def _allocate(self, n: int) -> np.ndarray:
+        """n free slots: ones left by removed objects first, then fresh ones."""
+        free = np.flatnonzero(~np.asarray(self.live[:self.count]))[:n]
+        fresh = n - len(free)
+        if self.count + fresh > self.capacity:
+            self._grow(int((self.count + fresh) * HEADROOM))
+        slots = np.concatenate([free, np.arange(self.count, self.count + fresh)])
+        self.count += fresh
+        return slots
+
+    def _recompute(self, rows: np.ndarray, slots: np.ndarray, snapshot: Snapshot) -> int:
+        """Convert, verify and derive for the given snapshot rows; returns #over tolerance."""
+        r, v = snapshot.r[rows], snapshot.v[rows]
+        with stage('convert', len(rows)):
+            elements = state_to_keplerian_batch(r, v, self.mu)
+        with stage('verify', len(rows)):
+            residuals = verify_elements_batch(r, v, elements, self.mu)
+        with stage('derive', len(rows)):
+            bound = elements.e < 1
+            rates = np.full((len(RATE_NAMES), len(rows)), np.nan)
+            rates[:, bound] = secular_rates(elements.a[bound], elements.e[bound],
+                                            elements.inc[bound], self.mu)
+            names = [self.name_format.format(i) for i in snapshot.ids[rows].tolist()]
+            records = text_records(names, r, v, elements)
+
+        with stage('write', len(rows)):
+            self.ids[slots] = snapshot.ids[rows]
+            self.epochs[slots] = snapshot.epochs[rows]
+            self.live[slots] = True
+            self.states[:3, slots] = r.T
+            self.states[3:, slots] = v.T
+            self.elements[:, slots] = elements.data
+            self.residuals[:, slots] = np.array([residuals[name] for name in CHECKS])
+            self.j2_rates[:, slots] = rates
+            self._write_records(slots, records)
+
+        # NaN residuals count as failures, like in the health report
+        ok = np.ones(len(rows), dtype=bool)
+        for name in CHECKS:
+            ok &= residuals[name] <= DEFAULT_TOLERANCES[name]
+        return int(np.count_nonzero(~ok))
+
+    def _grow(self, capacity: int) -> None:
+        """Copy every array into bigger files (rare — capacity grows geometrically)."""
+        old = self.capacity
+        for name, (shape, dtype) in ARRAYS.items():
+            final = self._array_path(self.path, name)
+            temp = final + '.grow'
+            bigger = open_memmap(temp, mode='w+', dtype=dtype, shape=shape + (capacity,))
+            bigger[..., :old] = getattr(self, name)
+            bigger[..., old:] = False if dtype is np.bool_ else 0
+            bigger.flush()
+            del bigger
+            setattr(self, name, None)
+            os.replace(temp, final)
+        self._open_arrays()
+        self._blank_slots(old, capacity)
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+
+    def _slot_text(self, record: str) -> bytes:
+        # Pad the trailing blank line, keeping the record's final newline
+        data = record.encode()
+        return data[:-1] + b' ' * (self.slot_bytes - len(data)) + b'\n'
+
+    def _blank_slots(self, start: int, stop: int) -> None:
+        blank = b' ' * (self.slot_bytes - 1) + b'\n'
+        with open(os.path.join(self.path, REPORT_FILE), 'r+b') as fh:
+            fh.seek(self.report_header + start * self.slot_bytes)
+            fh.write(blank * (stop - start))
+
+    def _blank_slots_at(self, slots: np.ndarray) -> None:
+        blank = b' ' * (self.slot_bytes - 1) + b'\n'
+        with open(os.path.join(self.path, REPORT_FILE), 'r+b') as fh:
+            for slot in np.sort(slots).tolist():
+                fh.seek(self.report_header + slot * self.slot_bytes)
+                fh.write(blank)
+
+    def _write_records(self, slots: np.ndarray, records: list) -> None:
+        """Overwrite the report slots of these objects with their new records."""
+        longest = max(len(record.encode()) for record in records)
+        if longest > self.slot_bytes:
+            # A record outgrew the slots (a long name or a huge number):
+            # lay the whole report out again with bigger ones
+            self.slot_bytes = -(-int(longest * HEADROOM) // SLOT_ALIGN) * SLOT_ALIGN
+            self._rewrite_report(np.asarray(slots), records)
+            return
+        order = np.argsort(slots)
+        sorted_slots = slots[order]
+        # One seek + write per run of consecutive slots (a fresh store is one run)
+        breaks = np.flatnonzero(np.diff(sorted_slots) != 1) + 1
+        with open(os.path.join(self.path, REPORT_FILE), 'r+b') as fh:
+            for run in np.split(np.arange(len(order)), breaks):
+                fh.seek(self.report_header + int(sorted_slots[run[0]]) * self.slot_bytes)
+                fh.write(b''.join([self._slot_text(records[k]) for k in order[run].tolist()]))
+
+    def _rewrite_report(self, slots: np.ndarray, records: list) -> None:
+        """The whole report at the current slot size, with `records` for `slots`."""
+        text = [b' ' * (self.slot_bytes - 1) + b'\n'] * self.capacity
+        live = np.flatnonzero(self.live[:self.count])
+        pending = np.isin(live, slots, invert=True)
+        keep = live[pending]
+        if len(keep):
+            states = np.asarray(self.states[:, keep]).T
+            names = [self.name_format.format(i) for i in self.ids[keep].tolist()]
+            old = text_records(names, states[:, :3], states[:, 3:],
+                               ElementStore(np.array(self.elements[:, keep])))
+            for slot, record in zip(keep.tolist(), old):
+                text[slot] = self._slot_text(record)
+        for slot, record in zip(slots.tolist(), records):
+            text[slot] = self._slot_text(record)
+
+        path = os.path.join(self.path, REPORT_FILE)
+        with open(path + '.tmp', 'wb') as fh:
+            fh.write(TEXT_HEADER.format(mu=self.mu).encode())
+            fh.write(b''.join(text))
+        os.replace(path + '.tmp', path)
+
+    def flush(self) -> None:
+        for name in ARRAYS:
+            getattr(self, name).flush()
+        self._write_meta(self.path, self.mu, self.count, self.slot_bytes, self.name_format)
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def run_incremental(snapshot_path: str, store_path: str, mu: float,
+                    fmt: Optional[str] = None) -> UpdateSummary:
+    """
+    Apply a snapshot file to a store, creating the store on the first run
+    (everything is 'new' then).
+    """
+    with stage('ingest'):
+        snapshot = read_snapshot(snapshot_path, fmt)
+    if CatalogStore.exists(store_path):
+        store = CatalogStore(store_path)
+        if store.mu != mu:
+            raise ValueError(f"{store_path} was built with mu={store.mu!r}, not {mu!r}")
+    else:
+        store = CatalogStore.create(store_path, mu, int(len(snapshot) * HEADROOM))
+    return store.update(snapshot)
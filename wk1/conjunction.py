@@ -0,0 +1,391 @@
+"""
+Conjunction Screening
+SPCE 5025 - Fundamentals of Astronautics
+
+Find every pair of objects that comes within `threshold` meters of each
+other over a time span, without looking at all N^2/2 pairs at every step.
+Three filters, each much cheaper per pair than the next:
+
+1. Apogee/perigee shells. Two orbits can only come within d of each other
+   if their radial shells [r_p, r_a] overlap to within d. `ShellIndex` sorts
+   the objects by perigee once; the objects whose shells overlap object i's
+   are then one contiguous run of that order (found with `searchsorted`),
+   so the filter costs O(N log N) and the surviving pairs are stored as N
+   (start, stop) ranges rather than a pair list. Objects with no overlapping
+   partner leave the screen entirely.
+2. Spatial grid. At each time step the surviving objects are hashed into a
+   uniform grid of cubes with side `pad` = threshold + (largest relative
+   speed) * step / 2 + a small term for relative acceleration — the
+   farthest a pair can be at a sample and still come within threshold
+   before the nearest other sample. Pairs are only looked for in each cube
+   and its 13 "forward" neighbors, then cut by the same bound with the
+   pair's own relative speed (which drops co-moving neighbors, e.g. in
+   GEO) and by the shell test.
+3. Refinement. Candidate steps of the same pair are grouped into
+   encounters, and each encounter's time of closest approach (TCA) is found
+   as the root of the range rate rho . v_rel with `bracketed_roots`, using
+   `propagate_to` for both objects.
+
+Only NumPy is needed — the grid is a sort of packed integer cell keys plus
+binary searches, which is what a k-d tree would buy here for uniform-ish
+catalogs anyway.
+"""
+
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Tuple, Union
+
+from element_store import ElementStore
+from batch_conversion import state_to_keplerian_batch
+from propagation import propagate_chunks, propagate_to
+from visibility import bracketed_roots
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+
+DEFAULT_THRESHOLD = 10_000.0   # screening distance [m]
+DEFAULT_STEP = 10.0            # screening time step [s]
+DEFAULT_TOLERANCE = 1e-3       # TCA accuracy [s]
+
+# Time steps per propagation block (all surviving objects at once)
+CHUNK_STEPS = 32
+
+# Cell coordinates are packed into one int64 key, 21 bits per axis
+_CELL_BITS = 21
+_CELL_LIMIT = (1 << _CELL_BITS) - 3   # room for the +1 offset and a neighbor
+
+# Half of the 26 neighboring cells (plus the cell itself), so each pair of
+# cells is visited once
+_FORWARD_OFFSETS = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                    for dz in (-1, 0, 1) if (dx, dy, dz) > (0, 0, 0)]
+
+
+# ============================================================================
+# STAGE 1: APOGEE/PERIGEE FILTER
+# ============================================================================
+
+class ShellIndex:
+    """
+    Objects sorted by perigee radius, for apogee/perigee shell overlap queries.
+
+    With objects in perigee order, those whose shells overlap object i's
+    (to within `pad`) and come after it in that order are exactly the run
+    of positions (i, stop[i]), where stop[i] is the first perigee above
+    r_a[i] + pad. Every overlapping pair is in exactly one such run.
+
+    Parameters
+    ----------
+    r_periapsis, r_apoapsis : np.ndarray
+        Shell radii per object [m]; r_apoapsis may be inf for unbound orbits
+    pad : float
+        Screening distance [m]
+    """
+
+    def __init__(self, r_periapsis: np.ndarray, r_apoapsis: np.ndarray, pad: float):
+        self.r_periapsis = np.asarray(r_periapsis, dtype=np.float64)
+        self.r_apoapsis = np.asarray(r_apoapsis, dtype=np.float64)
+        self.pad = pad
+        self.order = np.argsort(self.r_periapsis, kind='stable')
+        self.rank = np.empty_like(self.order)
+        self.rank[self.order] = np.arange(len(self.order))
+        self.stop = np.searchsorted(self.r_periapsis[self.order],
+                                    self.r_apoapsis[self.order] + pad, side='right')
+
+    @classmethod
+    def from_elements(cls, elements: ElementStore, pad: float) -> 'ShellIndex':
+        return cls(elements.r_periapsis, elements.r_apoapsis, pad)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @property
+    def pair_count(self) -> int:
+        """Number of pairs whose shells overlap."""
+        return int(np.sum(self.stop - np.arange(len(self)) - 1))
+
+    def has_partner(self) -> np.ndarray:
+        """True for objects whose shell overlaps at least one other object's."""
+        n = len(self)
+        positions = np.arange(n)
+        later = self.stop > positions + 1
+        # Position p is also in an earlier run if some q < p has stop[q] > p
+        reach = np.maximum.accumulate(self.stop)
+        earlier = np.zeros(n, dtype=bool)
+        earlier[1:] = reach[:-1] > positions[1:]
+        partner = np.empty(n, dtype=bool)
+        partner[self.order] = later | earlier
+        return partner
+
+    def overlaps(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Elementwise: do the shells of objects i and j overlap (to within pad)?"""
+        lo, hi = np.minimum(self.rank[i], self.rank[j]), np.maximum(self.rank[i], self.rank[j])
+        return hi < self.stop[lo]
+
+    def pairs(self, block: int = 1_000_000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Every overlapping pair (i, j) as object indices, about `block` pairs at a time."""
+        ends = np.cumsum(self.stop - np.arange(len(self)) - 1)
+        first = 0
+        while first < len(self):
+            done = ends[first - 1] if first else 0
+            last = max(int(np.searchsorted(ends, done + block, side='right')), first + 1)
+            rows, j = _expand_ranges(np.arange(first, last) + 1, self.stop[first:last])
+            yield self.order[first + rows], self.order[j]
+            first = last
+
+
+# ============================================================================
+# STAGE 2: SPATIAL GRID
+# ============================================================================
+
+def _expand_ranges(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(row, k) for every k in [lo[row], hi[row]) — a vectorized nested loop."""
+    counts = np.maximum(hi - lo, 0)
+    rows = np.repeat(np.arange(len(lo)), counts)
+    k = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts) + lo[rows]
+    return rows, k
+
+
+def grid_pairs(positions: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    All pairs of points closer than `radius`, using a uniform grid.
+
+    Points are binned into cubes of side >= radius, so any close pair sits
+    in the same or adjacent cubes. Cell coordinates are packed into one
+    int64 key and sorted; neighboring occupied cells are found with
+    `searchsorted` over the occupied cells only.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Shape (M, 3) [m]
+    radius : float
+        Pair distance cutoff [m]
+
+    Returns
+    -------
+    (i, j, distance)
+        Row indices (i < j not guaranteed) and separations of the close pairs
+    """
+    lower = positions.min(axis=0)
+    span = float(np.max(positions.max(axis=0) - lower)) if len(positions) else 0.0
+    cell = max(radius, span / _CELL_LIMIT)
+    coords = ((positions - lower) // cell).astype(np.int64) + 1
+    key = (coords[:, 0] << (2*_CELL_BITS)) | (coords[:, 1] << _CELL_BITS) | coords[:, 2]
+
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+
+    # Occupied cells: key, first sorted position and point count of each run
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+    counts = np.diff(np.r_[starts, len(key)])
+    cells = sorted_key[starts]
+
+    # Same cell: each point with the later points of its run
+    pieces = [_expand_ranges(np.arange(len(key)) + 1, np.repeat(starts + counts, counts))]
+    for dx, dy, dz in _FORWARD_OFFSETS:
+        target = cells + ((dx << (2*_CELL_BITS)) + (dy << _CELL_BITS) + dz)
+        found = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        hit = np.flatnonzero(cells[found] == target)
+        # Every point of cell `hit` with every point of the neighbor cell
+        which, a = _expand_ranges(starts[hit], starts[hit] + counts[hit])
+        neighbor = found[hit][which]
+        rows, b = _expand_ranges(starts[neighbor], starts[neighbor] + counts[neighbor])
+        pieces.append((a[rows], b))
+
+    i = order[np.concatenate([p[0] for p in pieces])]
+    j = order[np.concatenate([p[1] for p in pieces])]
+    distance = np.sqrt(np.einsum('ij,ij->i', positions[i] - positions[j], positions[i] - positions[j]))
+    close = distance <= radius
+    return i[close], j[close], distance[close]
+
+
+# ============================================================================
+# STAGE 3: TIME OF CLOSEST APPROACH
+# ============================================================================
+
+@dataclass
+class Conjunctions:
+    """Close approaches as parallel arrays, sorted by miss distance."""
+    primary: np.ndarray          # object index (the lower one)
+    secondary: np.ndarray        # object index
+    tca: np.ndarray              # time of closest approach [s]
+    miss_distance: np.ndarray    # [m]
+    relative_speed: np.ndarray   # at TCA [m/s]
+    stats: dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.primary)
+
+
+def _relative_state(r0, v0, i, j, t, mu, method):
+    ri, vi = propagate_to(r0[i], v0[i], t, mu, method)
+    rj, vj = propagate_to(r0[j], v0[j], t, mu, method)
+    return rj - ri, vj - vi
+
+
+def closest_approach(r0: np.ndarray, v0: np.ndarray, i: np.ndarray, j: np.ndarray,
+                     t_lo: np.ndarray, t_hi: np.ndarray, mu: float = MU_EARTH,
+                     tolerance: float = DEFAULT_TOLERANCE, method: str = 'kepler'
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Time and distance of closest approach of pairs (i, j) within [t_lo, t_hi].
+
+    The minimum is where the range rate rho . v_rel crosses zero going up.
+    Pairs without a sign change in the window are closest at an end of it.
+
+    Returns (tca, miss_distance, relative_speed, propagations).
+    """
+    rho_lo, vrel_lo = _relative_state(r0, v0, i, j, t_lo, mu, method)
+    rho_hi, vrel_hi = _relative_state(r0, v0, i, j, t_hi, mu, method)
+    g_lo = np.einsum('ij,ij->i', rho_lo, vrel_lo)
+    g_hi = np.einsum('ij,ij->i', rho_hi, vrel_hi)
+
+    tca = np.where(np.einsum('ij,ij->i', rho_lo, rho_lo) <= np.einsum('ij,ij->i', rho_hi, rho_hi),
+                   t_lo, t_hi)
+    bracketed = np.flatnonzero((g_lo < 0) & (g_hi > 0))
+
+    def range_rate(rows, t):
+        rho, vrel = _relative_state(r0, v0, i[bracketed[rows]], j[bracketed[rows]], t, mu, method)
+        return np.einsum('ij,ij->i', rho, vrel)
+
+    roots, evaluations = bracketed_roots(range_rate, t_lo[bracketed], t_hi[bracketed],
+                                         g_lo[bracketed], g_hi[bracketed], tolerance)
+    tca[bracketed] = roots
+
+    rho, vrel = _relative_state(r0, v0, i, j, tca, mu, method)
+    miss = np.sqrt(np.einsum('ij,ij->i', rho, rho))
+    speed = np.sqrt(np.einsum('ij,ij->i', vrel, vrel))
+    return tca, miss, speed, 2 * (evaluations + 3 * len(i))
+
+
+def _encounters(i, j, step, distance):
+    """
+    Group candidate (pair, step) rows into encounters: runs of consecutive
+    steps of one pair. Returns (i, j, step of the closest sample) per encounter.
+    """
+    order = np.lexsort((step, j, i))
+    i, j, step, distance = i[order], j[order], step[order], distance[order]
+    new = np.ones(len(i), dtype=bool)
+    new[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1]) | (step[1:] != step[:-1] + 1)
+    group = np.cumsum(new) - 1
+    # Closest sample of each group: sort by (group, distance), take the first
+    best = np.lexsort((distance, group))
+    first = np.ones(len(best), dtype=bool)
+    first[1:] = group[best][1:] != group[best][:-1]
+    best = best[first]
+    return i[best], j[best], step[best]
+
+
+# ============================================================================
+# SCREENING
+# ============================================================================
+
+def screen_conjunctions(r0: np.ndarray, v0: np.ndarray, start: float, stop: float,
+                        threshold: float = DEFAULT_THRESHOLD, step: float = DEFAULT_STEP,
+                        mu: float = MU_EARTH,
+                        elements: Optional[Union[ElementStore, dict]] = None,
+                        tolerance: float = DEFAULT_TOLERANCE, method: str = 'kepler',
+                        chunk_steps: int = CHUNK_STEPS) -> Conjunctions:
+    """
+    Every pair of objects that comes within `threshold` over [start, stop].
+
+    Parameters
+    ----------
+    r0, v0 : np.ndarray
+        ECI states at the reference epoch, shape (N, 3) [m, m/s]
+    start, stop : float
+        Screening interval, as offsets from the reference epoch [s]
+    threshold : float
+        Miss distance to report [m]
+    step : float
+        Screening time step [s]. Shorter steps mean a smaller grid pad
+        (fewer candidates per step) but more steps.
+    mu : float
+        Gravitational parameter [m^3/s^2]
+    elements : ElementStore or dict, optional
+        Elements of the states, if already computed (only r_periapsis and
+        r_apoapsis are used)
+    tolerance : float
+        TCA accuracy [s]
+    method : str
+        'kepler' or 'universal' (see `propagation`)
+    chunk_steps : int
+        Time steps propagated per block
+
+    Returns
+    -------
+    Conjunctions
+        Close approaches, plus `stats` with the number of pairs left after
+        each stage
+    """
+    r0 = np.atleast_2d(np.asarray(r0, dtype=np.float64))
+    v0 = np.atleast_2d(np.asarray(v0, dtype=np.float64))
+    if not stop > start:
+        raise ValueError(f"stop ({stop!r}) must be after start ({start!r})")
+    if not step > 0:
+        raise ValueError(f"step must be positive, got {step!r}")
+    n = len(r0)
+    if elements is None:
+        elements = state_to_keplerian_batch(r0, v0, mu)
+    shells = ShellIndex(elements['r_periapsis'], elements['r_apoapsis'], threshold)
+
+    # Stage 1: only objects with a possible partner are propagated at all
+    keep = np.flatnonzero(shells.has_partner())
+    stats = {'objects': n, 'all_pairs': n * (n - 1) // 2,
+             'shell_pairs': shells.pair_count, 'screened_objects': len(keep)}
+
+    times = np.arange(start, stop, step, dtype=np.float64)
+    if times[-1] < stop:
+        times = np.append(times, stop)
+    # Relative acceleration is at most twice gravity at the lowest perigee
+    r_min = max(float(np.min(elements['r_periapsis'][keep])), 6.0e6) if len(keep) else 6.0e6
+    drift = 0.125 * (2.0 * mu / r_min**2) * step**2
+
+    # Stage 2: grid search per time step
+    found_i, found_j, found_step, found_d = [], [], [], []
+    grid_pairs_total = 0
+    for first in range(0, len(times), chunk_steps) if len(keep) > 1 else ():
+        block = times[first:first + chunk_steps]
+        positions = np.empty((len(keep), len(block), 3))
+        velocities = np.empty_like(positions)
+        for objs, epochs, r, v in propagate_chunks(r0[keep], v0[keep], block, mu,
+                                                   chunk_epochs=len(block), method=method):
+            positions[objs] = r
+            velocities[objs] = v
+        speed_max = float(np.sqrt(np.einsum('ijk,ijk->ij', velocities, velocities).max()))
+        pad = threshold + speed_max * step + drift
+
+        for k in range(len(block)):
+            i, j, d = grid_pairs(positions[:, k], pad)
+            grid_pairs_total += len(i)
+            # Each pair's own reach: closest approach within half a step of
+            # this sample is at least d - |v_rel| step/2 - drift
+            v_rel = velocities[i, k] - velocities[j, k]
+            reach = threshold + 0.5 * step * np.sqrt(np.einsum('ij,ij->i', v_rel, v_rel)) + drift
+            i, j = keep[i], keep[j]
+            ok = (d <= reach) & shells.overlaps(i, j)
+            found_i.append(np.minimum(i[ok], j[ok]))
+            found_j.append(np.maximum(i[ok], j[ok]))
+            found_step.append(np.full(np.count_nonzero(ok), first + k))
+            found_d.append(d[ok])
+    stats['grid_candidates'] = grid_pairs_total
+
+    if not found_i:
+        found_i = found_j = found_step = [np.empty(0, dtype=np.intp)]
+        found_d = [np.empty(0)]
+    i, j, best_step = _encounters(np.concatenate(found_i), np.concatenate(found_j),
+                                  np.concatenate(found_step), np.concatenate(found_d))
+    stats['encounters'] = len(i)
+
+    # Stage 3: TCA within one step either side of the closest sample
+    t_lo = times[np.maximum(best_step - 1, 0)]
+    t_hi = times[np.minimum(best_step + 1, len(times) - 1)]
+    tca, miss, speed, propagations = closest_approach(r0, v0, i, j, t_lo, t_hi, mu,
+                                                      tolerance, method)
+    stats['refine_propagations'] = propagations
+
+    close = miss <= threshold
+    order = np.argsort(miss[close], kind='stable')
+    result = Conjunctions(i[close][order], j[close][order], tca[close][order],
+                          miss[close][order], speed[close][order], stats)
+    stats['conjunctions'] = len(result)
+    return result
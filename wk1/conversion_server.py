@@ -0,0 +1,613 @@
+"""
+Local Conversion Server with Micro-Batching
+SPCE 5025 - Fundamentals of Astronautics
+
+Tools that call `state_to_keplerian` one state at a time pay the Python and
+RPC overhead on every single state. This server listens on a local TCP port
+or a Unix socket and answers the same questions. Concurrent single requests
+are queued and pushed through the vectorized batch functions together:
+
+- a `MicroBatcher` collects requests until it has `max_batch` of them or
+  the oldest one has waited `max_delay` seconds, then makes one batch call
+  and hands each caller its own row
+- requests only share a batch when they share mu (and, for propagation,
+  the method), so every batch is a single vectorized call
+
+Endpoints (HTTP/1.1, JSON bodies, keep-alive):
+
+    POST /convert        {"r": [x, y, z], "v": [vx, vy, vz], "mu": optional}
+                         -> {"elements": {a, e, inc, ...}}
+    POST /verify         same body -> elements, residuals and "ok"
+    POST /propagate      {"r", "v", "t": seconds, "method": optional, "mu"}
+                         -> {"r", "v"} at t
+    POST /bulk/convert   raw float64 state records (the `state_io` binary
+                         format); the reply streams back one row of 9 float64
+                         elements (FIELDS order) per state, chunk by chunk
+                         as the body arrives
+    POST /bulk/verify    same, with the 4 residuals (CHECKS order) appended
+    GET  /stats          request and batch counts per batcher
+
+Non-finite numbers (nu of a circular equatorial orbit, r_apoapsis of a
+hyperbola) come back as null in JSON.
+
+`load_test` is the matching client. It opens a number of keep-alive
+connections, fires single requests back to back on each one, and reports
+p50/p99 latency and requests per second.
+
+    python conversion_server.py serve --port 8765
+    python conversion_server.py bench --port 8765 --requests 20000 --concurrency 64
+"""
+
+import asyncio
+import json
+import math
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+from batch_conversion import state_to_keplerian_batch
+from batch_verification import CHECKS, DEFAULT_TOLERANCES, verify_elements_batch
+from element_store import FIELDS
+from propagation import METHODS, propagate_to
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Flush a batch at this many requests, or once the oldest has waited this
+# long. A millisecond is well under the RPC overhead it replaces, and at a
+# few thousand requests per second it already makes batches of dozens.
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_DELAY = 0.001  # [s]
+
+# States per bulk chunk. Each chunk is converted on the event loop, so this
+# also bounds how long single requests can be held up by a bulk upload.
+BULK_CHUNK = 8192
+
+STATE_BYTES = 6 * 8
+
+Address = Union[Tuple[str, int], str]
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+# ============================================================================
+# MICRO-BATCHING
+# ============================================================================
+
+class MicroBatcher:
+    """
+    Group single requests into batch calls.
+
+    `func` takes a list of items and returns a list of results in the same
+    order. If a batch call raises, its items are retried one at a time, so
+    one bad state only fails its own request.
+    """
+
+    def __init__(self, func: Callable[[list], list], max_batch: int = DEFAULT_MAX_BATCH,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.func = func
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []
+        self.timer = None
+        self.requests = 0
+        self.batches = 0
+        self.largest = 0
+
+    def submit(self, item) -> asyncio.Future:
+        """Queue one item; the future resolves to its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self) -> None:
+        """Run everything queued as one batch."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+        try:
+            results = self.func(items)
+        except Exception:
+            results = [self._one(item) for item in items]
+
+        self.requests += len(batch)
+        self.batches += 1
+        self.largest = max(self.largest, len(batch))
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue   # the caller went away
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _one(self, item):
+        try:
+            return self.func([item])[0]
+        except Exception as exc:
+            return exc
+
+    def stats(self) -> Dict[str, float]:
+        return {'requests': self.requests, 'batches': self.batches,
+                'mean_batch': self.requests / self.batches if self.batches else 0.0,
+                'largest_batch': self.largest}
+
+
+# ============================================================================
+# BATCH HANDLERS
+# ============================================================================
+
+def _finite(values: Sequence[float]) -> list:
+    """JSON has no NaN or inf, so they become None."""
+    return [x if math.isfinite(x) else None for x in values]
+
+
+def _stack(items: list) -> Tuple[np.ndarray, np.ndarray]:
+    return (np.array([item[0] for item in items]),
+            np.array([item[1] for item in items]))
+
+
+def _convert_rows(r: np.ndarray, v: np.ndarray, mu: float,
+                  verify: bool) -> np.ndarray:
+    """(N, 9) elements, or (N, 13) with the residuals appended when verify."""
+    elements = state_to_keplerian_batch(r, v, mu)
+    if not verify:
+        return elements.data.T
+    residuals = verify_elements_batch(r, v, elements, mu)
+    return np.vstack([elements.data] + [residuals[name] for name in CHECKS]).T
+
+
+def convert_batch(items: list, mu: float, verify: bool = False) -> List[dict]:
+    """Batch handler for /convert and /verify; items are (r, v) pairs."""
+    r, v = _stack(items)
+    rows = _convert_rows(r, v, mu, verify)
+    results = []
+    for row in rows.tolist():
+        result = {'elements': dict(zip(FIELDS, _finite(row[:len(FIELDS)])))}
+        if verify:
+            residuals = row[len(FIELDS):]
+            result['residuals'] = dict(zip(CHECKS, _finite(residuals)))
+            # NaN residuals fail too (comparisons with NaN are False)
+            result['ok'] = all(x <= DEFAULT_TOLERANCES[name]
+                               for name, x in zip(CHECKS, residuals))
+        results.append(result)
+    return results
+
+
+def propagate_batch(items: list, mu: float, method: str) -> List[dict]:
+    """Batch handler for /propagate; items are (r, v, t), each at its own t."""
+    r0, v0 = _stack(items)
+    r, v = propagate_to(r0, v0, np.array([item[2] for item in items]), mu, method)
+    return [{'r': _finite(ri), 'v': _finite(vi)} for ri, vi in zip(r.tolist(), v.tolist())]
+
+
+def _vector(body: dict, key: str) -> np.ndarray:
+    value = np.asarray(body[key], dtype=np.float64)
+    if value.shape != (3,) or not np.all(np.isfinite(value)):
+        raise ValueError(f"'{key}' must be 3 finite numbers")
+    return value
+
+
+# ============================================================================
+# HTTP PLUMBING
+# ============================================================================
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, dict]]:
+    """Request or status line plus headers; None on a closed connection."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    headers = {}
+    while True:
+        header = await reader.readline()
+        if header in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = header.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    first, second = line.decode('latin-1').split()[:2]
+    return first, second, headers
+
+
+async def _discard(reader: asyncio.StreamReader, length: int) -> None:
+    """Read and drop a request body so the connection stays in sync."""
+    while length:
+        size = min(length, BULK_CHUNK * STATE_BYTES)
+        await reader.readexactly(size)
+        length -= size
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f'HTTP/1.1 {status} {REASONS[status]}']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+def _json_response(status: int, payload: dict) -> bytes:
+    body = json.dumps(payload).encode()
+    return _head(status, {'Content-Type': 'application/json',
+                          'Content-Length': str(len(body))}) + body
+
+
+def _chunk(data: bytes) -> bytes:
+    """One piece of a chunked transfer-encoded body."""
+    return b'%x\r\n%s\r\n' % (len(data), data)
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+class ConversionServer:
+    """
+    The request handler plus one `MicroBatcher` per (endpoint, mu, method).
+
+    Use `start()` inside a running event loop, or `serve()` to run forever.
+    """
+
+    def __init__(self, mu: float = MU_EARTH, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.mu = mu
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batchers = {}
+        self.bulk_states = 0
+
+    def batcher(self, endpoint: str, mu: float, method: Optional[str] = None) -> MicroBatcher:
+        key = (endpoint, mu, method)
+        if key not in self.batchers:
+            if endpoint == 'propagate':
+                func = lambda items: propagate_batch(items, mu, method)
+            else:
+                func = lambda items: convert_batch(items, mu, verify=endpoint == 'verify')
+            self.batchers[key] = MicroBatcher(func, self.max_batch, self.max_delay)
+        return self.batchers[key]
+
+    def stats(self) -> dict:
+        batchers = {f"{endpoint} mu={mu:.10g}" + (f" {method}" if method else ''): batcher.stats()
+                    for (endpoint, mu, method), batcher in self.batchers.items()}
+        return {'batchers': batchers, 'bulk_states': self.bulk_states}
+
+    async def single(self, endpoint: str, body: dict):
+        """Validate one JSON request and wait for its batch."""
+        mu = float(body.get('mu', self.mu))
+        if not mu > 0:
+            raise ValueError("'mu' must be positive")
+        r, v = _vector(body, 'r'), _vector(body, 'v')
+        if endpoint != 'propagate':
+            return await self.batcher(endpoint, mu).submit((r, v))
+        method = body.get('method', 'kepler')
+        if method not in METHODS:
+            raise ValueError(f"unknown method {method!r} (one of {', '.join(METHODS)})")
+        t = float(body['t'])
+        if not math.isfinite(t):
+            raise ValueError("'t' must be finite")
+        return await self.batcher('propagate', mu, method).submit((r, v, t))
+
+    async def bulk(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                   length: int, mu: float, verify: bool) -> None:
+        """Convert a raw state upload chunk by chunk, streaming the rows back."""
+        error = None
+        if length % STATE_BYTES:
+            error = f"body is not a whole number of {STATE_BYTES}-byte states"
+        elif not mu > 0:
+            error = "'mu' must be positive"
+        if error is not None:
+            # nothing has been sent yet: skip the body so a 400 can follow
+            await _discard(reader, length)
+            raise ValueError(error)
+        writer.write(_head(200, {'Content-Type': 'application/octet-stream',
+                                 'Transfer-Encoding': 'chunked'}))
+        remaining = length
+        while remaining:
+            size = min(remaining, BULK_CHUNK * STATE_BYTES)
+            states = np.frombuffer(await reader.readexactly(size), dtype='<f8').reshape(-1, 6)
+            rows = _convert_rows(states[:, :3], states[:, 3:], mu, verify)
+            writer.write(_chunk(rows.astype('<f8').tobytes()))
+            await writer.drain()
+            remaining -= size
+            self.bulk_states += len(states)
+        writer.write(_chunk(b''))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """One client connection: requests are answered in order until it closes."""
+        try:
+            while True:
+                try:
+                    head = await _read_head(reader)
+                    if head is None:
+                        break
+                    method, target, headers = head
+                    url = urlsplit(target)
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError('negative Content-Length')
+                except ValueError as exc:
+                    # the framing is unknown, so the connection can't be reused
+                    writer.write(_json_response(400, {'error': f'malformed request: {exc}'}))
+                    await writer.drain()
+                    break
+                await self._dispatch(reader, writer, method, url, length)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader, writer, method: str, url, length: int) -> None:
+        path = url.path.rstrip('/')
+        endpoint = path.rsplit('/', 1)[-1]
+        try:
+            if path == '/stats':
+                await reader.readexactly(length)
+                writer.write(_json_response(200, self.stats()))
+                return
+            if path not in ('/convert', '/verify', '/propagate', '/bulk/convert', '/bulk/verify'):
+                await reader.readexactly(length)
+                writer.write(_json_response(404, {'error': f'no endpoint {path}'}))
+                return
+            if method != 'POST':
+                await reader.readexactly(length)
+                writer.write(_json_response(405, {'error': 'use POST'}))
+                return
+            if path.startswith('/bulk/'):
+                query = dict(part.split('=', 1) for part in url.query.split('&') if '=' in part)
+                try:
+                    mu = float(query.get('mu', self.mu))
+                except ValueError:
+                    await _discard(reader, length)
+                    raise
+                await self.bulk(reader, writer, length, mu, verify=endpoint == 'verify')
+                return
+            body = json.loads(await reader.readexactly(length))
+            writer.write(_json_response(200, await self.single(endpoint, body)))
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            message = f'missing {exc}' if isinstance(exc, KeyError) else str(exc)
+            writer.write(_json_response(400, {'error': message}))
+        except asyncio.IncompleteReadError:
+            raise
+        except Exception as exc:
+            writer.write(_json_response(500, {'error': f'{type(exc).__name__}: {exc}'}))
+
+    async def start(self, address: Address = (DEFAULT_HOST, DEFAULT_PORT)) -> asyncio.AbstractServer:
+        """Start listening on (host, port) or a Unix socket path."""
+        if isinstance(address, str):
+            return await asyncio.start_unix_server(self.handle, path=address)
+        return await asyncio.start_server(self.handle, *address)
+
+    async def serve(self, address: Address = (DEFAULT_HOST, DEFAULT_PORT)) -> None:
+        server = await self.start(address)
+        async with server:
+            await server.serve_forever()
+
+
+# ============================================================================
+# CLIENT AND LOAD GENERATOR
+# ============================================================================
+
+class Client:
+    """A single keep-alive connection to the server."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address: Address) -> 'Client':
+        if isinstance(address, str):
+            return cls(*await asyncio.open_unix_connection(address))
+        return cls(*await asyncio.open_connection(*address))
+
+    async def request(self, method: str, path: str, body: bytes = b'',
+                      content_type: str = 'application/json') -> Tuple[int, bytes]:
+        self.writer.write(_request(method, path, body, content_type))
+        return await self._response()
+
+    async def call(self, path: str, payload: Optional[dict] = None) -> dict:
+        """POST a JSON body (GET without one) and decode the JSON reply."""
+        body = json.dumps(payload).encode() if payload is not None else b''
+        status, reply = await self.request('POST' if payload is not None else 'GET', path, body)
+        result = json.loads(reply)
+        if status != 200:
+            raise RuntimeError(f"{path}: {status} {result.get('error')}")
+        return result
+
+    async def bulk(self, r: np.ndarray, v: np.ndarray, verify: bool = False,
+                   mu: Optional[float] = None) -> np.ndarray:
+        """Stream states through /bulk/convert (or /bulk/verify); returns the rows."""
+        states = np.hstack([np.asarray(r, dtype='<f8').reshape(-1, 3),
+                            np.asarray(v, dtype='<f8').reshape(-1, 3)])
+        path = '/bulk/verify' if verify else '/bulk/convert'
+        if mu is not None:
+            path += f'?mu={mu!r}'
+        status, reply = await self.request('POST', path, states.tobytes(),
+                                           'application/octet-stream')
+        if status != 200:
+            raise RuntimeError(f"{path}: {status} {json.loads(reply).get('error')}")
+        columns = len(FIELDS) + (len(CHECKS) if verify else 0)
+        return np.frombuffer(reply, dtype='<f8').reshape(-1, columns)
+
+    async def _response(self) -> Tuple[int, bytes]:
+        _, status, headers = await _read_head(self.reader)
+        if headers.get('transfer-encoding') == 'chunked':
+            parts = []
+            while True:
+                size = int(await self.reader.readline(), 16)
+                data = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                parts.append(data[:-2])
+            return int(status), b''.join(parts)
+        return int(status), await self.reader.readexactly(int(headers.get('content-length', 0)))
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def _request(method: str, path: str, body: bytes, content_type: str) -> bytes:
+    head = (f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+            f'Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n')
+    return head.encode('latin-1') + body
+
+
+def sample_states(n: int, mu: float = MU_EARTH, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Random bound LEO-to-MEO states to throw at the server."""
+    rng = np.random.default_rng(seed)
+    radius = rng.uniform(6.7e6, 2.0e7, n)
+    r = rng.normal(size=(n, 3))
+    r *= (radius / np.linalg.norm(r, axis=1))[:, np.newaxis]
+    v = rng.normal(size=(n, 3))
+    v -= np.einsum('ij,ij->i', v, r)[:, np.newaxis] * r / radius[:, np.newaxis]**2
+    speed = np.sqrt(mu / radius) * rng.uniform(0.9, 1.2, n)
+    v *= (speed / np.linalg.norm(v, axis=1))[:, np.newaxis]
+    return r, v
+
+
+async def load_test(address: Address, endpoint: str = 'convert', requests: int = 10_000,
+                    concurrency: int = 64, seed: int = 0) -> dict:
+    """
+    Hammer one single-request endpoint and measure it.
+
+    `concurrency` connections each send their share of the requests one
+    after another (the next goes out as soon as the previous reply is in),
+    like that many independent callers.
+
+    Returns
+    -------
+    dict
+        {'requests', 'errors', 'seconds', 'requests_per_s', 'p50_ms',
+        'p99_ms', 'max_ms', 'server'}; 'server' is the /stats reply
+    """
+    r, v = sample_states(requests, seed=seed)
+    t = np.random.default_rng(seed).uniform(0, 86400, requests)
+    bodies = []
+    for k in range(requests):
+        payload = {'r': r[k].tolist(), 'v': v[k].tolist()}
+        if endpoint == 'propagate':
+            payload['t'] = float(t[k])
+        bodies.append(_request('POST', f'/{endpoint}', json.dumps(payload).encode(),
+                               'application/json'))
+
+    latencies = np.empty(requests)
+    errors = 0
+    clients = [await Client.connect(address) for _ in range(concurrency)]
+
+    async def caller(client: Client, rows: range) -> None:
+        nonlocal errors
+        for k in rows:
+            sent = time.perf_counter()
+            client.writer.write(bodies[k])
+            status, _ = await client._response()
+            latencies[k] = time.perf_counter() - sent
+            errors += status != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(client, range(i, requests, concurrency))
+                           for i, client in enumerate(clients)))
+    seconds = time.perf_counter() - start
+
+    server = await clients[0].call('/stats')
+    for client in clients:
+        await client.close()
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    return {'requests': requests, 'errors': errors, 'seconds': seconds,
+            'requests_per_s': requests / seconds, 'p50_ms': p50, 'p99_ms': p99,
+            'max_ms': latencies.max() * 1e3, 'server': server}
+
+
+async def bulk_test(address: Address, states: int = 1_000_000, verify: bool = False) -> dict:
+    """Time one streaming bulk upload of random states."""
+    r, v = sample_states(states)
+    client = await Client.connect(address)
+    start = time.perf_counter()
+    rows = await client.bulk(r, v, verify=verify)
+    seconds = time.perf_counter() - start
+    await client.close()
+    return {'states': len(rows), 'seconds': seconds, 'states_per_s': len(rows) / seconds}
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def _address(args) -> Address:
+    return args.unix if args.unix else (args.host, args.port)
+
+
+async def _bench(args) -> None:
+    address = _address(args)
+    server = None
+    if args.local:
+        server = await ConversionServer(max_batch=args.max_batch,
+                                        max_delay=args.max_delay).start(address)
+
+    stats = await load_test(address, args.endpoint, args.requests, args.concurrency)
+    print(f"{stats['requests']} /{args.endpoint} requests on {args.concurrency} connections: "
+          f"{stats['requests_per_s']:.0f} req/s, p50 {stats['p50_ms']:.2f} ms, "
+          f"p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms, "
+          f"{stats['errors']} errors")
+    for name, batcher in stats['server']['batchers'].items():
+        print(f"  {name}: {batcher['batches']} batches, "
+              f"mean {batcher['mean_batch']:.1f}, largest {batcher['largest_batch']}")
+    if args.bulk:
+        bulk = await bulk_test(address, args.bulk)
+        print(f"bulk: {bulk['states']} states in {bulk['seconds']:.2f} s "
+              f"({bulk['states_per_s'] / 1e6:.2f} M states/s)")
+
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+
+def main(argv=None):
+    """`serve` runs the server; `bench` runs the load generator against one."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Micro-batching orbit conversion server.")
+    parser.add_argument('command', choices=('serve', 'bench'))
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help="Unix socket path instead of TCP")
+    parser.add_argument('--mu', type=float, default=MU_EARTH)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-delay', type=float, default=DEFAULT_MAX_DELAY,
+                        help="seconds a request may wait for its batch to fill")
+    parser.add_argument('--endpoint', choices=('convert', 'verify', 'propagate'),
+                        default='convert', help="bench: endpoint to load")
+    parser.add_argument('--requests', type=int, default=10_000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--bulk', type=int, default=0,
+                        help="bench: also time a bulk upload of this many states")
+    parser.add_argument('--local', action='store_true',
+                        help="bench: start a server in this process first")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        where = args.unix or f"http://{args.host}:{args.port}"
+        print(f"Serving on {where}")
+        server = ConversionServer(args.mu, args.max_batch, args.max_delay)
+        try:
+            asyncio.run(server.serve(_address(args)))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Memory-Mapped Binary Element Archive
+SPCE 5025 - Fundamentals of Astronautics
+
+A compact on-disk format for catalogs of Keplerian elements. The text report
+from `write_results_to_file` is great for reading four orbits by eye, but it's
+~10x bigger than the numbers it holds and can't be read back without
+parsing. The archive is just the columnar blocks `ElementStore` already uses,
+written straight to disk:
+
+    header       128 bytes: magic, version, counts, mu, block offsets
+    ids          int64[N]          object IDs, in row order
+    elements     float64[9, N]     one contiguous row per element field
+    states       float64[6, N]     optional rx, ry, rz, vx, vy, vz columns
+    id table     int64[2^k]        open-addressing hash table, ID -> row
+
+Opening an archive maps the file with `np.memmap`, so nothing is read until
+it's touched — opening a 10M-orbit archive costs the same as opening a tiny
+one, and looking up an object by ID is a couple of probes into the mapped
+hash table.
+"""
+
+import os
+import struct
+import numpy as np
+from typing import Optional, Tuple
+
+from element_store import ElementRow, ElementStore, FIELDS
+from results_export import write_results
+
+MAGIC = b'KEPARCH1'
+VERSION = 1
+
+# magic, version, n_fields, count, mu, ids/elements/states/table offsets, table bits
+HEADER = struct.Struct('<8sIIQdQQQQI4x')
+HEADER_BYTES = 128
+ALIGN = 64
+
+STATE_COLUMNS = ('rx', 'ry', 'rz', 'vx', 'vy', 'vz')
+
+# Fibonacci hashing constant (2^64 / golden ratio)
+_HASH_MULT = np.uint64(0x9E3779B97F4A7C15)
+
+
+# ============================================================================
+# ID HASH TABLE
+# ============================================================================
+
+def _table_bits(n: int) -> int:
+    """Table size 2^bits with load factor <= 0.5."""
+    return max(4, int(np.ceil(np.log2(max(2 * n, 1)))))
+
+
+def _hash_slots(ids: np.ndarray, bits: int) -> np.ndarray:
+    """Fibonacci hash of int64 IDs into [0, 2^bits)."""
+    h = ids.astype(np.uint64) * _HASH_MULT
+    return (h >> np.uint64(64 - bits)).astype(np.int64)
+
+
+def build_id_table(ids: np.ndarray, bits: int) -> np.ndarray:
+    """
+    Linear-probing hash table mapping ID -> row, built with vectorized passes.
+
+    Each pass drops every pending ID into its current slot if it's free (the
+    first ID claiming a slot wins); the losers move one slot along and try
+    again. Empty slots hold -1.
+    """
+    if len(np.unique(ids)) != len(ids):
+        raise ValueError("Object IDs must be unique")
+
+    mask = (1 << bits) - 1
+    table = np.full(1 << bits, -1, dtype=np.int64)
+    pending = np.arange(len(ids), dtype=np.int64)
+    slots = _hash_slots(ids, bits)
+
+    while pending.size:
+        s = slots[pending]
+        free = table[s] == -1
+        claim_slots, first = np.unique(s[free], return_index=True)
+        winners = pending[free][first]
+        table[claim_slots] = winners
+
+        placed = np.zeros(len(ids), dtype=bool)
+        placed[winners] = True
+        pending = pending[~placed[pending]]
+        slots[pending] = (slots[pending] + 1) & mask
+
+    return table
+
+
+def lookup_rows(table: np.ndarray, ids: np.ndarray, bits: int,
+                query: np.ndarray) -> np.ndarray:
+    """Rows for each queried ID (-1 where the ID isn't in the archive)."""
+    query = np.atleast_1d(np.asarray(query, dtype=np.int64))
+    mask = (1 << bits) - 1
+    rows = np.full(query.shape, -1, dtype=np.int64)
+    pending = np.arange(query.size)
+    slots = _hash_slots(query, bits)
+
+    while pending.size:
+        candidate = np.asarray(table[slots[pending]])
+        occupied = candidate >= 0
+        hit = np.zeros(pending.size, dtype=bool)
+        hit[occupied] = np.asarray(ids[candidate[occupied]]) == query[pending[occupied]]
+        rows[pending[hit]] = candidate[hit]
+
+        # Stop probing on a hit or an empty slot; otherwise move along
+        keep = occupied & ~hit
+        pending = pending[keep]
+        slots[pending] = (slots[pending] + 1) & mask
+
+    return rows
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(count: int, with_states: bool) -> Tuple[int, int, int, int, int, int]:
+    """Byte offsets of each block, table bits and total file size."""
+    ids_offset = HEADER_BYTES
+    elements_offset = _aligned(ids_offset + 8 * count)
+    states_offset = _aligned(elements_offset + 8 * len(FIELDS) * count) if with_states else 0
+    end = (states_offset + 8 * len(STATE_COLUMNS) * count) if with_states \
+        else elements_offset + 8 * len(FIELDS) * count
+    table_offset = _aligned(end)
+    bits = _table_bits(count)
+    return ids_offset, elements_offset, states_offset, table_offset, bits, \
+        table_offset + 8 * (1 << bits)
+
+
+class ArchiveWriter:
+    """
+    Fill an archive chunk by chunk (e.g. straight from `state_io.convert_file`).
+
+    The file is preallocated for `count` objects and mapped, so each chunk is
+    copied directly into place. Everything goes to `path + '.tmp'` until
+    `close()` builds the ID table and moves it over `path`, so a run that
+    fails part-way never leaves something that opens as a valid archive
+    (`abort()`, or leaving the `with` block on an exception, deletes it).
+    """
+
+    def __init__(self, path: str, count: int, mu: float, with_states: bool = False):
+        self.path = path
+        self.count = count
+        self._tmp = path + '.tmp'
+        (ids_off, el_off, st_off, tab_off, self.bits, size) = _layout(count, with_states)
+
+        with open(self._tmp, 'wb') as fh:
+            fh.write(HEADER.pack(MAGIC, VERSION, len(FIELDS), count, mu,
+                                 ids_off, el_off, st_off, tab_off, self.bits))
+            fh.truncate(size)
+
+        self._mm = np.memmap(self._tmp, dtype=np.uint8, mode='r+')
+        self.ids = self._mm[ids_off:ids_off + 8*count].view(np.int64)
+        self.elements = self._mm[el_off:el_off + 8*len(FIELDS)*count] \
+            .view(np.float64).reshape(len(FIELDS), count)
+        self.states = self._mm[st_off:st_off + 8*len(STATE_COLUMNS)*count] \
+            .view(np.float64).reshape(len(STATE_COLUMNS), count) if with_states else None
+        self.table = self._mm[tab_off:tab_off + 8*(1 << self.bits)].view(np.int64)
+
+    def write(self, start: int, ids: np.ndarray, elements: ElementStore,
+              r: Optional[np.ndarray] = None, v: Optional[np.ndarray] = None) -> None:
+        """Copy one chunk of IDs/elements (and states) into rows start..start+len."""
+        stop = start + len(elements)
+        self.ids[start:stop] = ids
+        for k, name in enumerate(FIELDS):
+            self.elements[k, start:stop] = elements.column(name)
+        if self.states is not None:
+            self.states[:3, start:stop] = np.asarray(r).T
+            self.states[3:, start:stop] = np.asarray(v).T
+
+    def close(self) -> None:
+        """Build the ID table, flush everything to disk and publish the file."""
+        self.table[:] = build_id_table(np.asarray(self.ids), self.bits)
+        self._mm.flush()
+        self._release()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        """Drop the partly written file."""
+        self._release()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def _release(self) -> None:
+        del self.ids, self.elements, self.states, self.table, self._mm
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_archive(path: str, elements: ElementStore, mu: float,
+                  ids: Optional[np.ndarray] = None,
+                  r: Optional[np.ndarray] = None,
+                  v: Optional[np.ndarray] = None) -> None:
+    """
+    Write a whole `ElementStore` (plus optional states) as an archive.
+
+    IDs default to 0..N-1.
+    """
+    ids = np.arange(len(elements), dtype=np.int64) if ids is None else np.asarray(ids)
+    with ArchiveWriter(path, len(elements), mu, with_states=r is not None) as writer:
+        writer.write(0, ids, elements, r, v)
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+class ElementArchive:
+    """
+    Read-only, memory-mapped view of an element archive.
+
+    Attributes
+    ----------
+    ids : np.ndarray
+        Object IDs in row order (memory-mapped)
+    elements : ElementStore
+        Columnar elements backed directly by the mapped file
+    r, v : np.ndarray or None
+        (N, 3) state views when the archive was written with states
+    mu : float
+        Gravitational parameter the elements were computed with
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as fh:
+            (magic, version, n_fields, count, mu, ids_off, el_off, st_off,
+             tab_off, bits) = HEADER.unpack(fh.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an element archive")
+        if version != VERSION or n_fields != len(FIELDS):
+            raise ValueError(f"{path}: unsupported archive version {version} "
+                             f"with {n_fields} fields")
+
+        self.count = count
+        self.mu = mu
+        self.bits = bits
+        self._mm = np.memmap(path, dtype=np.uint8, mode='r')
+        self.ids = self._mm[ids_off:ids_off + 8*count].view(np.int64)
+        self.elements = ElementStore(self._mm[el_off:el_off + 8*n_fields*count]
+                                     .view(np.float64).reshape(n_fields, count))
+        self._table = self._mm[tab_off:tab_off + 8*(1 << bits)].view(np.int64)
+
+        if st_off:
+            states = self._mm[st_off:st_off + 8*len(STATE_COLUMNS)*count] \
+                .view(np.float64).reshape(len(STATE_COLUMNS), count)
+            self.r, self.v = states[:3].T, states[3:].T
+        else:
+            self.r = self.v = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """Row numbers for an array of IDs (-1 for IDs that aren't present)."""
+        return lookup_rows(self._table, self.ids, self.bits, ids)
+
+    def row(self, object_id: int) -> int:
+        """Row number of one object; KeyError if it isn't in the archive."""
+        row = int(self.rows(np.array([object_id]))[0])
+        if row < 0:
+            raise KeyError(object_id)
+        return row
+
+    def __getitem__(self, object_id: int) -> ElementRow:
+        """Elements of one object, by ID."""
+        return self.elements[self.row(object_id)]
+
+    def __contains__(self, object_id: int) -> bool:
+        return self.rows(np.array([object_id]))[0] >= 0
+
+    def select(self, ids: np.ndarray) -> ElementStore:
+        """Elements for many IDs at once (raises KeyError if any are missing)."""
+        rows = self.rows(ids)
+        if np.any(rows < 0):
+            raise KeyError(np.asarray(ids)[rows < 0][:5].tolist())
+        return self.elements[rows]
+
+    def export_text_report(self, filename: str, name_format: str = 'Vector {}',
+                           mode: str = 'text') -> None:
+        """
+        Write the classic `hw1_results.txt`-style report for this archive
+        (or its 'csv'/'jsonl' equivalents, see `results_export`).
+
+        Needs an archive written with states, since the report echoes the input
+        vectors. Object names come from `name_format` applied to each ID.
+        """
+        if self.r is None:
+            raise ValueError("The text report needs an archive written with states")
+        names = [name_format.format(object_id) for object_id in self.ids.tolist()]
+        write_results(filename, names, self.r, self.v, self.elements, self.mu, mode)
+
+
+def archive_size(count: int, with_states: bool = False) -> int:
+    """File size in bytes of an archive holding `count` objects."""
+    return _layout(count, with_states)[-1]
+
+
+def is_archive(path: str) -> bool:
+    """True if `path` starts with the archive magic bytes."""
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as fh:
+        return fh.read(len(MAGIC)) == MAGIC
@@ -0,0 +1,237 @@
+"""
+Columnar Keplerian Element Store
+SPCE 5025 - Fundamentals of Astronautics
+
+`KeplerianElements` is great for a handful of orbits, but a dataclass per
+object costs a few hundred bytes each and turns any filtering into a Python
+loop. `ElementStore` keeps the same nine fields as a structure-of-arrays: one
+(9, N) float64 block where each field is a contiguous row. Slices are plain
+NumPy views, and masking/sorting just records a row index into the same
+buffer, so nothing gets copied until a column is actually read.
+"""
+
+import numpy as np
+from collections.abc import Mapping
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from hw1_solution import KeplerianElements
+
+# Field order matches the dataclass, so row k of the block is always FIELDS[k]
+FIELDS = tuple(f.name for f in fields(KeplerianElements))
+FIELD_INDEX = {name: k for k, name in enumerate(FIELDS)}
+
+# Angular fields and the keys `KeplerianElements.to_degrees()` uses for each field
+ANGLE_FIELDS = ('inc', 'raan', 'omega', 'nu')
+DEGREE_KEYS = {
+    'a': 'a_m', 'e': 'e', 'inc': 'inc_deg', 'raan': 'raan_deg',
+    'omega': 'omega_deg', 'nu': 'nu_deg', 'period': 'period_s',
+    'r_periapsis': 'r_periapsis_m', 'r_apoapsis': 'r_apoapsis_m',
+}
+
+
+# ============================================================================
+# ROW AND DEGREE VIEWS
+# ============================================================================
+
+class ElementRow:
+    """
+    Lightweight view of one orbit in an `ElementStore`.
+
+    Exposes the same attributes as `KeplerianElements` (plus `to_degrees()`),
+    so anything that takes a dataclass — `keplerian_to_position`,
+    `verify_elements`, the plotting code — works on a row without copying it out.
+    """
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: 'ElementStore', row: int):
+        self._store = store
+        self._row = row
+
+    def __getattr__(self, name: str) -> float:
+        k = FIELD_INDEX.get(name)
+        if k is None:
+            raise AttributeError(name)
+        return float(self._store.data[k, self._row])
+
+    def to_degrees(self) -> dict:
+        """Same dictionary as `KeplerianElements.to_degrees()`."""
+        return self.to_elements().to_degrees()
+
+    def to_elements(self) -> KeplerianElements:
+        """Copy this row out into a standalone `KeplerianElements`."""
+        return KeplerianElements(*(float(x) for x in self._store.data[:, self._row]))
+
+    def __repr__(self) -> str:
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in FIELDS)
+        return f'ElementRow({values})'
+
+
+class DegreeColumns(Mapping):
+    """
+    Read-only mapping that converts angular columns to degrees on access.
+
+    Uses the same keys as `KeplerianElements.to_degrees()`, but each value is
+    a whole column and nothing is converted until you ask for it.
+    """
+
+    def __init__(self, store: 'ElementStore'):
+        self._store = store
+        self._fields = {key: name for name, key in DEGREE_KEYS.items()}
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        name = self._fields[key]
+        column = self._store.column(name)
+        return np.degrees(column) if name in ANGLE_FIELDS else column
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+
+# ============================================================================
+# COLUMNAR STORE
+# ============================================================================
+
+class ElementStore:
+    """
+    Structure-of-arrays container for many sets of Keplerian elements.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Float64 block of shape (9, N); row k holds field FIELDS[k]
+    index : np.ndarray, optional
+        Row indices into `data` (set by masking/sorting). None means all
+        columns of `data`, in order.
+    derived : dict, optional
+        Cached quantities computed from `data` (e.g. the orientation
+        matrices in `orbit_geometry`), keyed by name. Indexed views share
+        their parent's dict since they share its buffer.
+
+    Notes
+    -----
+    Indexing follows NumPy conventions:
+
+    - ``store['a']`` or ``store.a`` gives a column (a view when unindexed)
+    - ``store[i]`` gives an `ElementRow`
+    - ``store[2:10]`` gives a new store viewing the same buffer
+    - ``store[mask]`` / ``store[idx]`` give a store that shares the buffer
+      through a row index instead of copying every field
+    """
+
+    def __init__(self, data: np.ndarray, index: Optional[np.ndarray] = None,
+                 derived: Optional[dict] = None):
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim != 2 or data.shape[0] != len(FIELDS):
+            raise ValueError(f"Expected a ({len(FIELDS)}, N) block, got {data.shape}")
+        self.data = data
+        self.index = None if index is None else np.asarray(index, dtype=np.intp)
+        self.derived = {} if derived is None else derived
+
+    # ------------------------------------------------------------------------
+    # Constructors
+    # ------------------------------------------------------------------------
+
+    @classmethod
+    def empty(cls, n: int) -> 'ElementStore':
+        """Allocate an uninitialized store for n orbits."""
+        return cls(np.empty((len(FIELDS), n), dtype=np.float64))
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> 'ElementStore':
+        """Build a store from a dict of per-field arrays (e.g. batch conversion output)."""
+        n = len(columns[FIELDS[0]])
+        store = cls.empty(n)
+        for k, name in enumerate(FIELDS):
+            store.data[k] = columns[name]
+        return store
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[KeplerianElements]) -> 'ElementStore':
+        """Pack a sequence of `KeplerianElements` (or row views) into a store."""
+        rows = [[getattr(el, name) for name in FIELDS] for el in elements]
+        data = np.array(rows, dtype=np.float64).reshape(-1, len(FIELDS)).T
+        return cls(np.ascontiguousarray(data))
+
+    # ------------------------------------------------------------------------
+    # Column access
+    # ------------------------------------------------------------------------
+
+    def column(self, name: str) -> np.ndarray:
+        """Return one field as an array (a view unless the store is indexed)."""
+        row = self.data[FIELD_INDEX[name]]
+        return row if self.index is None else row[self.index]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """All fields as a dict of arrays."""
+        return {name: self.column(name) for name in FIELDS}
+
+    def to_degrees(self) -> DegreeColumns:
+        """Columnar counterpart of `KeplerianElements.to_degrees()` — converted lazily."""
+        return DegreeColumns(self)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name in FIELD_INDEX:
+            return self.column(name)
+        raise AttributeError(name)
+
+    # ------------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.data.shape[1] if self.index is None else len(self.index)
+
+    def __getitem__(self, key: Union[str, int, slice, np.ndarray, Sequence[int]]):
+        if isinstance(key, str):
+            return self.column(key)
+
+        if isinstance(key, (int, np.integer)):
+            n = len(self)
+            if not -n <= key < n:
+                raise IndexError(f"Row {key} out of range for {n} orbits")
+            row = int(key) % n
+            return ElementRow(self, row if self.index is None else int(self.index[row]))
+
+        if isinstance(key, slice):
+            if self.index is None:
+                return ElementStore(self.data[:, key])
+            return ElementStore(self.data, self.index[key], self.derived)
+
+        key = np.asarray(key)
+        if key.dtype == bool:
+            if key.shape != (len(self),):
+                raise IndexError(f"Boolean mask of shape {key.shape} doesn't match {len(self)} orbits")
+            key = np.flatnonzero(key)
+        base = np.arange(len(self)) if self.index is None else self.index
+        return ElementStore(self.data, base[key], self.derived)
+
+    def __iter__(self) -> Iterator[ElementRow]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def argsort(self, name: str, descending: bool = False) -> np.ndarray:
+        """Positions that would sort the store by one field."""
+        order = np.argsort(self.column(name), kind='stable')
+        return order[::-1] if descending else order
+
+    def sort_by(self, name: str, descending: bool = False) -> 'ElementStore':
+        """Sorted view of the store (shares the buffer through a row index)."""
+        return self[self.argsort(name, descending)]
+
+    def compact(self) -> 'ElementStore':
+        """Gather an indexed store into its own contiguous block."""
+        if self.index is None:
+            return ElementStore(np.ascontiguousarray(self.data))
+        return ElementStore(self.data[:, self.index])
+
+    def to_elements(self) -> list:
+        """Copy everything out as a list of `KeplerianElements`."""
+        return [row.to_elements() for row in self]
+
+    def __repr__(self) -> str:
+        return f'ElementStore({len(self)} orbits)'
@@ -0,0 +1,329 @@
+"""
+Ground Tracks and Sub-Satellite Points
+SPCE 5025 - Fundamentals of Astronautics
+
+Latitude/longitude/altitude of every object over time, for whole catalogs.
+Three steps on top of the propagated ECI states from `propagation`:
+
+1. Earth rotation angle. theta(t) = 2*pi*(0.7790572732640 +
+   1.00273781191135448 * (JD_UT1 - 2451545.0)), the IERS 2003 definition.
+   That's the only rotation applied: precession, nutation and polar motion
+   are left out (tens of meters to a few km on the ground, far below what a
+   two-body propagation gets right anyway).
+2. ECI -> ECEF: a rotation by -theta about z, one angle per epoch shared by
+   every object.
+3. ECEF -> geodetic on the WGS84 ellipsoid rather than the mean-radius
+   sphere (`R_EARTH`) the plots use — the sphere puts a LEO's altitude off
+   by up to ~14 km and its latitude off by up to 0.19 deg. Heikkinen's
+   closed form is used, so there's no per-point iteration.
+
+Everything is vectorized over objects and epochs, and `ground_track_chunks`
+streams the (objects x epochs) grid block by block the same way
+`propagate_chunks` does, so 10k objects x 1 day at 10 s steps (86M points)
+never has to be in memory at once.
+
+    python ground_track.py states.bin tracks.npy --hours 24 --step 10
+"""
+
+import numpy as np
+from typing import Iterator, Optional, Tuple
+
+from propagation import CHUNK_EPOCHS, CHUNK_OBJECTS, propagate_chunks
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0                     # equatorial radius [m]
+WGS84_F = 1.0 / 298.257223563           # flattening
+WGS84_B = WGS84_A * (1.0 - WGS84_F)     # polar radius [m]
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)    # first eccentricity squared
+WGS84_EP2 = WGS84_E2 / (1.0 - WGS84_E2)  # second eccentricity squared
+
+# Earth rotation angle (IERS Conventions 2003, eq. 5.15)
+J2000_JD = 2451545.0
+ERA_AT_J2000 = 0.7790572732640          # [rev]
+ERA_RATE = 1.00273781191135448          # [rev / UT1 day]
+SECONDS_PER_DAY = 86400.0
+
+
+# ============================================================================
+# EARTH ROTATION
+# ============================================================================
+
+def earth_rotation_angle(jd_ut1: np.ndarray, seconds: np.ndarray = 0.0) -> np.ndarray:
+    """
+    Earth rotation angle [rad] at jd_ut1 + seconds/86400, in [0, 2*pi).
+
+    Splitting the date into a Julian date plus an offset in seconds keeps the
+    offset's precision (a bare JD in float64 only resolves ~40 us).
+    """
+    days = (np.asarray(jd_ut1, dtype=np.float64) - J2000_JD) + \
+        np.asarray(seconds, dtype=np.float64) / SECONDS_PER_DAY
+    # A whole day is a whole number of turns plus (ERA_RATE - 1), so the
+    # whole turns are dropped before they can eat into the precision
+    whole = np.floor(days)
+    turns = ERA_AT_J2000 + (ERA_RATE - 1.0) * days + (days - whole)
+    return 2.0 * np.pi * np.mod(turns, 1.0)
+
+
+def julian_date(year: int, month: int, day: int, hour: int = 0,
+                minute: int = 0, second: float = 0.0) -> float:
+    """Julian date of a (proleptic Gregorian) calendar date and time."""
+    if month <= 2:
+        year, month = year - 1, month + 12
+    century = year // 100
+    jd_0h = (int(365.25 * (year + 4716)) + int(30.6001 * (month + 1)) + day
+             + 2 - century + century // 4 - 1524.5)
+    return jd_0h + (hour + minute / 60.0 + second / 3600.0) / 24.0
+
+
+def eci_to_ecef(r_eci: np.ndarray, theta: np.ndarray) -> np.ndarray:
+    """
+    Rotate ECI positions into the Earth-fixed frame.
+
+    Parameters
+    ----------
+    r_eci : np.ndarray
+        Positions [m], shape (..., T, 3) — the last axis before the vector
+        is time
+    theta : np.ndarray
+        Earth rotation angle per epoch [rad], shape (T,)
+
+    Returns
+    -------
+    np.ndarray
+        ECEF positions, same shape as r_eci
+    """
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    x, y = r_eci[..., 0], r_eci[..., 1]
+    r_ecef = np.empty_like(r_eci)
+    r_ecef[..., 0] = cos_t * x + sin_t * y
+    r_ecef[..., 1] = cos_t * y - sin_t * x
+    r_ecef[..., 2] = r_eci[..., 2]
+    return r_ecef
+
+
+# ============================================================================
+# GEODETIC COORDINATES
+# ============================================================================
+
+def geodetic_to_ecef(lat: np.ndarray, lon: np.ndarray,
+                     alt: np.ndarray = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ECEF position and local "up" unit vector of WGS84 geodetic points.
+
+    Parameters
+    ----------
+    lat, lon : np.ndarray
+        Geodetic latitude and longitude [rad]
+    alt : np.ndarray
+        Height above the ellipsoid [m]
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (position [m], up), each of shape broadcast(lat, lon, alt) + (3,).
+        Up is the ellipsoid normal, the direction elevation is measured from.
+    """
+    lat, lon, alt = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64)
+                                          for x in (lat, lon, alt)))
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    N = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sin_lat**2)   # prime-vertical radius
+    up = np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), sin_lat], axis=-1)
+    position = np.stack([(N + alt) * up[..., 0], (N + alt) * up[..., 1],
+                         (N * (1.0 - WGS84_E2) + alt) * sin_lat], axis=-1)
+    return position, up
+
+
+def ecef_to_geodetic(r_ecef: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    WGS84 geodetic latitude, longitude [rad] and height [m] of ECEF positions.
+
+    Heikkinen (1982) closed form: exact to round-off (~1e-9 m) for anything
+    more than a few km from Earth's center, with no iteration.
+
+    Parameters
+    ----------
+    r_ecef : np.ndarray
+        Positions [m], shape (..., 3)
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        (lat, lon, alt), each of shape r_ecef.shape[:-1]; lon in (-pi, pi]
+    """
+    a, b, e2 = WGS84_A, WGS84_B, WGS84_E2
+    x, y, z = r_ecef[..., 0], r_ecef[..., 1], r_ecef[..., 2]
+
+    p2 = x*x + y*y
+    p = np.sqrt(p2)
+    z2 = z*z
+
+    F = 54.0 * b*b * z2
+    G = p2 + (1.0 - e2) * z2 - e2 * (a*a - b*b)
+    c = e2*e2 * F * p2 / G**3
+    s = np.cbrt(1.0 + c + np.sqrt(c*c + 2.0*c))
+    k = s + 1.0 + 1.0/s
+    P = F / (3.0 * k*k * G*G)
+    Q = np.sqrt(1.0 + 2.0 * e2*e2 * P)
+    r0 = (-P * e2 * p / (1.0 + Q)
+          + np.sqrt(0.5*a*a * (1.0 + 1.0/Q) - P * (1.0 - e2) * z2 / (Q * (1.0 + Q)) - 0.5*P*p2))
+    d = p - e2 * r0
+    U = np.sqrt(d*d + z2)
+    V = np.sqrt(d*d + (1.0 - e2) * z2)
+    z0 = b*b * z / (a * V)
+
+    lat = np.arctan2(z + WGS84_EP2 * z0, p)
+    lon = np.arctan2(y, x)
+    alt = U * (1.0 - b*b / (a * V))
+    return lat, lon, alt
+
+
+def subsatellite_points(r_eci: np.ndarray, jd_ut1: float,
+                        seconds: np.ndarray = 0.0,
+                        degrees: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sub-satellite (lat, lon) and height for ECI positions at given epochs.
+
+    Parameters
+    ----------
+    r_eci : np.ndarray
+        Positions [m], shape (..., T, 3), or (N, 3) with a scalar epoch
+    jd_ut1 : float
+        Julian date (UT1) of the reference epoch
+    seconds : np.ndarray
+        Offsets from jd_ut1 [s], shape (T,) (or a scalar)
+    degrees : bool
+        Return lat/lon in degrees (default) instead of radians
+
+    Returns
+    -------
+    (lat, lon, alt)
+        Arrays of shape r_eci.shape[:-1]
+    """
+    theta = earth_rotation_angle(jd_ut1, seconds)
+    lat, lon, alt = ecef_to_geodetic(eci_to_ecef(np.asarray(r_eci, dtype=np.float64), theta))
+    if degrees:
+        lat, lon = np.degrees(lat), np.degrees(lon)
+    return lat, lon, alt
+
+
+# ============================================================================
+# GROUND TRACKS
+# ============================================================================
+
+def ground_track_chunks(r0: np.ndarray, v0: np.ndarray, times: np.ndarray,
+                        jd_ut1: float = J2000_JD, mu: float = MU_EARTH,
+                        chunk_objects: int = CHUNK_OBJECTS,
+                        chunk_epochs: int = CHUNK_EPOCHS, method: str = 'kepler',
+                        degrees: bool = True
+                        ) -> Iterator[Tuple[slice, slice, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Stream ground tracks one (objects x epochs) block at a time.
+
+    Parameters
+    ----------
+    r0, v0 : np.ndarray
+        ECI states at the reference epoch, shape (N, 3) [m, m/s]
+    times : np.ndarray
+        Offsets from the reference epoch, shape (T,) [s]
+    jd_ut1 : float
+        Julian date (UT1) of the reference epoch (sets where the Earth is)
+    mu : float
+        Gravitational parameter [m^3/s^2]
+    chunk_objects, chunk_epochs, method
+        Passed through to `propagate_chunks`
+    degrees : bool
+        Latitude/longitude in degrees (default) or radians
+
+    Yields
+    ------
+    (object_slice, epoch_slice, lat, lon, alt)
+        Which part of the (N, T) grid this is, and its coordinates, each of
+        shape (len(object_slice), len(epoch_slice))
+    """
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    theta = earth_rotation_angle(jd_ut1, times)
+
+    for objs, epochs, r, _ in propagate_chunks(r0, v0, times, mu, chunk_objects,
+                                               chunk_epochs, method):
+        lat, lon, alt = ecef_to_geodetic(eci_to_ecef(r, theta[epochs]))
+        if degrees:
+            lat, lon = np.degrees(lat), np.degrees(lon)
+        yield objs, epochs, lat, lon, alt
+
+
+def ground_tracks(r0: np.ndarray, v0: np.ndarray, times: np.ndarray,
+                  jd_ut1: float = J2000_JD, mu: float = MU_EARTH,
+                  out: Optional[np.ndarray] = None, dtype=np.float32,
+                  **chunk_kwargs) -> np.ndarray:
+    """
+    Whole ground-track grid as one (N, T, 3) array of (lat_deg, lon_deg, alt_m).
+
+    Parameters
+    ----------
+    r0, v0, times, jd_ut1, mu
+        As for `ground_track_chunks`
+    out : np.ndarray, optional
+        Where to write the grid — e.g. a `np.lib.format.open_memmap` so the
+        result streams to disk. Allocated if not given.
+    dtype
+        Element type when `out` is allocated. float32 holds lat/lon to
+        ~1e-5 deg (about 1 m on the ground) and altitude to well under a
+        meter at LEO (~2 m at GEO), at half the size of float64.
+    **chunk_kwargs
+        chunk_objects, chunk_epochs, method
+
+    Returns
+    -------
+    np.ndarray
+        out
+    """
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    if out is None:
+        out = np.empty((len(np.atleast_2d(r0)), len(times), 3), dtype=dtype)
+    for objs, epochs, lat, lon, alt in ground_track_chunks(r0, v0, times, jd_ut1, mu,
+                                                           **chunk_kwargs):
+        block = out[objs, epochs]
+        block[..., 0] = lat
+        block[..., 1] = lon
+        block[..., 2] = alt
+    return out
+
+
+def main(argv=None):
+    """Ground tracks for every state in a file, streamed into an .npy file."""
+    import argparse
+    import time
+    from state_io import read_state_chunks
+
+    parser = argparse.ArgumentParser(
+        description="Write (lat_deg, lon_deg, alt_m) ground tracks to an (N, T, 3) .npy file.")
+    parser.add_argument('states', help="CSV or raw float64 state file (see state_io)")
+    parser.add_argument('output', help=".npy file to write (memory-mapped)")
+    parser.add_argument('--format', choices=('csv', 'bin'))
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--step', type=float, default=10.0, help="time step [s]")
+    parser.add_argument('--jd', type=float, default=J2000_JD,
+                        help="Julian date (UT1) of the states (default: J2000)")
+    parser.add_argument('--method', choices=('kepler', 'universal'), default='kepler')
+    args = parser.parse_args(argv)
+
+    blocks = list(read_state_chunks(args.states, args.format))
+    r0 = np.concatenate([b[0] for b in blocks])
+    v0 = np.concatenate([b[1] for b in blocks])
+    times = np.arange(0.0, args.hours * 3600.0 + 0.5 * args.step, args.step)
+
+    out = np.lib.format.open_memmap(args.output, mode='w+', dtype=np.float32,
+                                    shape=(len(r0), len(times), 3))
+    start = time.perf_counter()
+    ground_tracks(r0, v0, times, args.jd, out=out, method=args.method)
+    out.flush()
+    elapsed = time.perf_counter() - start
+    points = len(r0) * len(times)
+    print(f"{len(r0)} objects x {len(times)} epochs = {points} points "
+          f"in {elapsed:.1f} s ({points / elapsed / 1e6:.1f} M points/s)")
+
+
+if __name__ == "__main__":
+    main()
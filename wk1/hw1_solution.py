@@ -300,6 +300,7 @@ def write_results_to_file(filename: str, test_cases: list,
     Dump results to a text file — formatted to match what the professor expects.
 
     This makes it easy to submit or compare against the provided solution.
+    For CSV or JSON-lines output see `results_export.write_results`.
 
     Parameters
     ----------
@@ -312,48 +313,118 @@ def write_results_to_file(filename: str, test_cases: list,
     mu : float
         Gravitational parameter we used
     """
-    with open(filename, 'w') as fid:
-        fid.write("Homework 1 Results\n")
-        fid.write("=" * 60 + "\n")
-        fid.write(f"mu: {mu:.9e} m^3/s^2\n\n")
-
-        for case, elements in zip(test_cases, all_elements):
-            r = case['r']
-            v = case['v']
-            display = elements.to_degrees()
-
-            # Input vectors
-            fid.write(f"{case['name']}\n")
-            fid.write(f"r:  ( {r[0]:16.8f}, {r[1]:16.8f}, {r[2]:16.8f}) m\n")
-            fid.write(f"rd: ( {v[0]:16.8f}, {v[1]:16.8f}, {v[2]:16.8f}) m/sec\n\n")
-
-            # Computed elements — trying to match the professor's formatting
-            fid.write(f"Keplerian Elements for {case['name']}\n")
-            fid.write(f"        a:    {display['a_m']:16.8f} m\n")
-            fid.write(f"        e:    {display['e']:16.8f}\n")
-            fid.write(f"        inc:  {display['inc_deg']:16.8f} deg\n")
-            fid.write(f"        raan: {display['raan_deg']:16.8f} deg\n")
-            fid.write(f"        wp:   {display['omega_deg']:16.8f} deg\n")
-            fid.write(f"        nu:   {display['nu_deg']:16.8f} deg\n")
-            fid.write(f"        TP:   {display['period_s']:16.8f} sec\n")
-            fid.write(f"        rp:   {display['r_periapsis_m']:16.8f} m\n")
-            fid.write(f"        ra:   {display['r_apoapsis_m']:16.8f} m\n")
-            fid.write("\n\n")
+    # The formatting lives in results_export, which does whole blocks of
+    # orbits per write — same bytes, much faster for big batches
+    from results_export import write_test_case_results
+    write_test_case_results(filename, test_cases, all_elements, mu)
 
 # ============================================================================
 # MAIN EXECUTION
 # ============================================================================
 
-def main():
+def main(argv=None):
     """
     Run through all four homework test vectors and compute their orbital elements.
     Results go to both the console and a text file for easy submission.
+
+    Pass a state file instead (CSV or raw float64, see `state_io`) to stream
+    it through the batch conversion rather than using the built-in vectors:
+
+        python hw1_solution.py states.bin --output elements.csv
+
+    With --incremental, the file is a catalog snapshot (object IDs and epochs
+    with the states) and only new or changed objects are recomputed and
+    patched into an existing output store:
+
+        python hw1_solution.py snapshot.bin --incremental catalog/
+
+    --instrument prints per-stage timings at the end, and --profile /
+    --stack-samples dump cProfile stats or flame-graph stacks for the run
+    (see `instrumentation`).
     """
+    import argparse
+    import contextlib
+    import instrumentation
+
+    parser = argparse.ArgumentParser(
+        description="Convert ECI state vectors to Keplerian elements.")
+    parser.add_argument('states', nargs='?',
+                        help="CSV or raw float64 state file (omit to run the homework vectors)")
+    parser.add_argument('--format', choices=('csv', 'bin'),
+                        help="state file format (default: guess from extension)")
+    parser.add_argument('--chunk-size', type=int, default=100_000,
+                        help="states converted per chunk (bounds memory use)")
+    parser.add_argument('--output', help="write elements to this CSV file")
+    parser.add_argument('--archive',
+                        help="write a memory-mapped binary element archive to this path")
+    parser.add_argument('--incremental', metavar='STORE',
+                        help="treat the state file as a catalog snapshot (id, epoch, r, v) "
+                             "and update this catalog store, recomputing only new or "
+                             "changed objects (see catalog_update)")
+    parser.add_argument('--instrument', action='store_true',
+                        help="print per-stage timings, counts and throughput at the end")
+    parser.add_argument('--allocations', action='store_true',
+                        help="with --instrument, also track allocations (slower)")
+    parser.add_argument('--metrics', help="write the stage timings as JSON to this path")
+    parser.add_argument('--profile', help="dump cProfile stats (pstats format) to this path")
+    parser.add_argument('--stack-samples',
+                        help="write flame-graph folded stack samples to this path")
+    args = parser.parse_args(argv)
+    if args.incremental and not args.states:
+        parser.error("--incremental needs a snapshot file")
+
+    recorder = None
+    if args.instrument or args.metrics:
+        recorder = instrumentation.enable(allocations=args.allocations)
+    with contextlib.ExitStack() as profilers:
+        if args.profile:
+            profilers.enter_context(instrumentation.profiled(args.profile))
+        if args.stack_samples:
+            profilers.enter_context(instrumentation.StackSampler(args.stack_samples))
+        try:
+            _run(args)
+        finally:
+            instrumentation.disable()
+
+    if recorder is not None:
+        if args.instrument:
+            print("\n" + recorder.report())
+        if args.metrics:
+            instrumentation.write_report(args.metrics, recorder)
+    if args.profile:
+        print(f"cProfile stats written to: {args.profile}")
+    if args.stack_samples:
+        print(f"Stack samples written to: {args.stack_samples}")
+
+
+def _run(args) -> None:
+    """The conversion itself, for `main` (built-in vectors or a state file)."""
     import os
+    from instrumentation import stage
 
     # Earth's gravitational parameter — using the WGS84 value given in the homework
     MU_EARTH = 3.986004418e14  # m^3/s^2
 
+    if args.incremental:
+        # Incremental mode — only objects that changed since the last snapshot
+        from catalog_update import run_incremental
+        summary = run_incremental(args.states, args.incremental, MU_EARTH, fmt=args.format)
+        print(f"Updated {args.incremental}: {summary.format()}")
+        return
+
+    if args.states:
+        # Streaming mode — memory stays bounded by the chunk size
+        from state_io import run_conversion
+        count = run_conversion(args.states, MU_EARTH, output=args.output,
+                               fmt=args.format, chunk_size=args.chunk_size,
+                               archive=args.archive)
+        print(f"Converted {count} states from {args.states}")
+        if args.output:
+            print(f"Elements written to: {args.output}")
+        if args.archive:
+            print(f"Element archive written to: {args.archive}")
+        return
+
     # The four state vectors we need to convert (all in meters and m/s)
     test_cases = [
         {
@@ -389,11 +460,13 @@ def main():
 
     for case in test_cases:
         # Do the actual conversion
-        elements = state_to_keplerian(case['r'], case['v'], MU_EARTH)
+        with stage('convert', 1):
+            elements = state_to_keplerian(case['r'], case['v'], MU_EARTH)
         all_elements.append(elements)
 
         # Run verification checks — these should all be basically zero
-        checks = verify_elements(case['r'], case['v'], elements, MU_EARTH)
+        with stage('verify', 1):
+            checks = verify_elements(case['r'], case['v'], elements, MU_EARTH)
 
         # Show results in the console
         print_results(case['name'], case['r'], case['v'], elements, checks)
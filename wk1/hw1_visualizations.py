@@ -13,14 +13,22 @@ Generates 3D plots of orbits computed from state vectors, showing:
 Author: Student Implementation
 """
 
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-from typing import Tuple, Optional
+from typing import TYPE_CHECKING, Tuple, Optional
 from dataclasses import dataclass
+from functools import lru_cache
 
 # Import the solution module for orbital element computation
 from hw1_solution import state_to_keplerian, KeplerianElements
+# The geometry lives in the NumPy-only core; re-exported here for old callers
+from orbit_geometry import generate_orbit_points, get_node_positions, keplerian_to_position
+from instrumentation import stage
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+    from mpl_toolkits.mplot3d import Axes3D
 
 # ============================================================================
 # CONSTANTS
@@ -31,106 +39,62 @@ R_EARTH = 6.371e6  # Earth's mean radius [m]
 
 
 # ============================================================================
-# COORDINATE TRANSFORMATIONS
+# LAZY MATPLOTLIB
 # ============================================================================
+# matplotlib + mplot3d take ~0.5 s to import and pyplot wants a display, so
+# nothing here imports them until a plot is actually drawn.
 
-def keplerian_to_position(elements: KeplerianElements, nu: float) -> np.ndarray:
-    """
-    Convert Keplerian elements to position vector at a given true anomaly.
-
-    Parameters
-    ----------
-    elements : KeplerianElements
-        Orbital elements (uses a, e, inc, raan, omega)
-    nu : float
-        True anomaly [rad]
-
-    Returns
-    -------
-    np.ndarray
-        Position vector in ECI frame [m]
-    """
-    # Semi-latus rectum
-    p = elements.a * (1 - elements.e**2)
-
-    # Radius at this true anomaly
-    r = p / (1 + elements.e * np.cos(nu))
+def use_headless() -> None:
+    """Force the non-interactive Agg backend (call before the first plot)."""
+    import matplotlib
+    matplotlib.use('Agg')
 
-    # Position in perifocal (PQW) frame
-    # P points to periapsis, Q is 90 deg ahead in orbital plane
-    r_pqw = r * np.array([np.cos(nu), np.sin(nu), 0.0])
 
-    # Rotation matrix from perifocal to ECI
-    # R = R3(-RAAN) @ R1(-inc) @ R3(-omega)
-    cos_O = np.cos(elements.raan)
-    sin_O = np.sin(elements.raan)
-    cos_i = np.cos(elements.inc)
-    sin_i = np.sin(elements.inc)
-    cos_w = np.cos(elements.omega)
-    sin_w = np.sin(elements.omega)
+def _has_display() -> bool:
+    if sys.platform.startswith('linux'):
+        return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return True
 
-    # Combined rotation matrix (perifocal to ECI)
-    R = np.array([
-        [cos_O*cos_w - sin_O*sin_w*cos_i, -cos_O*sin_w - sin_O*cos_w*cos_i,  sin_O*sin_i],
-        [sin_O*cos_w + cos_O*sin_w*cos_i, -sin_O*sin_w + cos_O*cos_w*cos_i, -cos_O*sin_i],
-        [sin_w*sin_i,                      cos_w*sin_i,                       cos_i]
-    ])
 
-    return R @ r_pqw
-
-
-def generate_orbit_points(elements: KeplerianElements,
-                          num_points: int = 360) -> np.ndarray:
+def _pyplot():
     """
-    Generate position vectors around the entire orbit.
-
-    Parameters
-    ----------
-    elements : KeplerianElements
-        Orbital elements
-    num_points : int
-        Number of points to generate around the orbit
+    Import pyplot on first use.
 
-    Returns
-    -------
-    np.ndarray
-        Array of shape (num_points, 3) with position vectors [m]
+    With no display (batch jobs, CI, ssh) and no backend picked explicitly
+    via MPLBACKEND, switch to Agg first so figures can still be saved.
     """
-    nu_values = np.linspace(0, 2*np.pi, num_points)
-    positions = np.array([keplerian_to_position(elements, nu) for nu in nu_values])
-    return positions
+    if 'matplotlib.pyplot' not in sys.modules and not os.environ.get('MPLBACKEND') \
+            and not _has_display():
+        use_headless()
+    import matplotlib.pyplot as plt
+    import mpl_toolkits.mplot3d  # noqa: F401 — registers the '3d' projection
+    return plt
 
 
-def get_node_positions(elements: KeplerianElements) -> Tuple[np.ndarray, np.ndarray]:
-    """
-    Get positions of ascending and descending nodes.
+# ============================================================================
+# PLOTTING FUNCTIONS
+# ============================================================================
 
-    Returns
-    -------
-    Tuple[np.ndarray, np.ndarray]
-        (ascending_node_position, descending_node_position) in ECI [m]
+@lru_cache(maxsize=8)
+def earth_sphere_mesh(n_lon: int = 30, n_lat: int = 20) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    # True anomaly at ascending node: nu = -omega (or 2*pi - omega)
-    nu_ascending = -elements.omega
-    if nu_ascending < 0:
-        nu_ascending += 2*np.pi
+    Unit-sphere surface grid (x, y, z), built once per resolution and cached.
 
-    # True anomaly at descending node: nu = pi - omega
-    nu_descending = np.pi - elements.omega
-    if nu_descending < 0:
-        nu_descending += 2*np.pi
-
-    pos_ascending = keplerian_to_position(elements, nu_ascending)
-    pos_descending = keplerian_to_position(elements, nu_descending)
+    The arrays are read-only since every caller shares them — scale a copy
+    (``R_EARTH * scale * x`` already makes one).
+    """
+    u = np.linspace(0, 2*np.pi, n_lon)
+    v = np.linspace(0, np.pi, n_lat)
 
-    return pos_ascending, pos_descending
+    x = np.outer(np.cos(u), np.sin(v))
+    y = np.outer(np.sin(u), np.sin(v))
+    z = np.outer(np.ones(np.size(u)), np.cos(v))
+    for arr in (x, y, z):
+        arr.flags.writeable = False
+    return x, y, z
 
 
-# ============================================================================
-# PLOTTING FUNCTIONS
-# ============================================================================
-
-def create_earth_sphere(ax: Axes3D, scale: float = 1.0,
+def create_earth_sphere(ax: 'Axes3D', scale: float = 1.0,
                         alpha: float = 0.3) -> None:
     """
     Add a wireframe Earth sphere to the 3D axes.
@@ -144,18 +108,14 @@ def create_earth_sphere(ax: Axes3D, scale: float = 1.0,
     alpha : float
         Transparency of the sphere
     """
-    u = np.linspace(0, 2*np.pi, 30)
-    v = np.linspace(0, np.pi, 20)
+    x, y, z = earth_sphere_mesh()
+    radius = R_EARTH * scale
 
-    x = R_EARTH * scale * np.outer(np.cos(u), np.sin(v))
-    y = R_EARTH * scale * np.outer(np.sin(u), np.sin(v))
-    z = R_EARTH * scale * np.outer(np.ones(np.size(u)), np.cos(v))
-
-    ax.plot_surface(x, y, z, color='royalblue', alpha=alpha,
+    ax.plot_surface(radius * x, radius * y, radius * z, color='royalblue', alpha=alpha,
                     linewidth=0, antialiased=True)
 
 
-def plot_reference_axes(ax: Axes3D, length: float) -> None:
+def plot_reference_axes(ax: 'Axes3D', length: float) -> None:
     """
     Plot ECI reference axes (X, Y, Z).
 
@@ -177,7 +137,7 @@ def plot_reference_axes(ax: Axes3D, length: float) -> None:
               linewidth=2, label='Z (North Pole)')
 
 
-def plot_single_orbit(ax: Axes3D, elements: KeplerianElements,
+def plot_single_orbit(ax: 'Axes3D', elements: KeplerianElements,
                       r_current: np.ndarray, name: str,
                       color: str, scale: float = 1e-6) -> None:
     """
@@ -228,7 +188,7 @@ def plot_single_orbit(ax: Axes3D, elements: KeplerianElements,
                    edgecolors='black', linewidths=1, zorder=5)
 
 
-def visualize_all_orbits(test_cases: list, figsize: Tuple[int, int] = (16, 12)) -> plt.Figure:
+def visualize_all_orbits(test_cases: list, figsize: Tuple[int, int] = (16, 12)) -> 'Figure':
     """
     Create a comprehensive visualization of all orbits.
 
@@ -244,6 +204,7 @@ def visualize_all_orbits(test_cases: list, figsize: Tuple[int, int] = (16, 12))
     plt.Figure
         Matplotlib figure object
     """
+    plt = _pyplot()
     fig = plt.figure(figsize=figsize)
 
     # Color palette for different orbits
@@ -359,7 +320,55 @@ def visualize_all_orbits(test_cases: list, figsize: Tuple[int, int] = (16, 12))
     return fig
 
 
-def visualize_individual_orbits(test_cases: list) -> plt.Figure:
+def plot_orbit_detail(ax: 'Axes3D', elements: KeplerianElements,
+                      r_current: np.ndarray, v_current: np.ndarray, name: str,
+                      color: str, scale: float = 1e-6) -> None:
+    """
+    One orbit on its own axes: Earth, the orbit with its markers, the velocity
+    arrow, a title with the key elements and a marker legend.
+
+    This is one panel of `visualize_individual_orbits`, and what the batch
+    renderer in `orbit_images` draws for each object.
+    """
+    # Set axis limit based on this orbit's apoapsis
+    axis_limit = elements.r_apoapsis * scale * 1.2
+
+    # Add Earth (scaled appropriately for each orbit)
+    create_earth_sphere(ax, scale=scale, alpha=0.5)
+
+    # Plot the orbit
+    plot_single_orbit(ax, elements, r_current, name, color, scale)
+
+    # Add velocity vector at current position
+    v_scale = axis_limit * 0.15 / np.linalg.norm(v_current)  # Scale for visibility
+    r_scaled = r_current * scale
+    v_scaled = v_current * v_scale
+    ax.quiver(*r_scaled, *v_scaled, color='cyan', arrow_length_ratio=0.2,
+              linewidth=2, label='Velocity')
+
+    # Title with key parameters
+    title = (f"{name}\n"
+            f"a={elements.a/1000:.0f} km, e={elements.e:.4f}, "
+            f"i={np.degrees(elements.inc):.1f}°")
+    ax.set_title(title, fontsize=10, fontweight='bold')
+
+    ax.set_xlabel('X [Mm]', fontsize=9)
+    ax.set_ylabel('Y [Mm]', fontsize=9)
+    ax.set_zlabel('Z [Mm]', fontsize=9)
+    ax.set_xlim(-axis_limit, axis_limit)
+    ax.set_ylim(-axis_limit, axis_limit)
+    ax.set_zlim(-axis_limit, axis_limit)
+
+    # Add legend for markers
+    ax.scatter([], [], color=color, marker='o', s=60, label='Current Position')
+    ax.scatter([], [], color=color, marker='^', s=60, label='Periapsis')
+    ax.scatter([], [], color=color, marker='v', s=60, label='Apoapsis')
+    if elements.inc > 0.01:
+        ax.scatter([], [], color='yellow', marker='D', s=40, label='Ascending Node')
+    ax.legend(loc='upper left', fontsize=7)
+
+
+def visualize_individual_orbits(test_cases: list) -> 'Figure':
     """
     Create individual detailed plots for each orbit.
 
@@ -373,51 +382,15 @@ def visualize_individual_orbits(test_cases: list) -> plt.Figure:
     plt.Figure
         Matplotlib figure object
     """
+    plt = _pyplot()
     fig = plt.figure(figsize=(16, 12))
     colors = ['crimson', 'forestgreen', 'darkorange', 'purple']
     scale = 1e-6
 
     for idx, (case, color) in enumerate(zip(test_cases, colors)):
         elements = state_to_keplerian(case['r'], case['v'], MU_EARTH)
-
         ax = fig.add_subplot(2, 2, idx + 1, projection='3d')
-
-        # Set axis limit based on this orbit's apoapsis
-        axis_limit = elements.r_apoapsis * scale * 1.2
-
-        # Add Earth (scaled appropriately for each orbit)
-        create_earth_sphere(ax, scale=scale, alpha=0.5)
-
-        # Plot the orbit
-        plot_single_orbit(ax, elements, case['r'], case['name'], color, scale)
-
-        # Add velocity vector at current position
-        v_scale = axis_limit * 0.15 / np.linalg.norm(case['v'])  # Scale for visibility
-        r_scaled = case['r'] * scale
-        v_scaled = case['v'] * v_scale
-        ax.quiver(*r_scaled, *v_scaled, color='cyan', arrow_length_ratio=0.2,
-                  linewidth=2, label='Velocity')
-
-        # Title with key parameters
-        title = (f"{case['name']}\n"
-                f"a={elements.a/1000:.0f} km, e={elements.e:.4f}, "
-                f"i={np.degrees(elements.inc):.1f}°")
-        ax.set_title(title, fontsize=10, fontweight='bold')
-
-        ax.set_xlabel('X [Mm]', fontsize=9)
-        ax.set_ylabel('Y [Mm]', fontsize=9)
-        ax.set_zlabel('Z [Mm]', fontsize=9)
-        ax.set_xlim(-axis_limit, axis_limit)
-        ax.set_ylim(-axis_limit, axis_limit)
-        ax.set_zlim(-axis_limit, axis_limit)
-
-        # Add legend for markers
-        ax.scatter([], [], color=color, marker='o', s=60, label='Current Position')
-        ax.scatter([], [], color=color, marker='^', s=60, label='Periapsis')
-        ax.scatter([], [], color=color, marker='v', s=60, label='Apoapsis')
-        if elements.inc > 0.01:
-            ax.scatter([], [], color='yellow', marker='D', s=40, label='Ascending Node')
-        ax.legend(loc='upper left', fontsize=7)
+        plot_orbit_detail(ax, elements, case['r'], case['v'], case['name'], color, scale)
 
     plt.tight_layout()
     return fig
@@ -460,16 +433,18 @@ def main():
 
     # Generate combined view
     print("\nGenerating combined orbit visualization...")
-    fig1 = visualize_all_orbits(test_cases)
-    fig1.savefig('hw1_orbits_combined.png', dpi=150, bbox_inches='tight',
-                 facecolor='white', edgecolor='none')
+    with stage('plot', len(test_cases)):
+        fig1 = visualize_all_orbits(test_cases)
+        fig1.savefig('hw1_orbits_combined.png', dpi=150, bbox_inches='tight',
+                     facecolor='white', edgecolor='none')
     print("  Saved: hw1_orbits_combined.png")
 
     # Generate individual orbit views
     print("\nGenerating individual orbit visualizations...")
-    fig2 = visualize_individual_orbits(test_cases)
-    fig2.savefig('hw1_orbits_individual.png', dpi=150, bbox_inches='tight',
-                 facecolor='white', edgecolor='none')
+    with stage('plot', len(test_cases)):
+        fig2 = visualize_individual_orbits(test_cases)
+        fig2.savefig('hw1_orbits_individual.png', dpi=150, bbox_inches='tight',
+                     facecolor='white', edgecolor='none')
     print("  Saved: hw1_orbits_individual.png")
 
     print("\n" + "=" * 70)
@@ -481,9 +456,10 @@ def main():
     print("  ▼ Triangle  = Apoapsis (farthest point)")
     print("  ◆ Diamond   = Ascending node")
     print("  → Arrow     = Velocity vector (individual plots)")
-    print("\nDisplaying plots...")
-
-    plt.show()
+    plt = _pyplot()
+    if plt.get_backend().lower() != 'agg':   # headless: the PNGs are all we get
+        print("\nDisplaying plots...")
+        plt.show()
 
 
 if __name__ == "__main__":
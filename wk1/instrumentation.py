@@ -0,0 +1,296 @@
+"""
+Opt-In Instrumentation and Profiling Hooks
+SPCE 5025 - Fundamentals of Astronautics
+
+Lightweight timing for the conversion pipeline, off by default. Code marks
+its stages like this:
+
+    with stage('convert', count=len(r)):
+        elements = state_to_keplerian_batch(r, v, mu)
+
+When instrumentation is disabled (the default) `stage` hands back a shared
+do-nothing context manager — one global lookup and one `if` per call, which
+is nothing next to even a small batch. When enabled, each stage name
+accumulates calls, wall time, items processed (hence throughput) and,
+optionally, the bytes allocated inside it via `tracemalloc`.
+
+For finding *where* in the code time goes there are two more tools:
+
+- `profiled(path)`: run a block under cProfile and dump pstats
+  (read it with `python -m pstats path` or snakeviz)
+- `StackSampler(path)`: a background thread samples the main thread's stack
+  every few ms and writes "folded" stacks (one `a;b;c count` line per unique
+  stack), the input format of flamegraph.pl and speedscope
+"""
+
+import cProfile
+import contextlib
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Stage names used by the pipeline, in pipeline order (for the report)
+STAGES = ('ingest', 'convert', 'verify', 'write', 'plot')
+
+DEFAULT_SAMPLE_INTERVAL = 0.005  # [s]
+
+
+# ============================================================================
+# STAGE TIMINGS
+# ============================================================================
+
+@dataclass
+class StageStats:
+    """Accumulated numbers for one stage name."""
+    calls: int = 0
+    seconds: float = 0.0
+    items: int = 0
+    alloc_bytes: int = 0   # net bytes still allocated at stage exit (summed)
+    peak_bytes: int = 0    # largest peak seen inside any one call
+
+    @property
+    def items_per_s(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else 0.0
+
+
+class _NullStage:
+    """What `stage` returns while instrumentation is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, count: int) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+# Module state: None when disabled, otherwise the active recorder
+_recorder: Optional['Recorder'] = None
+
+
+class _Stage:
+    __slots__ = ('recorder', 'name', 'count', 'start', 'mem_start')
+
+    def __init__(self, recorder: 'Recorder', name: str, count: int):
+        self.recorder = recorder
+        self.name = name
+        self.count = count
+
+    def add(self, count: int) -> None:
+        """Count items discovered inside the block (e.g. rows just read)."""
+        self.count += count
+
+    def __enter__(self):
+        if self.recorder.allocations:
+            tracemalloc.reset_peak()
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stats = self.recorder.stats.setdefault(self.name, StageStats())
+        stats.calls += 1
+        stats.seconds += elapsed
+        stats.items += self.count
+        if self.recorder.allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            stats.alloc_bytes += current - self.mem_start
+            stats.peak_bytes = max(stats.peak_bytes, peak - self.mem_start)
+        return False
+
+
+class Recorder:
+    """Stage statistics for one instrumented run."""
+
+    def __init__(self, allocations: bool = False):
+        self.allocations = allocations
+        self.stats: Dict[str, StageStats] = {}
+        self.started = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        stages = {}
+        for name, stats in self.stats.items():
+            stages[name] = dict(asdict(stats), items_per_s=stats.items_per_s)
+        return {'wall_seconds': time.perf_counter() - self.started, 'stages': stages}
+
+    def report(self) -> str:
+        """Plain-text table of the stages, pipeline stages first."""
+        order = [s for s in STAGES if s in self.stats] + \
+                [s for s in self.stats if s not in STAGES]
+        wall = time.perf_counter() - self.started
+        lines = [f"{'stage':<14} {'calls':>7} {'time [s]':>10} {'share':>7} "
+                 f"{'items':>11} {'items/s':>13}"
+                 + (f" {'net [MB]':>9} {'peak [MB]':>9}" if self.allocations else '')]
+        for name in order:
+            s = self.stats[name]
+            line = (f"{name:<14} {s.calls:>7} {s.seconds:10.3f} {s.seconds / wall:7.1%} "
+                    f"{s.items:>11} {s.items_per_s:13.0f}")
+            if self.allocations:
+                line += f" {s.alloc_bytes / 2**20:9.1f} {s.peak_bytes / 2**20:9.1f}"
+            lines.append(line)
+        lines.append(f"{'total wall':<14} {'':>7} {wall:10.3f}")
+        return '\n'.join(lines)
+
+
+def enable(allocations: bool = False) -> Recorder:
+    """
+    Start recording stages (replacing any previous recorder).
+
+    allocations=True also starts `tracemalloc`, which costs real time
+    (NumPy-heavy code slows down by ~10-30%), so it's a separate switch.
+    """
+    global _recorder
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _recorder = Recorder(allocations)
+    return _recorder
+
+
+def disable() -> Optional[Recorder]:
+    """Stop recording; returns the recorder that was active (if any)."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None and recorder.allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return recorder
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def current() -> Optional[Recorder]:
+    return _recorder
+
+
+def stage(name: str, count: int = 0):
+    """Context manager timing one pass through a pipeline stage."""
+    if _recorder is None:
+        return _NULL_STAGE
+    return _Stage(_recorder, name, count)
+
+
+def timed_iter(name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """
+    Charge the time spent *producing* each item to `name` — for generators
+    like the chunk readers, where the work happens inside next().
+
+    Items with a length count as that many items (a chunk of rows).
+    """
+    if _recorder is None:
+        return iter(iterable)
+    return _timed_iter(name, iter(iterable))
+
+
+def _timed_iter(name: str, iterator: Iterator[T]) -> Iterator[T]:
+    while True:
+        with stage(name) as s:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            s.add(len(item[0]) if isinstance(item, tuple) else
+                  len(item) if hasattr(item, '__len__') else 1)
+        yield item
+
+
+@contextlib.contextmanager
+def instrumented(allocations: bool = False):
+    """`with instrumented() as rec: ...` — enable for one block, then print-ready."""
+    recorder = enable(allocations)
+    try:
+        yield recorder
+    finally:
+        disable()
+
+
+# ============================================================================
+# PROFILERS
+# ============================================================================
+
+@contextlib.contextmanager
+def profiled(path: str):
+    """Run the block under cProfile and dump the stats to `path` (pstats format)."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Sample one thread's Python stack at a fixed interval and write folded stacks.
+
+    Use as a context manager around the code of interest:
+
+        with StackSampler('run.folded'):
+            run_conversion(...)
+
+    then `flamegraph.pl run.folded > run.svg`, or drop the file on speedscope.
+    Time spent inside C code (NumPy ufuncs) is charged to the Python line
+    that called it, which is exactly what we want for finding hot spots.
+    """
+
+    def __init__(self, path: str, interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 thread_id: Optional[int] = None):
+        self.path = path
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self) -> 'StackSampler':
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        with open(self.path, 'w') as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+    def __enter__(self) -> 'StackSampler':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def write_report(path: str, recorder: Recorder) -> None:
+    """Save a recorder's numbers as JSON."""
+    with open(path, 'w') as fh:
+        json.dump(recorder.to_dict(), fh, indent=1)
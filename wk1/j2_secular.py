@@ -0,0 +1,233 @@
+"""
+J2 Secular Propagation
+SPCE 5025 - Fundamentals of Astronautics
+
+Two-body elements hold still; real orbits don't. Earth's oblateness (J2)
+makes the node regress, the line of apsides rotate and the mean motion
+shift — about 5 deg/day of node regression for a LEO, which is why a pure
+Keplerian propagation drifts off within hours. The secular (orbit-averaged)
+part of that is three constant rates per orbit:
+
+    raan_dot  = -3/2 n J2 (R/p)^2 cos i
+    omega_dot =  3/4 n J2 (R/p)^2 (5 cos^2 i - 1)
+    M_dot     =  n + 3/4 n J2 (R/p)^2 sqrt(1 - e^2) (3 cos^2 i - 1)
+
+Rates depend only on a, e and inc, so they're computed once per orbit and
+cached next to the elements (`ElementStore.derived['j2']`, recomputed only if
+those columns change). Propagating to an epoch is then raan, omega and M
+plus rate * t, one Kepler solve, and the usual perifocal-to-ECI geometry,
+written with the argument of latitude u = omega + nu so the per-epoch
+rotation is just cos/sin of raan and u.
+
+Short-period J2 terms (a few km in LEO) are not modeled: the states are
+mean elements advanced in time, not osculating ones. The mode plugs into
+`propagation` as method='j2' (from states) and into `propagate_elements`
+(from elements, reusing the cached rates).
+"""
+
+import numpy as np
+from typing import Dict, Tuple
+
+from batch_conversion import SMALL, state_to_keplerian_batch
+from element_store import FIELD_INDEX, ElementStore
+from kepler_equation import solve_kepler, true_to_mean
+from orbit_geometry import ElementsLike, perifocal_rotation
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+J2_EARTH = 1.08262668e-3   # EGM96 / WGS84 value
+R_EQUATOR = 6378137.0      # [m], the radius J2 is normalized to
+
+# Rows of an `ElementStore` block the rates depend on
+RATE_ROWS = [FIELD_INDEX['a'], FIELD_INDEX['e'], FIELD_INDEX['inc']]
+
+RATE_NAMES = ('raan_dot', 'omega_dot', 'mean_motion')
+
+
+# ============================================================================
+# SECULAR RATES
+# ============================================================================
+
+def secular_rates(a: np.ndarray, e: np.ndarray, inc: np.ndarray, mu: float = MU_EARTH,
+                  j2: float = J2_EARTH, r_eq: float = R_EQUATOR) -> np.ndarray:
+    """
+    J2 secular rates of RAAN, argument of periapsis and mean anomaly.
+
+    Parameters
+    ----------
+    a, e, inc : np.ndarray
+        Semi-major axis [m], eccentricity, inclination [rad] (elliptic orbits)
+    mu, j2, r_eq
+        Gravitational parameter [m^3/s^2], J2 and its reference radius [m]
+
+    Returns
+    -------
+    np.ndarray
+        Shape (3, N): raan_dot, omega_dot and the perturbed mean motion
+        M_dot, all in [rad/s] (row order follows RATE_NAMES)
+    """
+    a, e, inc = (np.asarray(x, dtype=np.float64) for x in (a, e, inc))
+    n = np.sqrt(mu / a**3)
+    one_minus_e2 = 1.0 - e**2
+    k = 0.75 * n * j2 * (r_eq / (a * one_minus_e2))**2
+    cos2_i = np.cos(inc)**2
+
+    rates = np.empty((3,) + np.shape(n))
+    rates[0] = -2.0 * k * np.cos(inc)
+    rates[1] = k * (5.0 * cos2_i - 1.0)
+    rates[2] = n + k * np.sqrt(one_minus_e2) * (3.0 * cos2_i - 1.0)
+    return rates
+
+
+class RateCache:
+    """
+    J2 rates for every column of one (9, N) element block.
+
+    Kept in `ElementStore.derived['j2']`. Holds a copy of the a, e, inc rows
+    the rates came from and recomputes the whole block if any of them (or
+    the constants) changed — checking is a compare of 3N floats, cheaper
+    than the sqrt/cos work it saves.
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self.source = None
+        self.params = None
+        self.rates = None
+
+    def lookup(self, index, mu: float, j2: float, r_eq: float) -> np.ndarray:
+        source = self.data[RATE_ROWS]
+        params = (mu, j2, r_eq)
+        if (self.rates is None or params != self.params
+                or not np.array_equal(source.view(np.uint64), self.source.view(np.uint64))):
+            self.rates = secular_rates(source[0], source[1], source[2], mu, j2, r_eq)
+            self.source, self.params = source, params
+        return self.rates if index is None else self.rates[:, index]
+
+
+def j2_rates(elements: ElementStore, mu: float = MU_EARTH, j2: float = J2_EARTH,
+             r_eq: float = R_EQUATOR) -> Dict[str, np.ndarray]:
+    """
+    Rates for a store, cached alongside its elements (see `RateCache`).
+
+    Returns {'raan_dot', 'omega_dot', 'mean_motion'} arrays [rad/s].
+    """
+    cache = elements.derived.get('j2')
+    if cache is None or cache.data is not elements.data:
+        cache = elements.derived['j2'] = RateCache(elements.data)
+    return dict(zip(RATE_NAMES, cache.lookup(elements.index, mu, j2, r_eq)))
+
+
+# ============================================================================
+# PROPAGATION
+# ============================================================================
+
+def _as_store(elements: ElementsLike) -> ElementStore:
+    if isinstance(elements, ElementStore):
+        return elements
+    if hasattr(elements, 'a'):
+        elements = [elements]
+    return ElementStore.from_elements(elements)
+
+
+def j2_constants(elements: ElementsLike, mu: float = MU_EARTH) -> dict:
+    """Everything `j2_block` needs per orbit: epoch elements, M0 and the rates."""
+    store = _as_store(elements)
+    e, nu = store.e, store.nu
+    consts = {name: store.column(name) for name in ('a', 'e', 'inc', 'raan', 'omega')}
+    consts.update(j2_rates(store, mu))
+    consts['M0'] = true_to_mean(nu, e)
+    consts['sqrt_mu_p'] = np.sqrt(mu / (consts['a'] * (1.0 - e**2)))
+    return consts
+
+
+def j2_state_constants(r0: np.ndarray, v0: np.ndarray, mu: float) -> dict:
+    """`j2_constants` from ECI states (the `propagation.METHODS` setup hook)."""
+    store = state_to_keplerian_batch(r0, v0, mu)
+    if np.any(store.e >= 1):
+        raise ValueError("The 'j2' method handles elliptic orbits only")
+    r0 = np.atleast_2d(np.asarray(r0, dtype=np.float64))
+    v0 = np.atleast_2d(np.asarray(v0, dtype=np.float64))
+    h = np.cross(r0, v0)
+    equatorial = np.hypot(h[:, 0], h[:, 1]) <= SMALL
+    eccentric = equatorial & (store.e > SMALL)
+    if eccentric.any():
+        # Equatorial rows come back with raan = omega = 0 but nu measured from
+        # the eccentricity vector, so omega has to carry the longitude of
+        # periapsis (measured the other way round for retrograde orbits)
+        r, v = r0[eccentric], v0[eccentric]
+        r_mag = np.linalg.norm(r, axis=1)[:, np.newaxis]
+        e_vec = ((np.einsum('ij,ij->i', v, v)[:, np.newaxis] - mu / r_mag) * r
+                 - np.einsum('ij,ij->i', r, v)[:, np.newaxis] * v) / mu
+        sign = np.sign(h[eccentric, 2])
+        store.data[FIELD_INDEX['omega'], np.flatnonzero(eccentric)] = np.mod(
+            np.arctan2(sign * e_vec[:, 1], e_vec[:, 0]), 2*np.pi)
+
+    nu = store.nu
+    undefined = np.isnan(nu)
+    if undefined.any():
+        # Circular equatorial rows have no node or periapsis, so nu is NaN;
+        # measure it from the perifocal P axis the other angles define
+        R = perifocal_rotation(store.raan[undefined], store.inc[undefined],
+                               store.omega[undefined])
+        r = r0[undefined]
+        store.data[FIELD_INDEX['nu'], np.flatnonzero(undefined)] = np.arctan2(
+            np.einsum('ij,ij->i', r, R[:, :, 1]), np.einsum('ij,ij->i', r, R[:, :, 0]))
+    return j2_constants(store, mu)
+
+
+def j2_block(r0: np.ndarray, v0: np.ndarray, consts: dict,
+             times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    J2-secular states for one (objects x epochs) block.
+
+    Same signature as the other `propagation.METHODS` blocks (r0 and v0 are
+    not needed — everything comes from consts). times is shared, shape (T,),
+    or per object, (N, T).
+    """
+    col = lambda x: x[:, np.newaxis]
+    t = times if times.ndim == 2 else times[np.newaxis, :]
+    e, cos_i, sin_i = col(consts['e']), np.cos(col(consts['inc'])), np.sin(col(consts['inc']))
+
+    raan = col(consts['raan']) + col(consts['raan_dot']) * t
+    omega = col(consts['omega']) + col(consts['omega_dot']) * t
+    E = solve_kepler(col(consts['M0']) + col(consts['mean_motion']) * t, e)
+
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    r_mag = col(consts['a']) * (1.0 - e * cos_E)
+    nu = np.arctan2(np.sqrt(1.0 - e**2) * sin_E, cos_E - e)
+    u = omega + nu
+
+    cos_O, sin_O = np.cos(raan), np.sin(raan)
+    cos_u, sin_u = np.cos(u), np.sin(u)
+    # Velocity terms: sqrt(mu/p) (sin u + e sin w) and (cos u + e cos w)
+    s = sin_u + e * np.sin(omega)
+    c = cos_u + e * np.cos(omega)
+    vs = col(consts['sqrt_mu_p'])
+
+    r = np.empty(np.shape(u) + (3,))
+    v = np.empty_like(r)
+    r[..., 0] = r_mag * (cos_O * cos_u - sin_O * sin_u * cos_i)
+    r[..., 1] = r_mag * (sin_O * cos_u + cos_O * sin_u * cos_i)
+    r[..., 2] = r_mag * sin_u * sin_i
+    v[..., 0] = -vs * (cos_O * s + sin_O * c * cos_i)
+    v[..., 1] = -vs * (sin_O * s - cos_O * c * cos_i)
+    v[..., 2] = vs * c * sin_i
+    return r, v
+
+
+def elements_at(elements: ElementsLike, t: float, mu: float = MU_EARTH) -> ElementStore:
+    """
+    Mean elements advanced by t seconds: raan, omega and nu move, the rest don't.
+
+    Returns a new store (the input is left alone).
+    """
+    store = _as_store(elements)
+    consts = j2_constants(store, mu)
+    out = ElementStore.from_columns(store.columns())
+    out.data[FIELD_INDEX['raan']] = np.mod(consts['raan'] + consts['raan_dot'] * t, 2*np.pi)
+    out.data[FIELD_INDEX['omega']] = np.mod(consts['omega'] + consts['omega_dot'] * t, 2*np.pi)
+    E = solve_kepler(consts['M0'] + consts['mean_motion'] * t, consts['e'])
+    e = consts['e']
+    out.data[FIELD_INDEX['nu']] = np.mod(
+        np.arctan2(np.sqrt(1.0 - e**2) * np.sin(E), np.cos(E) - e), 2*np.pi)
+    return out
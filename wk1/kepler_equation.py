@@ -0,0 +1,223 @@
+"""
+Vectorized Kepler's Equation Solver and Anomaly Conversions
+SPCE 5025 - Fundamentals of Astronautics - Class 2
+
+Solves M = E - e*sin(E) for whole arrays of (M, e) at once and converts
+between mean, eccentric and true anomaly. It's the Newton-Raphson idea from
+the week 2 notes (Topic 19), tuned for catalog-sized arrays:
+
+- a very good starting guess (Markley's cubic starter by default; Danby's and
+  Biondini's from the notes are available too)
+- a fifth-order Newton-type correction per iteration instead of a plain
+  Newton step, so one or two iterations reach machine precision
+- a per-element convergence mask, so finished elements drop out of the
+  work arrays instead of being recomputed until the slowest one is done
+- the work is done in cache-sized blocks, which matters more than anything
+  else once N gets into the millions
+
+Elliptic orbits only (0 <= e < 1).
+"""
+
+import warnings
+import numpy as np
+from typing import Tuple
+
+PI = np.pi
+TWO_PI = 2.0 * np.pi
+
+# Elements per block — small enough that every temporary stays in cache
+BLOCK_SIZE = 4096
+
+# Safety cap on correction steps. The loop stops as soon as a block has
+# converged, so this only matters for poor starters: Biondini's guess at
+# e -> 1 near periapsis can take ~10 steps to settle
+MAX_ITER = 50
+
+
+# ============================================================================
+# STARTING GUESSES
+# ============================================================================
+# All starters take M already folded into [0, pi] and return E0 in [0, pi];
+# the solver handles the sign (Kepler's equation is odd in M and E).
+
+def markley_starter(M: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """
+    Markley's (1995) starter: the root of a cubic fitted to Kepler's equation.
+
+    Good to ~1e-4 rad or better everywhere, including e -> 1 near periapsis,
+    which is what lets a single fifth-order correction finish the job.
+    """
+    alpha = (3*PI**2 + 1.6*PI*(PI - M)/(1 + e)) / (PI**2 - 6)
+    d = 3*(1 - e) + alpha*e
+    q = 2*alpha*d*(1 - e) - M*M
+    r = 3*alpha*d*(d - 1 + e)*M + M*M*M
+    w = np.cbrt(np.abs(r) + np.sqrt(q*q*q + r*r))**2
+    return (2*r*w/(w*w + w*q + q*q) + M) / d
+
+
+def danby_starter(M: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """Danby's starter E0 = M + 0.85*e (sin M >= 0 on [0, pi])."""
+    return np.minimum(M + 0.85*e, PI)
+
+
+def biondini_starter(M: np.ndarray, e: np.ndarray, steps: int = 2) -> np.ndarray:
+    """
+    Biondini's fixed-point iteration x_{k+1} = sin(M + e*x_k), x_0 = sin(M).
+
+    A couple of steps is a good guess for low eccentricity (the iteration
+    contracts at rate ~e). We return E0 = M + e*x rather than asin(x) so the
+    quadrant is never ambiguous.
+    """
+    x = np.sin(M)
+    for _ in range(steps):
+        x = np.sin(M + e*x)
+    return M + e*x
+
+
+STARTERS = {'markley': markley_starter, 'danby': danby_starter,
+            'biondini': biondini_starter}
+
+
+# ============================================================================
+# KEPLER'S EQUATION
+# ============================================================================
+
+def _sin_cos(E: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """sin and cos from one tan(E/2) — a single tan is several times cheaper than sin + cos."""
+    t = np.tan(0.5*E)
+    t2 = t*t
+    inv = 1.0 / (1.0 + t2)
+    return 2.0*t*inv, (1.0 - t2)*inv
+
+
+def _solve_block(M: np.ndarray, e: np.ndarray, tol: float, max_iter: int,
+                 starter: str) -> Tuple[np.ndarray, int]:
+    """
+    Solve one cache-sized block; M in any range, returns E in [0, 2*pi)
+    and the number of elements that hadn't converged after max_iter steps.
+    """
+    # Fold into [0, pi] and remember the sign
+    M = M - TWO_PI*np.rint(M / TWO_PI)
+    sign = np.where(M < 0, -1.0, 1.0)
+    m = np.abs(M)
+
+    E = STARTERS[starter](m, e)
+    out = E.copy()
+    active = np.arange(m.size)
+    unconverged = 0
+
+    for _ in range(max_iter):
+        s, c = _sin_cos(E)
+        f0 = E - e*s - m          # Kepler's equation residual
+        f1 = 1.0 - e*c            # first derivative
+        f2 = e*s                  # second derivative
+        f3 = e*c                  # third derivative
+
+        # Fifth-order correction: Halley, then two refinements of the
+        # Taylor expansion of f(E + delta) (Markley 1995, Eq. 20-22)
+        d3 = -f0 / (f1 - 0.5*f0*f2/f1)
+        d4 = -f0 / (f1 + 0.5*d3*f2 + d3*d3*f3/6.0)
+        d5 = -f0 / (f1 + 0.5*d4*f2 + d4*d4*f3/6.0 - d4*d4*d4*f2/24.0)
+        E = E + d5
+        out[active] = E
+
+        # The error left after a fifth-order step scales like d5^5 (e/f1)^4
+        # (once we're in the asymptotic regime), so an element is finished
+        # once that estimate is under tol
+        ad = np.abs(d5)
+        x = ad*e/f1
+        x *= x
+        done = (ad < 1e-3) & (x*x*ad < tol)
+        if done.all():
+            break
+
+        keep = ~done
+        active = active[keep]
+        E, m, e = E[keep], m[keep], e[keep]
+    else:
+        unconverged = active.size
+
+    out *= sign
+    return np.where(out < 0, out + TWO_PI, out), unconverged
+
+
+def solve_kepler(M: np.ndarray, e: np.ndarray, tol: float = 1e-14,
+                 max_iter: int = MAX_ITER, starter: str = 'markley') -> np.ndarray:
+    """
+    Solve Kepler's equation M = E - e*sin(E) for the eccentric anomaly.
+
+    Parameters
+    ----------
+    M : np.ndarray
+        Mean anomaly [rad] (any range)
+    e : np.ndarray
+        Eccentricity, 0 <= e < 1 (scalar or broadcastable to M)
+    tol : float
+        Convergence tolerance on the eccentric anomaly [rad]
+    max_iter : int
+        Cap on correction steps; each element is iterated until it converges
+        or hits the cap. With the Markley starter one step is almost always
+        enough; Danby/Biondini usually need two or three, and Biondini up to
+        ~10 at high eccentricity. Elements still moving at the cap are
+        returned as-is, with a RuntimeWarning.
+    starter : str
+        'markley' (default), 'danby' or 'biondini'
+
+    Returns
+    -------
+    np.ndarray
+        Eccentric anomaly [rad], same shape as broadcast(M, e), in [0, 2*pi)
+    """
+    M, e = np.broadcast_arrays(np.asarray(M, dtype=np.float64),
+                               np.asarray(e, dtype=np.float64))
+    shape = M.shape
+    M = M.ravel()
+    e = e.ravel()
+
+    E = np.empty_like(M)
+    unconverged = 0
+    for start in range(0, M.size, BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        E[block], count = _solve_block(M[block], e[block], tol, max_iter, starter)
+        unconverged += count
+    if unconverged:
+        warnings.warn(f"solve_kepler: {unconverged} of {M.size} elements did not converge "
+                      f"in {max_iter} iterations (starter '{starter}')",
+                      RuntimeWarning, stacklevel=2)
+    return E.reshape(shape)
+
+
+# ============================================================================
+# ANOMALY CONVERSIONS
+# ============================================================================
+
+def eccentric_to_mean(E: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """Mean anomaly from eccentric anomaly (Kepler's equation), in [0, 2*pi)."""
+    return np.remainder(E - e*np.sin(E), TWO_PI)
+
+
+def eccentric_to_true(E: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """True anomaly from eccentric anomaly, in [0, 2*pi)."""
+    nu = np.arctan2(np.sqrt(1.0 - e**2)*np.sin(E), np.cos(E) - e)
+    return np.remainder(nu, TWO_PI)
+
+
+def true_to_eccentric(nu: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """Eccentric anomaly from true anomaly, in [0, 2*pi)."""
+    E = np.arctan2(np.sqrt(1.0 - e**2)*np.sin(nu), e + np.cos(nu))
+    return np.remainder(E, TWO_PI)
+
+
+def mean_to_true(M: np.ndarray, e: np.ndarray, **solver_kwargs) -> np.ndarray:
+    """True anomaly from mean anomaly (solves Kepler's equation on the way)."""
+    return eccentric_to_true(solve_kepler(M, e, **solver_kwargs), e)
+
+
+def true_to_mean(nu: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """Mean anomaly from true anomaly."""
+    return eccentric_to_mean(true_to_eccentric(nu, e), e)
+
+
+def kepler_residual(E: np.ndarray, M: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """|E - e sin E - M| wrapped to [0, pi] — handy for spot-checking a solve."""
+    return np.abs(np.remainder(E - e*np.sin(E) - M + PI, TWO_PI) - PI)
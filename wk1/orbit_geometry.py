@@ -0,0 +1,385 @@
+"""
+Vectorized Orbit Geometry and Sampling
+SPCE 5025 - Fundamentals of Astronautics
+
+Position-on-orbit math, written so the perifocal-to-ECI rotation is built
+once per orbit (not once per point) and every true anomaly is sampled with a
+single matrix product. Works for one orbit or a whole batch of orbits, which
+is what drawing or screening thousands of orbits needs.
+
+Rotation matrices are also cached across calls: an `ElementStore` keeps one
+per orbit next to its elements (rebuilt only for orbits whose angles
+changed), and single orbits go through a small LRU keyed by their angles, so
+sampling, node lookups and propagation of the same orbit reuse the trig.
+
+This is the compute core the plotting code builds on, and it only needs
+NumPy — `keplerian_to_position`, `generate_orbit_points` and
+`get_node_positions` live here (not in `hw1_visualizations`) so batch tools
+can use them without importing matplotlib.
+"""
+
+import numpy as np
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple, Union
+
+from hw1_solution import KeplerianElements
+from element_store import FIELD_INDEX, ElementStore
+
+# Anything with a, e, inc, raan, omega columns/attributes
+ElementsLike = Union[KeplerianElements, ElementStore, Sequence[KeplerianElements]]
+
+# Rows of an `ElementStore` block that set the orbit's orientation
+ORIENTATION_ROWS = [FIELD_INDEX['raan'], FIELD_INDEX['inc'], FIELD_INDEX['omega']]
+
+# Distinct (raan, inc, omega) triples remembered by `orientation_matrix`
+ORIENTATION_LRU_SIZE = 4096
+
+
+# ============================================================================
+# ROTATION MATRICES
+# ============================================================================
+
+def perifocal_rotation(raan: np.ndarray, inc: np.ndarray,
+                       omega: np.ndarray) -> np.ndarray:
+    """
+    Build perifocal (PQW) to ECI rotation matrices, R = R3(-RAAN) R1(-inc) R3(-omega).
+
+    Parameters
+    ----------
+    raan, inc, omega : np.ndarray
+        Orientation angles [rad]; scalars or arrays of matching shape
+
+    Returns
+    -------
+    np.ndarray
+        Rotation matrices of shape (..., 3, 3)
+    """
+    cos_O, sin_O = np.cos(raan), np.sin(raan)
+    cos_i, sin_i = np.cos(inc), np.sin(inc)
+    cos_w, sin_w = np.cos(omega), np.sin(omega)
+
+    R = np.empty(np.shape(cos_O) + (3, 3))
+    R[..., 0, 0] = cos_O*cos_w - sin_O*sin_w*cos_i
+    R[..., 0, 1] = -cos_O*sin_w - sin_O*cos_w*cos_i
+    R[..., 0, 2] = sin_O*sin_i
+    R[..., 1, 0] = sin_O*cos_w + cos_O*sin_w*cos_i
+    R[..., 1, 1] = -sin_O*sin_w + cos_O*cos_w*cos_i
+    R[..., 1, 2] = -cos_O*sin_i
+    R[..., 2, 0] = sin_w*sin_i
+    R[..., 2, 1] = cos_w*sin_i
+    R[..., 2, 2] = cos_i
+    return R
+
+
+# ============================================================================
+# ORIENTATION CACHE
+# ============================================================================
+
+@lru_cache(maxsize=ORIENTATION_LRU_SIZE)
+def orientation_matrix(raan: float, inc: float, omega: float) -> np.ndarray:
+    """
+    `perifocal_rotation` for one orbit, memoized on its angles.
+
+    The key is the orientation itself, so editing an angle just misses the
+    cache and there's nothing to invalidate. The matrix is read-only because
+    every caller asking for the same angles gets the same array.
+    """
+    R = perifocal_rotation(raan, inc, omega)
+    R.flags.writeable = False
+    return R
+
+
+def _changed(new: np.ndarray, old: np.ndarray) -> np.ndarray:
+    """Columns whose angles differ bit-for-bit (so NaN == NaN, unlike `!=`)."""
+    return (new.view(np.uint64) != old.view(np.uint64)).any(axis=0)
+
+
+class OrientationCache:
+    """
+    Perifocal-to-ECI matrices for every column of one (9, N) element block.
+
+    Kept in `ElementStore.derived['orientation']`, next to the elements it
+    was built from. It holds a copy of the angles each matrix came from, and
+    every lookup compares the requested columns against that copy — a few
+    integer compares per orbit instead of six trig calls and the matrix
+    build — so only columns whose angles were edited (or never seen) get
+    recomputed.
+    """
+
+    def __init__(self, data: np.ndarray):
+        n = data.shape[1]
+        self.data = data
+        self.angles = np.empty((3, n))
+        self.matrices = np.empty((n, 3, 3))
+        self.valid = np.zeros(n, dtype=bool)
+        self.rebuilt = 0   # matrices computed so far, for checking the hit rate
+
+    def lookup(self, columns: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Matrices for the given block columns (all of them if None), shape (M, 3, 3).
+
+        With columns=None the cache's own array comes back, not a copy —
+        treat it as read-only.
+        """
+        if columns is None:
+            angles = self.data[ORIENTATION_ROWS]
+            stale = np.flatnonzero(~self.valid | _changed(angles, self.angles))
+            fresh = angles[:, stale]
+        else:
+            angles = self.data[np.ix_(ORIENTATION_ROWS, columns)]
+            mask = ~self.valid[columns] | _changed(angles, self.angles[:, columns])
+            stale = columns[mask]
+            fresh = angles[:, mask]
+
+        if stale.size:
+            self.matrices[stale] = perifocal_rotation(*fresh)
+            self.angles[:, stale] = fresh
+            self.valid[stale] = True
+            self.rebuilt += stale.size
+        return self.matrices if columns is None else self.matrices[columns]
+
+
+def rotation_matrices(elements: ElementsLike) -> np.ndarray:
+    """
+    Perifocal-to-ECI matrices, reusing earlier work for orbits seen before.
+
+    - `ElementStore`: shape (N, 3, 3), from the store's `OrientationCache`
+      (shared with every indexed view of the same buffer)
+    - one `KeplerianElements` or row view: shape (3, 3), from the
+      `orientation_matrix` LRU
+    - a sequence of them: the LRU matrices stacked to (N, 3, 3)
+    """
+    if isinstance(elements, ElementStore):
+        cache = elements.derived.get('orientation')
+        if cache is None or cache.data is not elements.data:
+            cache = elements.derived['orientation'] = OrientationCache(elements.data)
+        return cache.lookup(elements.index)
+    if hasattr(elements, 'raan'):
+        if np.ndim(elements.raan) == 0:
+            return orientation_matrix(float(elements.raan), float(elements.inc),
+                                      float(elements.omega))
+        return perifocal_rotation(elements.raan, elements.inc, elements.omega)
+    return np.array([orientation_matrix(float(el.raan), float(el.inc), float(el.omega))
+                     for el in elements]).reshape(-1, 3, 3)
+
+
+def element_arrays(elements: ElementsLike,
+                   names: Tuple[str, ...]) -> Tuple[np.ndarray, ...]:
+    """
+    Pull the named fields out of a dataclass, row view, store or list as arrays.
+
+    A single `KeplerianElements` gives 0-d arrays; anything batch-like gives 1-d.
+    """
+    if isinstance(elements, ElementStore):
+        return tuple(elements.column(name) for name in names)
+    if hasattr(elements, names[0]):
+        return tuple(np.asarray(getattr(elements, name), dtype=np.float64) for name in names)
+    return tuple(np.array([getattr(el, name) for el in elements], dtype=np.float64)
+                 for name in names)
+
+
+# ============================================================================
+# ORBIT SAMPLING
+# ============================================================================
+
+def perifocal_positions(a: np.ndarray, e: np.ndarray, nu: np.ndarray) -> np.ndarray:
+    """
+    Positions in the perifocal frame from the trajectory equation r = p/(1 + e cos nu).
+
+    Returns an array of shape broadcast(a, e, nu) + (3,) [m].
+    """
+    p = a * (1 - e**2)
+    cos_nu, sin_nu = np.cos(nu), np.sin(nu)
+    r = p / (1 + e * cos_nu)
+    return np.stack([r * cos_nu, r * sin_nu, np.zeros_like(r)], axis=-1)
+
+
+def sample_orbit(elements: KeplerianElements, nu_values: np.ndarray) -> np.ndarray:
+    """
+    Positions of one orbit at many true anomalies.
+
+    Parameters
+    ----------
+    elements : KeplerianElements
+        Orbital elements (uses a, e, inc, raan, omega); row views work too
+    nu_values : np.ndarray
+        True anomalies [rad], shape (K,)
+
+    Returns
+    -------
+    np.ndarray
+        ECI positions of shape (K, 3) [m]
+    """
+    R = rotation_matrices(elements)
+    r_pqw = perifocal_positions(elements.a, elements.e, np.asarray(nu_values, dtype=np.float64))
+    return r_pqw @ R.T
+
+
+def sample_orbits(elements: ElementsLike, nu_values: np.ndarray) -> np.ndarray:
+    """
+    Positions of a batch of orbits at a batch of true anomalies.
+
+    Parameters
+    ----------
+    elements : ElementStore or sequence of KeplerianElements
+        M orbits
+    nu_values : np.ndarray
+        True anomalies [rad], either shape (K,) (same anomalies for every
+        orbit) or (M, K) (per-orbit anomalies)
+
+    Returns
+    -------
+    np.ndarray
+        ECI positions of shape (M, K, 3) [m]
+    """
+    a, e = (np.atleast_1d(x) for x in element_arrays(elements, ('a', 'e')))
+
+    nu_values = np.asarray(nu_values, dtype=np.float64)
+    if nu_values.ndim == 1:
+        nu_values = nu_values[np.newaxis, :]
+
+    R = rotation_matrices(elements).reshape(-1, 3, 3)                 # (M, 3, 3)
+    r_pqw = perifocal_positions(a[:, None], e[:, None], nu_values)   # (M, K, 3)
+
+    # Only the first two perifocal components are non-zero, so skip the W column
+    return r_pqw[..., :2] @ np.swapaxes(R[:, :, :2], 1, 2)
+
+
+# ============================================================================
+# SINGLE-ORBIT HELPERS (used by the plots)
+# ============================================================================
+
+def keplerian_to_position(elements: KeplerianElements, nu: float) -> np.ndarray:
+    """
+    Convert Keplerian elements to position vector at a given true anomaly.
+
+    Parameters
+    ----------
+    elements : KeplerianElements
+        Orbital elements (uses a, e, inc, raan, omega)
+    nu : float
+        True anomaly [rad]
+
+    Returns
+    -------
+    np.ndarray
+        Position vector in ECI frame [m]
+    """
+    # Semi-latus rectum
+    p = elements.a * (1 - elements.e**2)
+
+    # Radius at this true anomaly
+    r = p / (1 + elements.e * np.cos(nu))
+
+    # Position in perifocal (PQW) frame
+    # P points to periapsis, Q is 90 deg ahead in orbital plane
+    r_pqw = r * np.array([np.cos(nu), np.sin(nu), 0.0])
+
+    # Rotation matrix from perifocal to ECI
+    # R = R3(-RAAN) @ R1(-inc) @ R3(-omega), cached per orientation
+    R = rotation_matrices(elements)
+
+    return R @ r_pqw
+
+
+def generate_orbit_points(elements: KeplerianElements,
+                          num_points: int = 360) -> np.ndarray:
+    """
+    Generate position vectors around the entire orbit.
+
+    Parameters
+    ----------
+    elements : KeplerianElements
+        Orbital elements
+    num_points : int
+        Number of points to generate around the orbit
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (num_points, 3) with position vectors [m]
+    """
+    # One rotation matrix for the whole orbit, one matrix product for all points
+    nu_values = np.linspace(0, 2*np.pi, num_points)
+    return sample_orbit(elements, nu_values)
+
+
+def get_node_positions(elements: KeplerianElements) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get positions of ascending and descending nodes.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (ascending_node_position, descending_node_position) in ECI [m]
+    """
+    # True anomaly at ascending node: nu = -omega (or 2*pi - omega)
+    nu_ascending = -elements.omega
+    if nu_ascending < 0:
+        nu_ascending += 2*np.pi
+
+    # True anomaly at descending node: nu = pi - omega
+    nu_descending = np.pi - elements.omega
+    if nu_descending < 0:
+        nu_descending += 2*np.pi
+
+    pos_ascending = keplerian_to_position(elements, nu_ascending)
+    pos_descending = keplerian_to_position(elements, nu_descending)
+
+    return pos_ascending, pos_descending
+
+
+# ============================================================================
+# ELEMENTS TO STATE VECTORS
+# ============================================================================
+
+def keplerian_to_state(elements: ElementsLike, mu: float,
+                       nu: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert Keplerian elements back to ECI position and velocity vectors.
+
+    This is the inverse of `state_to_keplerian`. Position comes from the
+    trajectory equation and velocity from the perifocal form
+    v = sqrt(mu/p) * (-sin nu, e + cos nu, 0); both get rotated into ECI with
+    the same (cached) `rotation_matrices` the sampling code uses.
+
+    Elements straight out of `state_to_keplerian` only round-trip for
+    inclined orbits. The equatorial conventions throw information away, and
+    it can't be recovered here:
+
+    - equatorial eccentric: omega is stored as 0 and nu is measured from
+      periapsis, so the longitude of periapsis is lost and the state comes
+      back rotated about z (thousands of km off for a typical LEO orbit)
+    - circular equatorial: nu is NaN, so r and v come back as NaN
+
+    Parameters
+    ----------
+    elements : KeplerianElements, ElementStore or sequence of KeplerianElements
+        Orbital elements (uses a, e, inc, raan, omega and nu)
+    mu : float
+        Gravitational parameter [m^3/s^2]
+    nu : np.ndarray, optional
+        True anomalies to evaluate at instead of the stored `nu` [rad]
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (r, v) in ECI, each of shape (N, 3) — or (3,) for a single
+        `KeplerianElements` [m, m/s]
+    """
+    a, e, nu_stored = element_arrays(elements, ('a', 'e', 'nu'))
+    nu = nu_stored if nu is None else np.asarray(nu, dtype=np.float64)
+
+    p = a * (1 - e**2)
+    cos_nu, sin_nu = np.cos(nu), np.sin(nu)
+    r = p / (1 + e * cos_nu)
+    v_scale = np.sqrt(mu / p)
+
+    # Perifocal P and Q components (W is zero for both vectors)
+    r_pq = np.stack([r * cos_nu, r * sin_nu], axis=-1)
+    v_pq = np.stack([-v_scale * sin_nu, v_scale * (e + cos_nu)], axis=-1)
+
+    R_pq = rotation_matrices(elements)[..., :, :2]
+    r_eci = np.einsum('...ij,...j->...i', R_pq, r_pq)
+    v_eci = np.einsum('...ij,...j->...i', R_pq, v_pq)
+    return r_eci, v_eci
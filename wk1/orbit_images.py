@@ -0,0 +1,207 @@
+"""
+Parallel Off-Screen Per-Object Orbit Images
+SPCE 5025 - Fundamentals of Astronautics
+
+One PNG per object — the same panel `visualize_individual_orbits` draws for
+each homework vector — for thousands of objects. Each worker process:
+
+- runs the non-interactive Agg backend and never touches pyplot's global
+  figure manager (figures are created directly, so nothing piles up)
+- keeps one figure and one 3D axes for its whole life, clearing the axes
+  between objects instead of building a new figure every time
+- shares the cached Earth mesh (`earth_sphere_mesh`) across all its plots
+
+Objects are handed out in small chunks of (name, r, v) rows; each image is
+written as soon as it's drawn, so memory doesn't grow with the object count
+and the parent can report progress and images/second as chunks finish.
+
+    python orbit_images.py states.bin out_dir --processes 8
+"""
+
+import os
+import re
+import time
+import numpy as np
+from multiprocessing import get_context
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from batch_conversion import state_to_keplerian_batch
+from parallel_conversion import available_cores
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+
+# Objects per task — big enough to amortize the IPC, small enough to balance
+DEFAULT_CHUNK = 16
+
+COLORS = ['crimson', 'forestgreen', 'darkorange', 'purple']
+
+
+def image_filename(index: int, name: str) -> str:
+    """
+    A safe file name for an object (anything odd becomes '_').
+
+    The row index leads the name, so objects whose names only differ in
+    characters that get replaced (or repeated names) don't overwrite each
+    other, and the files sort in input order.
+    """
+    safe = re.sub(r'[^A-Za-z0-9._-]+', '_', str(name)).strip('_')
+    return f'{index:06d}_{safe}.png' if safe else f'{index:06d}.png'
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+# One figure/axes per worker process, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(out_dir: str, mu: float, figsize: Tuple[float, float], dpi: int,
+                 headless: bool = True) -> None:
+    # The figure below draws through Agg directly, so switching pyplot's
+    # backend is only a safety net for worker processes — the in-process
+    # path passes headless=False and leaves the caller's backend alone
+    if headless:
+        from hw1_visualizations import use_headless
+        use_headless()
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import mpl_toolkits.mplot3d  # noqa: F401 — registers the '3d' projection
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    _worker.update(fig=fig, ax=fig.add_subplot(1, 1, 1, projection='3d'),
+                   out_dir=out_dir, mu=mu, dpi=dpi)
+
+
+def _render_chunk(task: Tuple[int, List[str], np.ndarray, np.ndarray]) -> int:
+    """Draw and save one image per object in the chunk; returns how many were drawn."""
+    from hw1_visualizations import plot_orbit_detail
+
+    start, names, r, v = task
+    elements = state_to_keplerian_batch(r, v, _worker['mu'])
+    fig, ax = _worker['fig'], _worker['ax']
+    drawn = 0
+
+    for k, name in enumerate(names):
+        if not np.isfinite(elements.r_apoapsis[k]):
+            continue   # unbound: no closed orbit to frame the plot around
+        ax.cla()
+        plot_orbit_detail(ax, elements[k].to_elements(), r[k], v[k], name,
+                          COLORS[(start + k) % len(COLORS)])
+        fig.savefig(os.path.join(_worker['out_dir'], image_filename(start + k, name)),
+                    dpi=_worker['dpi'], facecolor='white', edgecolor='none')
+        drawn += 1
+    return drawn
+
+
+def _tasks(names: Sequence[str], r: np.ndarray, v: np.ndarray,
+           chunk: int) -> Iterator[Tuple[int, List[str], np.ndarray, np.ndarray]]:
+    for start in range(0, len(names), chunk):
+        stop = min(start + chunk, len(names))
+        yield start, list(names[start:stop]), r[start:stop], v[start:stop]
+
+
+# ============================================================================
+# BATCH RENDERING
+# ============================================================================
+
+def render_orbit_images(names: Sequence[str], r: np.ndarray, v: np.ndarray,
+                        out_dir: str, mu: float = MU_EARTH,
+                        processes: Optional[int] = None, chunk: int = DEFAULT_CHUNK,
+                        figsize: Tuple[float, float] = (8, 8), dpi: int = 100,
+                        progress: bool = False) -> Dict[str, float]:
+    """
+    Write one orbit PNG per object into out_dir.
+
+    Parameters
+    ----------
+    names : sequence of str
+        Object names (also used for the file names, see `image_filename`)
+    r, v : np.ndarray
+        ECI states, shape (N, 3) [m, m/s]
+    out_dir : str
+        Output directory (created if needed)
+    mu : float
+        Gravitational parameter [m^3/s^2]
+    processes : int, optional
+        Worker count (default: every available core); 1 renders in-process
+    chunk : int
+        Objects per task
+    figsize, dpi
+        Image size
+    progress : bool
+        Print a running images/second line as chunks complete
+
+    Unbound (e >= 1) objects are skipped, since their plots have no finite
+    extent.
+
+    Returns
+    -------
+    dict
+        {'images', 'seconds', 'images_per_s', 'processes'}
+    """
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    os.makedirs(out_dir, exist_ok=True)
+    processes = processes or available_cores()
+    initargs = (out_dir, mu, figsize, dpi)
+
+    done = 0
+    start = time.perf_counter()
+
+    def report(count: int) -> None:
+        nonlocal done
+        done += count
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"\r  {done}/{len(names)} images, {done / elapsed:.1f} images/s",
+                  end='', flush=True)
+
+    if processes == 1:
+        _init_worker(*initargs, headless=False)
+        for task in _tasks(names, r, v, chunk):
+            report(_render_chunk(task))
+        _worker.clear()
+    else:
+        with get_context().Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            for count in pool.imap_unordered(_render_chunk, _tasks(names, r, v, chunk)):
+                report(count)
+    if progress:
+        print()
+
+    seconds = time.perf_counter() - start
+    return {'images': done, 'seconds': seconds,
+            'images_per_s': done / seconds if seconds > 0 else 0.0,
+            'processes': processes}
+
+
+def main(argv=None):
+    """Render one image per state in a CSV or binary state file."""
+    import argparse
+    from state_io import read_state_chunks
+
+    parser = argparse.ArgumentParser(description="Render one orbit PNG per object.")
+    parser.add_argument('states', help="CSV or raw float64 state file (see state_io)")
+    parser.add_argument('out_dir', help="directory for the PNGs")
+    parser.add_argument('--format', choices=('csv', 'bin'))
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=None, help="only the first N objects")
+    args = parser.parse_args(argv)
+
+    # The empty leading block keeps an empty state file from breaking concatenate
+    blocks = [(np.empty((0, 3)), np.empty((0, 3)))]
+    blocks += read_state_chunks(args.states, args.format)
+    r = np.concatenate([b[0] for b in blocks])[:args.limit]
+    v = np.concatenate([b[1] for b in blocks])[:args.limit]
+    names = [f'Object {i}' for i in range(len(r))]
+
+    stats = render_orbit_images(names, r, v, args.out_dir, processes=args.processes,
+                                dpi=args.dpi, progress=True)
+    print(f"Rendered {stats['images']} images in {stats['seconds']:.1f} s "
+          f"({stats['images_per_s']:.1f} images/s on {stats['processes']} processes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Multi-Core State Conversion with Shared-Memory Buffers
+SPCE 5025 - Fundamentals of Astronautics
+
+`state_to_keplerian_batch` is vectorized but still runs on one core. This
+module splits a big state array into shards and converts them on a process
+pool. Nothing is pickled except (start, stop) pairs:
+
+- the input states live in one `multiprocessing.shared_memory` block as an
+  (N, 6) float64 array (rx, ry, rz, vx, vy, vz)
+- the output is another shared block holding the (9, N) array behind an
+  `ElementStore`
+- each worker attaches to both blocks once (pool initializer), converts its
+  shard in place and writes the columns straight into the output
+
+Shards are a few hundred thousand states, so the per-task overhead is noise
+and every worker stays busy until the end (the last, shorter shards fill in
+around slower ones).
+"""
+
+import os
+import numpy as np
+from multiprocessing import get_context, shared_memory
+from typing import Optional, Tuple
+
+from batch_conversion import state_to_keplerian_batch
+from element_store import ElementStore, FIELDS
+
+# States per task — large enough to amortize the task round trip, small
+# enough that a 1e8 job has a few hundred tasks to balance across workers
+DEFAULT_SHARD_SIZE = 262_144
+
+# Within a shard, states are converted this many at a time so the batch
+# conversion's temporaries stay in cache (~25% faster than whole shards)
+SUB_BLOCK = 16_384
+
+VALUES_PER_STATE = 6
+
+
+def available_cores() -> int:
+    """CPUs this process may run on (respects taskset/cgroup affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:   # not on Linux
+        return os.cpu_count() or 1
+
+
+# ============================================================================
+# SHARED ARRAYS
+# ============================================================================
+
+class SharedArray:
+    """
+    A float64 numpy array living in a named shared-memory block.
+
+    Create one in the parent with `SharedArray.create(shape)`, hand its
+    `name` and `shape` to other processes and `SharedArray.attach` there.
+    Only the creator should `unlink()`.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: Tuple[int, ...], owner: bool):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.owner = owner
+        self.array = np.ndarray(self.shape, dtype=np.float64, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...]) -> 'SharedArray':
+        nbytes = max(int(np.prod(shape)) * 8, 1)
+        return cls(shared_memory.SharedMemory(create=True, size=nbytes), shape, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, ...]) -> 'SharedArray':
+        return cls(shared_memory.SharedMemory(name=name), shape, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        """Detach (the array must not be used afterwards)."""
+        del self.array
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+# Per-worker views of the shared blocks, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(states_name: str, out_name: str, n: int, mu: float) -> None:
+    _worker['states'] = SharedArray.attach(states_name, (n, VALUES_PER_STATE))
+    _worker['out'] = SharedArray.attach(out_name, (len(FIELDS), n))
+    _worker['mu'] = mu
+
+
+def _convert_shard(bounds: Tuple[int, int]) -> int:
+    """Convert states[start:stop] into out[:, start:stop]; returns the count."""
+    start, stop = bounds
+    states, out = _worker['states'].array, _worker['out'].array
+    for i in range(start, stop, SUB_BLOCK):
+        block = slice(i, min(i + SUB_BLOCK, stop))
+        elements = state_to_keplerian_batch(states[block, :3], states[block, 3:], _worker['mu'])
+        out[:, block] = elements.data
+    return stop - start
+
+
+def _shards(n: int, shard_size: int):
+    return [(i, min(i + shard_size, n)) for i in range(0, n, shard_size)]
+
+
+# ============================================================================
+# PARALLEL CONVERSION
+# ============================================================================
+
+def convert_shared(states: SharedArray, out: SharedArray, mu: float,
+                   processes: Optional[int] = None,
+                   shard_size: int = DEFAULT_SHARD_SIZE) -> None:
+    """
+    Convert an (N, 6) shared state array into a (9, N) shared element array.
+
+    The zero-copy entry point: use it when the states are already in shared
+    memory (e.g. read straight into a `SharedArray` from disk) and the caller
+    wants to keep the output there.
+    """
+    n = states.shape[0]
+    if out.shape != (len(FIELDS), n):
+        raise ValueError(f"Output must have shape {(len(FIELDS), n)}, got {out.shape}")
+    processes = processes or available_cores()
+
+    if processes == 1:
+        # No point paying for a pool — same code path, this process
+        _init_worker(states.name, out.name, n, mu)
+        try:
+            for bounds in _shards(n, shard_size):
+                _convert_shard(bounds)
+        finally:
+            _worker['states'].close()
+            _worker['out'].close()
+            _worker.clear()
+        return
+
+    with get_context().Pool(processes, initializer=_init_worker,
+                            initargs=(states.name, out.name, n, mu)) as pool:
+        for _ in pool.imap_unordered(_convert_shard, _shards(n, shard_size)):
+            pass
+
+
+def state_to_keplerian_parallel(r_vecs: np.ndarray, v_vecs: np.ndarray, mu: float,
+                                processes: Optional[int] = None,
+                                shard_size: int = DEFAULT_SHARD_SIZE) -> ElementStore:
+    """
+    Parallel drop-in for `state_to_keplerian_batch`.
+
+    Parameters
+    ----------
+    r_vecs, v_vecs : np.ndarray
+        Position [m] and velocity [m/s] vectors, shape (N, 3)
+    mu : float
+        Gravitational parameter [m^3/s^2]
+    processes : int, optional
+        Worker count (default: every core we're allowed to use)
+    shard_size : int
+        States per task
+
+    Returns
+    -------
+    ElementStore
+        Same values as `state_to_keplerian_batch(r_vecs, v_vecs, mu)`
+    """
+    r_vecs = np.asarray(r_vecs, dtype=np.float64).reshape(-1, 3)
+    v_vecs = np.asarray(v_vecs, dtype=np.float64).reshape(-1, 3)
+    n = len(r_vecs)
+
+    with SharedArray.create((n, VALUES_PER_STATE)) as states, \
+            SharedArray.create((len(FIELDS), n)) as out:
+        states.array[:, :3] = r_vecs
+        states.array[:, 3:] = v_vecs
+        convert_shared(states, out, mu, processes, shard_size)
+        # Copy out so the result outlives the shared block
+        return ElementStore(out.array.copy())
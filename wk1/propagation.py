@@ -0,0 +1,234 @@
+"""
+Analytic Two-Body Propagation with Lagrange f and g Functions
+SPCE 5025 - Fundamentals of Astronautics - Class 2
+
+Answers "where is everything at t0 + dt?" for a whole catalog at once. Each
+object's initial state is turned into the few quantities the f and g
+functions need (a, e, E0), mean anomaly is advanced in time, Kepler's
+equation is solved for every (object, epoch) pair in one vectorized call, and
+the new state is
+
+    r = f r0 + g v0,    v = fdot r0 + gdot v0
+
+Everything is vectorized over objects *and* epochs. For grids too big to hold
+in memory (100k objects x 10k epochs is ~50 GB of states), use
+`propagate_chunks`, which yields the grid one block at a time.
+
+The default 'kepler' method is elliptic only. Pass method='universal' to
+use the universal-variable formulation in `universal.py`, which handles
+parabolic and hyperbolic states in the same call, or method='j2' for
+two-body motion plus the J2 secular drift of the node, periapsis and mean
+anomaly (`j2_secular.py`).
+"""
+
+import numpy as np
+from typing import Iterator, Tuple
+
+from j2_secular import j2_block, j2_constants, j2_state_constants
+from kepler_equation import solve_kepler
+from orbit_geometry import ElementsLike, keplerian_to_state
+from universal import universal_block, universal_constants
+
+# Default chunk sizes for streaming — ~1M (object, epoch) pairs per chunk,
+# which keeps the temporaries in the tens of MB
+CHUNK_OBJECTS = 1024
+CHUNK_EPOCHS = 1024
+
+TWO_PI = 2.0 * np.pi
+
+
+# ============================================================================
+# PER-OBJECT SETUP
+# ============================================================================
+
+def _orbit_constants(r0: np.ndarray, v0: np.ndarray, mu: float) -> dict:
+    """
+    Everything about each orbit that doesn't depend on time.
+
+    Uses e*cos(E0) = 1 - r0/a and e*sin(E0) = (r0 . v0)/sqrt(mu*a), which
+    gets E0 straight from the state without going through true anomaly.
+    """
+    r0_mag = np.sqrt(np.einsum('ij,ij->i', r0, r0))
+    v0_sq = np.einsum('ij,ij->i', v0, v0)
+    sigma0 = np.einsum('ij,ij->i', r0, v0)
+
+    a = 1.0 / (2.0/r0_mag - v0_sq/mu)
+    if np.any(a <= 0):
+        raise ValueError("The 'kepler' method handles elliptic orbits only; "
+                         "use method='universal' for parabolic/hyperbolic states")
+    sqrt_mu_a = np.sqrt(mu * a)
+
+    e_cos_E0 = 1.0 - r0_mag / a
+    e_sin_E0 = sigma0 / sqrt_mu_a
+    E0 = np.arctan2(e_sin_E0, e_cos_E0)
+    e = np.hypot(e_cos_E0, e_sin_E0)
+
+    return {
+        'r0_mag': r0_mag, 'a': a, 'e': e, 'E0': E0,
+        'M0': E0 - e_sin_E0,
+        'n': np.sqrt(mu / a**3),
+        'sqrt_mu_a': sqrt_mu_a,
+    }
+
+
+# ============================================================================
+# PROPAGATION
+# ============================================================================
+
+def _propagate_block(r0: np.ndarray, v0: np.ndarray, consts: dict,
+                     times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    f and g propagation for one (objects x epochs) block.
+
+    times is either shared by every object, shape (T,), or per object, (N, T).
+    """
+    col = lambda x: x[:, np.newaxis]
+    a, e, r0_mag = col(consts['a']), col(consts['e']), col(consts['r0_mag'])
+    times = times if times.ndim == 2 else times[np.newaxis, :]
+
+    # Advance mean anomaly and solve Kepler for every (object, epoch) pair
+    dM = col(consts['n']) * times
+    E = solve_kepler(col(consts['M0']) + dM, e)
+
+    # solve_kepler wraps E into [0, 2*pi), but g needs the unwrapped change in
+    # E over the whole interval. dE and dM never differ by more than 2e < pi,
+    # so snapping to the nearest revolution count recovers it.
+    dE = E - col(consts['E0'])
+    dE += TWO_PI * np.rint((dM - dE) / TWO_PI)
+    sin_dE, one_minus_cos = np.sin(dE), 1.0 - np.cos(dE)
+
+    r_mag = a * (1.0 - e*np.cos(E))
+
+    f = 1.0 - (a / r0_mag) * one_minus_cos
+    g = times - (dE - sin_dE) / col(consts['n'])
+    fdot = -col(consts['sqrt_mu_a']) * sin_dE / (r_mag * r0_mag)
+    gdot = 1.0 - (a / r_mag) * one_minus_cos
+
+    r = f[..., None] * r0[:, None, :] + g[..., None] * v0[:, None, :]
+    v = fdot[..., None] * r0[:, None, :] + gdot[..., None] * v0[:, None, :]
+    return r, v
+
+
+# Per-object setup and per-block propagation for each method
+METHODS = {
+    'kepler': (_orbit_constants, _propagate_block),
+    'universal': (universal_constants, universal_block),
+    'j2': (j2_state_constants, j2_block),
+}
+
+
+def propagate_chunks(r0: np.ndarray, v0: np.ndarray, times: np.ndarray,
+                     mu: float, chunk_objects: int = CHUNK_OBJECTS,
+                     chunk_epochs: int = CHUNK_EPOCHS, method: str = 'kepler'
+                     ) -> Iterator[Tuple[slice, slice, np.ndarray, np.ndarray]]:
+    """
+    Stream a propagation grid one (objects x epochs) block at a time.
+
+    Parameters
+    ----------
+    r0, v0 : np.ndarray
+        Initial ECI states, shape (N, 3) [m, m/s]
+    times : np.ndarray
+        Time offsets from the initial epoch, shape (T,) [s]
+    mu : float
+        Gravitational parameter [m^3/s^2]
+    chunk_objects, chunk_epochs : int
+        Block size along each axis
+    method : str
+        'kepler' (elliptic only), 'universal' (any conic) or 'j2'
+        (elliptic, with J2 secular drift)
+
+    Yields
+    ------
+    (object_slice, epoch_slice, r, v)
+        Which part of the (N, T) grid this is, and the states for it, each of
+        shape (len(object_slice), len(epoch_slice), 3)
+    """
+    r0 = np.atleast_2d(np.asarray(r0, dtype=np.float64))
+    v0 = np.atleast_2d(np.asarray(v0, dtype=np.float64))
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    setup, block = METHODS[method]
+
+    for i in range(0, len(r0), chunk_objects):
+        objs = slice(i, min(i + chunk_objects, len(r0)))
+        consts = setup(r0[objs], v0[objs], mu)
+        for j in range(0, len(times), chunk_epochs):
+            epochs = slice(j, min(j + chunk_epochs, len(times)))
+            r, v = block(r0[objs], v0[objs], consts, times[epochs])
+            yield objs, epochs, r, v
+
+
+def propagate(r0: np.ndarray, v0: np.ndarray, times: np.ndarray,
+              mu: float, method: str = 'kepler') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Propagate N states to T epochs in one shot.
+
+    Returns (r, v), each of shape (N, T, 3). Use `propagate_chunks` instead
+    when N*T is large.
+    """
+    r0 = np.atleast_2d(np.asarray(r0, dtype=np.float64))
+    times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+    return _collect(propagate_chunks(r0, v0, times, mu, method=method), len(r0), len(times))
+
+
+def _collect(chunks: Iterator, n: int, t: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Assemble streamed (objects x epochs) blocks into full (n, t, 3) arrays."""
+    r = np.empty((n, t, 3))
+    v = np.empty_like(r)
+    for objs, epochs, r_blk, v_blk in chunks:
+        r[objs, epochs] = r_blk
+        v[objs, epochs] = v_blk
+    return r, v
+
+
+def propagate_to(r0: np.ndarray, v0: np.ndarray, times: np.ndarray,
+                 mu: float, method: str = 'kepler') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Propagate each of N states to its own time offset, times of shape (N,).
+
+    Returns (r, v), each of shape (N, 3). Root finders on per-object events
+    (rise/set times, closest approaches) need this: every object in the
+    batch sits at a different time.
+    """
+    r0 = np.atleast_2d(np.asarray(r0, dtype=np.float64))
+    v0 = np.atleast_2d(np.asarray(v0, dtype=np.float64))
+    times = np.asarray(times, dtype=np.float64).reshape(-1, 1)
+    setup, block = METHODS[method]
+    r, v = block(r0, v0, setup(r0, v0, mu), times)
+    return r[:, 0], v[:, 0]
+
+
+def propagate_elements(elements: ElementsLike, times: np.ndarray, mu: float,
+                       chunked: bool = False, method: str = 'kepler', **chunk_kwargs):
+    """
+    Same as `propagate`/`propagate_chunks`, starting from Keplerian elements.
+
+    The elements (a `KeplerianElements`, an `ElementStore` or a list) are
+    converted to states at their own true anomaly first — except for
+    method='j2', which propagates the elements directly and reuses the J2
+    rates cached on an `ElementStore`.
+    """
+    if method == 'j2':
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        consts = j2_constants(elements, mu)
+        chunks = _j2_element_chunks(consts, times, **chunk_kwargs)
+        return chunks if chunked else _collect(chunks, len(consts['a']), len(times))
+
+    r0, v0 = keplerian_to_state(elements, mu)
+    if chunked:
+        return propagate_chunks(r0, v0, times, mu, method=method, **chunk_kwargs)
+    return propagate(r0, v0, times, mu, method=method)
+
+
+def _j2_element_chunks(consts: dict, times: np.ndarray, chunk_objects: int = CHUNK_OBJECTS,
+                       chunk_epochs: int = CHUNK_EPOCHS
+                       ) -> Iterator[Tuple[slice, slice, np.ndarray, np.ndarray]]:
+    """`propagate_chunks` for method='j2' when the per-orbit constants already exist."""
+    n = len(consts['a'])
+    for i in range(0, n, chunk_objects):
+        objs = slice(i, min(i + chunk_objects, n))
+        block_consts = {name: value[objs] for name, value in consts.items()}
+        for j in range(0, len(times), chunk_epochs):
+            epochs = slice(j, min(j + chunk_epochs, len(times)))
+            r, v = j2_block(None, None, block_consts, times[epochs])
+            yield objs, epochs, r, v
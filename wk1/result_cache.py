@@ -0,0 +1,459 @@
+"""
+Content-Addressed Cache for State Conversions
+SPCE 5025 - Fundamentals of Astronautics
+
+Upstream re-sends the same state vectors over and over (a parked GEO object
+doesn't change between dumps), and every copy went through conversion and
+verification again. This cache keys the result — the 9 elements plus the 4
+verification residuals — on a hash of the raw (r, v, mu) bytes, so a state
+that has been seen before is a lookup instead of a recompute.
+
+Two tiers, both least-recently-used:
+
+    memory   a few hundred thousand entries in RAM
+    disk     a directory of memory-mapped arrays, bounded in bytes, that
+             survives restarts (keys.npy, values.npy, last_used.npy, meta.json)
+
+Lookups go memory -> disk; disk hits are promoted into memory, and new
+results are written to both.
+
+Everything is batched, because the batch conversion is already only ~0.6
+us/state — a per-state `hashlib` digest or dict lookup costs more than that.
+So keys are a vectorized 128-bit hash (two independently seeded 64-bit
+lanes over the 7 raw words). It's not cryptographic, but accidental
+collisions are ~2^-64 per pair. Each tier finds keys through a
+linear-probing index and evicts in bulk by last-use tick.
+
+    hit, rows = cache.lookup(keys)      # hit mask + cached rows (NaN on misses)
+    cache.insert(keys[~hit], computed)  # only the misses were converted
+
+or just `convert_cached(r, v, mu, cache)`.
+"""
+
+import json
+import os
+import numpy as np
+from dataclasses import dataclass
+from numpy.lib.format import open_memmap
+from typing import Dict, Optional, Tuple
+
+from batch_conversion import state_to_keplerian_batch
+from batch_verification import CHECKS, verify_elements_batch
+from element_store import ElementStore, FIELDS
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+
+# A cached row: the elements (FIELDS order) then the residuals (CHECKS order)
+ROW_FIELDS = FIELDS + CHECKS
+ROW_WIDTH = len(ROW_FIELDS)
+
+# Key, row and last-use tick per entry
+ENTRY_BYTES = 16 + 8 * ROW_WIDTH + 8
+
+DEFAULT_MEMORY_ENTRIES = 262_144      # ~32 MB
+DEFAULT_DISK_BYTES = 1 << 30          # ~8M entries
+
+# Seeds for the two hash lanes, and the murmur3 finalizer constants
+_LANE_SEEDS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xD6E8FEB86659FD93))
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_SHIFT = np.uint64(33)
+
+# Index markers: never used, and used then evicted
+_EMPTY = -1
+_DELETED = -2
+
+
+# ============================================================================
+# KEYS
+# ============================================================================
+
+def _fmix(h: np.ndarray) -> np.ndarray:
+    """murmur3's 64-bit finalizer, in place."""
+    h ^= h >> _SHIFT
+    h *= _MIX_1
+    h ^= h >> _SHIFT
+    h *= _MIX_2
+    h ^= h >> _SHIFT
+    return h
+
+
+def state_keys(r: np.ndarray, v: np.ndarray, mu: float) -> np.ndarray:
+    """
+    128-bit content keys for N states, shape (N, 2) uint64.
+
+    Hashes the exact float64 bit patterns, so any change to r, v or mu
+    (even in the last bit, or 0.0 vs -0.0) gives a new key.
+    """
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    # One contiguous row per word, so the mixing passes run at unit stride
+    words = np.empty((7, len(r)))
+    words[:3] = r.T
+    words[3:6] = v.T
+    words[6] = mu
+    words = words.view(np.uint64)
+
+    keys = np.empty((len(r), 2), dtype=np.uint64)
+    h = np.empty(len(r), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for lane, seed in enumerate(_LANE_SEEDS):
+            h[:] = seed
+            for word in words:
+                h ^= word
+                _fmix(h)
+                h += seed
+            keys[:, lane] = h
+    return keys
+
+
+def _unique_rows(keys: np.ndarray) -> np.ndarray:
+    """Index of the first occurrence of each distinct key."""
+    _, first = np.unique(np.ascontiguousarray(keys).view('V16').ravel(), return_index=True)
+    return np.sort(first)
+
+
+# ============================================================================
+# LRU TABLES
+# ============================================================================
+
+class LRUTable:
+    """
+    A fixed-capacity key -> row table with least-recently-used eviction.
+
+    Storage is three arrays — keys (C, 2), values (C, ROW_WIDTH) and
+    last_used (C,), -1 for empty slots — either in RAM or memory-mapped.
+    Keys are found through a linear-probing index of 2^bits >= 2C
+    positions, probed with vectorized passes the way the
+    `element_archive` ID table is. The index lives in RAM and is rebuilt
+    when a table is opened. Evicted entries leave tombstones; the index is
+    rebuilt once they pile up.
+    """
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray, last_used: np.ndarray):
+        self.keys = keys
+        self.values = values
+        self.last_used = last_used
+        self.evictions = 0
+        self.bits = max(4, int(np.ceil(np.log2(2 * len(last_used)))))
+        self._rebuild()
+
+    @classmethod
+    def in_memory(cls, capacity: int) -> 'LRUTable':
+        return cls(np.zeros((capacity, 2), dtype=np.uint64),
+                   np.empty((capacity, ROW_WIDTH)),
+                   np.full(capacity, -1, dtype=np.int64))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.last_used)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _rebuild(self) -> None:
+        self.index = np.full(1 << self.bits, _EMPTY, dtype=np.int64)
+        self.tombstones = 0
+        used = np.flatnonzero(np.asarray(self.last_used) >= 0)
+        self.count = len(used)
+        self._claim(np.asarray(self.keys[used]), used)
+
+    def _positions(self, keys: np.ndarray) -> np.ndarray:
+        # The keys are already well mixed, so their top bits are the position
+        return (keys[:, 0] >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    def _probe(self, keys: np.ndarray) -> np.ndarray:
+        """Index position holding each key, -1 where it isn't in the table."""
+        mask = (1 << self.bits) - 1
+        found = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        pos = self._positions(keys)
+
+        while pending.size:
+            candidate = self.index[pos[pending]]
+            live = candidate >= 0
+            hit = np.zeros(pending.size, dtype=bool)
+            stored = self.keys[candidate[live]]
+            wanted = keys[pending[live]]
+            hit[live] = (stored[:, 0] == wanted[:, 0]) & (stored[:, 1] == wanted[:, 1])
+            found[pending[hit]] = pos[pending[hit]]
+
+            # Tombstones don't end a probe sequence, empty positions do
+            keep = (candidate != _EMPTY) & ~hit
+            pending = pending[keep]
+            pos[pending] = (pos[pending] + 1) & mask
+        return found
+
+    def _claim(self, keys: np.ndarray, slots: np.ndarray) -> None:
+        """Point index positions at new slots (first come, first served per pass)."""
+        mask = (1 << self.bits) - 1
+        pending = np.arange(len(keys))
+        pos = self._positions(keys)
+
+        while pending.size:
+            p = pos[pending]
+            free = self.index[p] < 0
+            claimed, first = np.unique(p[free], return_index=True)
+            winners = pending[free][first]
+            self.tombstones -= int(np.count_nonzero(self.index[claimed] == _DELETED))
+            self.index[claimed] = slots[winners]
+
+            placed = np.zeros(len(keys), dtype=bool)
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            pos[pending] = (pos[pending] + 1) & mask
+
+    def find(self, keys: np.ndarray) -> np.ndarray:
+        """Slot of each key, -1 where it isn't in the table."""
+        pos = self._probe(keys)
+        return np.where(pos >= 0, self.index[np.maximum(pos, 0)], -1)
+
+    def get(self, keys: np.ndarray, tick: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (hit mask, rows) for N keys, rows NaN on misses; hits are marked as
+        used at tick.
+        """
+        slots = self.find(keys)
+        hit = slots >= 0
+        # One gather for everything (misses read slot 0), then blank the misses
+        rows = self.values[np.maximum(slots, 0)]
+        rows[~hit] = np.nan
+        self.last_used[slots[hit]] = tick
+        return hit, rows
+
+    def put(self, keys: np.ndarray, values: np.ndarray, tick: int) -> None:
+        """Add entries (duplicates and keys already present are skipped)."""
+        first = _unique_rows(keys)
+        keys, values = keys[first], values[first]
+        new = self.find(keys) < 0
+        keys, values = keys[new][-self.capacity:], values[new][-self.capacity:]
+        if not len(keys):
+            return
+
+        slots = np.flatnonzero(np.asarray(self.last_used) < 0)[:len(keys)]
+        short = len(keys) - len(slots)
+        if short:
+            # Table is full once the free slots are taken: evict the least
+            # recently used of the entries already there, all at once
+            used = np.flatnonzero(np.asarray(self.last_used) >= 0)
+            victims = used[np.argpartition(np.asarray(self.last_used[used]), short - 1)[:short]]
+            pos = self._probe(np.asarray(self.keys[victims]))
+            self.index[pos[pos >= 0]] = _DELETED
+            self.tombstones += short
+            self.count -= short
+            self.evictions += short
+            slots = np.concatenate([slots, victims])
+
+        self.values[slots] = values
+        self.keys[slots] = keys
+        self.last_used[slots] = tick
+        self.count += len(slots)
+        if self.tombstones > self.capacity // 2:
+            self._rebuild()
+        else:
+            self._claim(keys, slots)
+
+
+class DiskTable(LRUTable):
+    """An `LRUTable` whose arrays are .npy files memory-mapped from a directory."""
+
+    FILES = ('keys.npy', 'values.npy', 'last_used.npy')
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        names = [os.path.join(path, name) for name in self.FILES]
+        meta = self._read_meta()
+        if meta is not None and meta['row_fields'] == list(ROW_FIELDS) \
+                and all(os.path.exists(name) for name in names):
+            # An existing cache keeps its own capacity
+            arrays = [np.load(name, mmap_mode='r+') for name in names]
+            self.tick = meta['tick']
+        else:
+            shapes = ((capacity, 2), (capacity, ROW_WIDTH), (capacity,))
+            dtypes = (np.uint64, np.float64, np.int64)
+            arrays = [open_memmap(name, mode='w+', dtype=dtype, shape=shape)
+                      for name, dtype, shape in zip(names, dtypes, shapes)]
+            arrays[2][:] = -1
+            self.tick = 0
+        super().__init__(*arrays)
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def flush(self, tick: int) -> None:
+        """Write the arrays and the current tick back to disk."""
+        for array in (self.values, self.keys, self.last_used):
+            array.flush()
+        self.tick = tick
+        with open(os.path.join(self.path, 'meta.json'), 'w') as fh:
+            json.dump({'tick': tick, 'capacity': self.capacity,
+                       'row_fields': list(ROW_FIELDS)}, fh)
+
+
+# ============================================================================
+# TWO-TIER CACHE
+# ============================================================================
+
+@dataclass
+class CacheStats:
+    """Running lookup counts for a `ResultCache`."""
+    lookups: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def format(self) -> str:
+        return (f"{self.lookups} lookups, {self.hit_rate:.1%} hits "
+                f"({self.memory_hits} memory, {self.disk_hits} disk), {self.misses} misses")
+
+
+class ResultCache:
+    """
+    Memory LRU in front of an optional on-disk LRU, keyed by `state_keys`.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory for the disk tier (created if needed); memory-only if None
+    memory_entries : int
+        Capacity of the memory tier
+    disk_bytes : int
+        Size bound of the disk tier (ENTRY_BYTES per entry). Only used when
+        the directory is new — an existing cache keeps its capacity.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.memory = LRUTable.in_memory(memory_entries)
+        self.disk = DiskTable(path, max(1, disk_bytes // ENTRY_BYTES)) if path else None
+        self.tick = self.disk.tick if self.disk else 0
+        self.stats = CacheStats()
+
+    def lookup(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up N keys.
+
+        Returns
+        -------
+        (hit, rows)
+            Boolean hit mask, shape (N,), and the cached rows, shape
+            (N, ROW_WIDTH), NaN where hit is False
+        """
+        self.tick += 1
+        hit, rows = self.memory.get(keys, self.tick)
+        memory_hits = int(hit.sum())
+
+        if self.disk is not None and memory_hits < len(keys):
+            missed = np.flatnonzero(~hit)
+            on_disk, rows_disk = self.disk.get(keys[missed], self.tick)
+            promoted = missed[on_disk]
+            rows[promoted] = rows_disk[on_disk]
+            hit[promoted] = True
+            self.memory.put(keys[promoted], rows[promoted], self.tick)
+
+        hits = int(hit.sum())
+        self.stats.lookups += len(keys)
+        self.stats.memory_hits += memory_hits
+        self.stats.disk_hits += hits - memory_hits
+        self.stats.misses += len(keys) - hits
+        return hit, rows
+
+    def insert(self, keys: np.ndarray, rows: np.ndarray) -> None:
+        """Store freshly computed rows in both tiers."""
+        self.memory.put(keys, rows, self.tick)
+        if self.disk is not None:
+            self.disk.put(keys, rows, self.tick)
+
+    def flush(self) -> None:
+        if self.disk is not None:
+            self.disk.flush(self.tick)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'ResultCache':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+# ============================================================================
+# CACHED CONVERSION
+# ============================================================================
+
+def convert_rows(r: np.ndarray, v: np.ndarray, mu: float) -> np.ndarray:
+    """Elements plus verification residuals, shape (N, ROW_WIDTH)."""
+    elements = state_to_keplerian_batch(r, v, mu)
+    residuals = verify_elements_batch(r, v, elements, mu)
+    return np.vstack([elements.data] + [residuals[name] for name in CHECKS]).T
+
+
+def convert_cached(r: np.ndarray, v: np.ndarray, mu: float, cache: ResultCache
+                   ) -> Tuple[ElementStore, Dict[str, np.ndarray], np.ndarray]:
+    """
+    `state_to_keplerian_batch` + `verify_elements_batch`, only for the states
+    the cache hasn't seen.
+
+    Returns
+    -------
+    (elements, residuals, hit)
+        The columnar elements, the residual arrays by check name (as from
+        `verify_elements_batch`) and the cache hit mask
+    """
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    keys = state_keys(r, v, mu)
+    hit, rows = cache.lookup(keys)
+    missed = np.flatnonzero(~hit)
+    if len(missed):
+        rows[missed] = convert_rows(r[missed], v[missed], mu)
+        cache.insert(keys[missed], rows[missed])
+
+    columns = np.ascontiguousarray(rows.T)
+    elements = ElementStore(columns[:len(FIELDS)])
+    residuals = {name: columns[len(FIELDS) + k] for k, name in enumerate(CHECKS)}
+    return elements, residuals, hit
+
+
+def main(argv=None):
+    """Convert a state file through the cache and report hit rates and timing."""
+    import argparse
+    import time
+    from state_io import DEFAULT_CHUNK_SIZE, read_state_chunks
+
+    parser = argparse.ArgumentParser(description="Cached conversion of a state file.")
+    parser.add_argument('states', help="CSV or raw float64 state file (see state_io)")
+    parser.add_argument('--cache', required=True, help="cache directory")
+    parser.add_argument('--format', choices=('csv', 'bin'))
+    parser.add_argument('--mu', type=float, default=MU_EARTH)
+    parser.add_argument('--memory-entries', type=int, default=DEFAULT_MEMORY_ENTRIES)
+    parser.add_argument('--disk-mb', type=float, default=DEFAULT_DISK_BYTES / 2**20)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with ResultCache(args.cache, args.memory_entries, int(args.disk_mb * 2**20)) as cache:
+        for r, v in read_state_chunks(args.states, args.format, args.chunk_size):
+            convert_cached(r, v, args.mu, cache)
+        print(f"{cache.stats.format()} in {time.perf_counter() - start:.2f} s "
+              f"({cache.memory.evictions} memory / "
+              f"{cache.disk.evictions} disk evictions)")
+
+
+if __name__ == "__main__":
+    main()
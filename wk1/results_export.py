@@ -0,0 +1,199 @@
+"""
+Bulk Results Export
+SPCE 5025 - Fundamentals of Astronautics
+
+`write_results_to_file` formats one number per f-string and makes ~15 write
+calls per orbit, which is fine for the four homework vectors and painfully
+slow for a million. This module writes the same reports a block of orbits at
+a time:
+
+- every number for a block is gathered into one (K, 18) array (r, v and the
+  to_degrees() values), converted to Python floats in a single `.tolist()`
+- each orbit is one `%`-format of a pre-built record template
+- a block of records is joined and handed to the file in one write
+
+'%16.8f' and f'{x:16.8f}' go through the same float formatter, so the
+'text' mode is byte-identical to `write_results_to_file` for the same inputs.
+Two machine-friendly modes sit next to it: 'csv' and 'jsonl' (one JSON
+object per orbit).
+"""
+
+import json
+import numpy as np
+from typing import Iterator, Optional, Sequence, Union
+
+from element_store import DEGREE_KEYS, ElementStore, FIELDS
+from instrumentation import stage
+
+# Orbits formatted per write call
+EXPORT_BLOCK = 10_000
+
+MODES = ('text', 'csv', 'jsonl')
+
+STATE_KEYS = ('rx', 'ry', 'rz', 'vx', 'vy', 'vz')
+DISPLAY_KEYS = tuple(DEGREE_KEYS[name] for name in FIELDS)
+COLUMNS = STATE_KEYS + DISPLAY_KEYS
+
+
+# ============================================================================
+# RECORD TEMPLATES
+# ============================================================================
+
+TEXT_HEADER = "Homework 1 Results\n" + "=" * 60 + "\n" + "mu: {mu:.9e} m^3/s^2\n\n"
+
+# Same layout as write_results_to_file, one record per orbit. The name is the
+# first and eighth argument; the numbers follow the COLUMNS order.
+TEXT_RECORD = (
+    "%s\n"
+    "r:  ( %16.8f, %16.8f, %16.8f) m\n"
+    "rd: ( %16.8f, %16.8f, %16.8f) m/sec\n\n"
+    "Keplerian Elements for %s\n"
+    "        a:    %16.8f m\n"
+    "        e:    %16.8f\n"
+    "        inc:  %16.8f deg\n"
+    "        raan: %16.8f deg\n"
+    "        wp:   %16.8f deg\n"
+    "        nu:   %16.8f deg\n"
+    "        TP:   %16.8f sec\n"
+    "        rp:   %16.8f m\n"
+    "        ra:   %16.8f m\n"
+    "\n\n"
+)
+
+CSV_HEADER = ','.join(('name',) + COLUMNS) + '\n'
+CSV_RECORD = '%s' + ',%.17g' * len(COLUMNS) + '\n'
+
+# float repr round-trips and is what json.dumps uses for finite numbers
+JSONL_RECORD = '{"name": %s, ' + ', '.join(f'"{key}": %r' for key in COLUMNS) + '}\n'
+
+
+# ============================================================================
+# FORMATTING
+# ============================================================================
+
+def _as_store(elements: Union[ElementStore, Sequence]) -> ElementStore:
+    return elements if isinstance(elements, ElementStore) else ElementStore.from_elements(elements)
+
+
+def _value_block(r: np.ndarray, v: np.ndarray, display: dict, block: slice) -> list:
+    """Rows of [rx, ry, rz, vx, vy, vz, a_m, ..., r_apoapsis_m] as Python floats."""
+    values = np.empty((block.stop - block.start, len(COLUMNS)))
+    values[:, 0:3] = r[block]
+    values[:, 3:6] = v[block]
+    for k, key in enumerate(DISPLAY_KEYS):
+        values[:, 6 + k] = display[key][block]
+    return values.tolist()
+
+
+def _csv_name(name: str) -> str:
+    """Quote a name only if it needs it (commas, quotes or newlines)."""
+    if any(c in name for c in ',"\n\r'):
+        return '"' + name.replace('"', '""') + '"'
+    return name
+
+
+def _jsonl_line(name: str, row: list) -> str:
+    if all(np.isfinite(row)):
+        return JSONL_RECORD % ((json.dumps(name),) + tuple(row))
+    # inf periods/apoapses of unbound orbits: let json spell them out
+    return json.dumps(dict(zip(('name',) + COLUMNS, [name] + row))) + '\n'
+
+
+def _text_records(names: Sequence[str], rows: list) -> list:
+    return [TEXT_RECORD % ((name,) + tuple(row[:6]) + (name,) + tuple(row[6:]))
+            for name, row in zip(names, rows)]
+
+
+def text_records(names: Sequence[str], r: np.ndarray, v: np.ndarray,
+                 elements: Union[ElementStore, Sequence]) -> list:
+    """
+    The 'text' report record of each orbit as its own string — for callers
+    that place records individually (`catalog_update` patches them in place).
+    """
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    rows = _value_block(r, v, _as_store(elements).to_degrees(), slice(0, len(r)))
+    return _text_records([str(name) for name in names], rows)
+
+
+def format_blocks(names: Sequence[str], r: np.ndarray, v: np.ndarray,
+                  elements: Union[ElementStore, Sequence], mode: str = 'text',
+                  block_size: int = EXPORT_BLOCK) -> Iterator[str]:
+    """
+    Yield the body of a results file as large strings, block_size orbits each.
+
+    Headers are not included — see `write_results`.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown export mode '{mode}' (expected one of {MODES})")
+    r = np.asarray(r, dtype=np.float64).reshape(-1, 3)
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    display = _as_store(elements).to_degrees()
+    names = [str(name) for name in names]
+
+    for start in range(0, len(names), block_size):
+        block = slice(start, min(start + block_size, len(names)))
+        rows = _value_block(r, v, display, block)
+        block_names = names[block]
+
+        if mode == 'text':
+            yield ''.join(_text_records(block_names, rows))
+        elif mode == 'csv':
+            yield ''.join([CSV_RECORD % ((_csv_name(name),) + tuple(row))
+                           for name, row in zip(block_names, rows)])
+        else:
+            yield ''.join([_jsonl_line(name, row) for name, row in zip(block_names, rows)])
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def write_results(filename: str, names: Sequence[str], r: np.ndarray, v: np.ndarray,
+                  elements: Union[ElementStore, Sequence], mu: Optional[float] = None,
+                  mode: str = 'text', block_size: int = EXPORT_BLOCK,
+                  append: bool = False) -> None:
+    """
+    Write a results file for many orbits at once.
+
+    Parameters
+    ----------
+    filename : str
+        Where to save the output
+    names : sequence of str
+        One name per orbit (the 'name' of each test case)
+    r, v : np.ndarray
+        Input state vectors, shape (N, 3) [m, m/s]
+    elements : ElementStore or list of KeplerianElements
+        The computed elements, in the same order
+    mu : float
+        Gravitational parameter (only written in 'text' mode, where it's required)
+    mode : str
+        'text' (the hw1_results.txt layout), 'csv' or 'jsonl'
+    block_size : int
+        Orbits formatted per write
+    append : bool
+        Add the orbits to the end of an existing file, without a header —
+        for writing a big conversion chunk by chunk
+    """
+    if mode == 'text' and mu is None and not append:
+        raise ValueError("The text report needs mu for its header")
+
+    # Large buffer so each block goes to the OS in a handful of syscalls
+    with stage('write', len(names)), \
+            open(filename, 'a' if append else 'w', buffering=1 << 20) as fid:
+        if mode == 'text' and not append:
+            fid.write(TEXT_HEADER.format(mu=mu))
+        elif mode == 'csv' and not append:
+            fid.write(CSV_HEADER)
+        for chunk in format_blocks(names, r, v, elements, mode, block_size):
+            fid.write(chunk)
+
+
+def write_test_case_results(filename: str, test_cases: list, all_elements,
+                            mu: float, mode: str = 'text') -> None:
+    """`write_results` taking the same test-case dictionaries as `write_results_to_file`."""
+    names = [case['name'] for case in test_cases]
+    r = np.array([case['r'] for case in test_cases], dtype=np.float64).reshape(-1, 3)
+    v = np.array([case['v'] for case in test_cases], dtype=np.float64).reshape(-1, 3)
+    write_results(filename, names, r, v, all_elements, mu, mode)
@@ -0,0 +1,204 @@
+"""
+Streaming State Vector Ingestion
+SPCE 5025 - Fundamentals of Astronautics
+
+Reads (r, v) state vectors from files far bigger than memory and feeds them
+through the batch conversion a fixed-size chunk at a time. Two formats:
+
+- CSV: six numeric columns rx, ry, rz, vx, vy, vz [m, m/s] per line.
+  Lines starting with '#' and a non-numeric header line are skipped.
+- Binary: raw little-endian float64 records of the same six values
+  (48 bytes per state, no header) — what our daily dumps use.
+
+Memory use is bounded by the chunk size no matter how large the file is.
+"""
+
+import itertools
+import os
+import numpy as np
+from typing import Iterator, Optional, TextIO, Tuple
+
+from batch_conversion import state_to_keplerian_batch
+from element_store import ElementStore
+from instrumentation import stage, timed_iter
+
+# Six float64 values per state: rx, ry, rz, vx, vy, vz
+STATE_DTYPE = np.dtype('<f8')
+VALUES_PER_STATE = 6
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+FORMATS = ('csv', 'bin')
+
+
+# ============================================================================
+# READERS
+# ============================================================================
+
+def detect_format(path: str) -> str:
+    """Guess 'csv' or 'bin' from the file extension (.csv/.txt are text)."""
+    ext = os.path.splitext(path)[1].lower()
+    return 'csv' if ext in ('.csv', '.txt') else 'bin'
+
+
+def _split_states(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(K, 6) block -> (K, 3) position and (K, 3) velocity views."""
+    values = values.reshape(-1, VALUES_PER_STATE)
+    return values[:, :3], values[:, 3:]
+
+
+def _csv_data_lines(fh: TextIO) -> Iterator[str]:
+    """Data lines of a state CSV, skipping blanks, comments and a header row."""
+    first = True
+    for line in fh:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if first:
+            first = False
+            try:
+                float(stripped.split(',')[0])
+            except ValueError:
+                continue   # header row
+        yield stripped
+
+
+def read_csv_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+                    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield (r, v) arrays of up to chunk_size states from a CSV file."""
+    with open(path, 'r') as fh:
+        lines = _csv_data_lines(fh)
+        while True:
+            block = list(itertools.islice(lines, chunk_size))
+            if not block:
+                return
+            values = np.loadtxt(block, delimiter=',', dtype=np.float64, ndmin=2)
+            if values.shape[1] != VALUES_PER_STATE:
+                raise ValueError(f"{path}: expected {VALUES_PER_STATE} columns, "
+                                 f"got {values.shape[1]}")
+            yield _split_states(values)
+
+
+def read_binary_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+                       ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield (r, v) arrays of up to chunk_size states from a raw float64 file."""
+    record_bytes = VALUES_PER_STATE * STATE_DTYPE.itemsize
+    size = os.path.getsize(path)
+    if size % record_bytes:
+        raise ValueError(f"{path}: {size} bytes is not a whole number of "
+                         f"{record_bytes}-byte state records")
+
+    with open(path, 'rb') as fh:
+        while True:
+            values = np.fromfile(fh, dtype=STATE_DTYPE,
+                                 count=chunk_size * VALUES_PER_STATE)
+            if values.size == 0:
+                return
+            yield _split_states(values.astype(np.float64, copy=False))
+
+
+def read_state_chunks(path: str, fmt: Optional[str] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE
+                      ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream state vectors from a file in fixed-size chunks.
+
+    Parameters
+    ----------
+    path : str
+        CSV or raw binary state file
+    fmt : str, optional
+        'csv' or 'bin'; guessed from the extension when omitted
+    chunk_size : int
+        States per chunk (the last chunk may be shorter)
+
+    Yields
+    ------
+    (r, v)
+        Position [m] and velocity [m/s] arrays, each of shape (K, 3)
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown state file format '{fmt}' (expected one of {FORMATS})")
+    reader = read_csv_chunks if fmt == 'csv' else read_binary_chunks
+    return reader(path, chunk_size)
+
+
+def count_states(path: str, fmt: Optional[str] = None) -> int:
+    """Number of states in a file (from the size for binary, one pass for CSV)."""
+    fmt = fmt or detect_format(path)
+    if fmt == 'bin':
+        return os.path.getsize(path) // (VALUES_PER_STATE * STATE_DTYPE.itemsize)
+    with open(path, 'r') as fh:
+        return sum(1 for _ in _csv_data_lines(fh))
+
+
+def write_binary_states(path: str, r: np.ndarray, v: np.ndarray,
+                        append: bool = False) -> None:
+    """Write (N, 3) r and v arrays as raw little-endian float64 state records."""
+    values = np.hstack([np.asarray(r, dtype=STATE_DTYPE), np.asarray(v, dtype=STATE_DTYPE)])
+    with open(path, 'ab' if append else 'wb') as fh:
+        values.tofile(fh)
+
+
+# ============================================================================
+# STREAMING CONVERSION
+# ============================================================================
+
+def convert_file(path: str, mu: float, fmt: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE
+                 ) -> Iterator[Tuple[np.ndarray, np.ndarray, ElementStore]]:
+    """
+    Stream a state file through `state_to_keplerian_batch`.
+
+    Yields
+    ------
+    (r, v, elements)
+        The chunk's input states and its columnar elements
+    """
+    for r, v in timed_iter('ingest', read_state_chunks(path, fmt, chunk_size)):
+        with stage('convert', len(r)):
+            elements = state_to_keplerian_batch(r, v, mu)
+        yield r, v, elements
+
+
+def run_conversion(path: str, mu: float, output: Optional[str] = None,
+                   fmt: Optional[str] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   archive: Optional[str] = None) -> int:
+    """
+    Convert a whole state file, optionally writing the results as CSV (the
+    `results_export` 'csv' layout, named by row number) and/or a binary
+    element archive (see `element_archive`; IDs are row numbers).
+
+    Returns the number of states converted.
+    """
+    from element_archive import ArchiveWriter
+    from results_export import write_results
+
+    total = 0
+    writer = ArchiveWriter(archive, count_states(path, fmt), mu, with_states=True) \
+        if archive else None
+    if output:
+        # Header only; each chunk is appended as it's converted
+        write_results(output, [], np.empty((0, 3)), np.empty((0, 3)),
+                      ElementStore.empty(0), mode='csv')
+    try:
+        for r, v, elements in convert_file(path, mu, fmt, chunk_size):
+            if output:
+                write_results(output, [str(i) for i in range(total, total + len(elements))],
+                              r, v, elements, mode='csv', append=True)
+            if writer:
+                with stage('write', len(elements)):
+                    ids = np.arange(total, total + len(elements), dtype=np.int64)
+                    writer.write(total, ids, elements, r, v)
+            total += len(elements)
+    except BaseException:
+        # Don't leave a half-filled archive behind (see ArchiveWriter.abort)
+        if writer:
+            writer.abort()
+        raise
+    if writer:
+        with stage('write'):
+            writer.close()
+    return total
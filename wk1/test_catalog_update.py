@@ -0,0 +1,128 @@
+"""Incremental catalog updates should end where a fresh build of the same snapshot does."""
+
+import numpy as np
+
+from batch_verification import CHECKS
+from benchmarks import random_states
+from catalog_update import REPORT_FILE, CatalogStore, Snapshot, read_snapshot, write_snapshot
+
+MU_EARTH = 3.986004418e14
+
+
+def _snapshot(ids, seed=0, epoch=0.0):
+    r, v = random_states(len(ids), seed)
+    return Snapshot(ids, np.full(len(ids), epoch), r, v)
+
+
+def _subset(snapshot, keep):
+    return Snapshot(snapshot.ids[keep], snapshot.epochs[keep], snapshot.r[keep], snapshot.v[keep])
+
+
+def _report(store):
+    """Report records by object ID (slot padding stripped)."""
+    with open(f'{store.path}/{REPORT_FILE}', 'rb') as fh:
+        data = fh.read()
+    assert len(data) == store.report_header + store.capacity * store.slot_bytes
+    slots = {slot: data[store.report_header + slot * store.slot_bytes:][:store.slot_bytes]
+             for slot in store.live_slots.tolist()}
+    return {int(store.ids[slot]): text.rstrip() for slot, text in slots.items()}
+
+
+def _by_id(store):
+    order = np.argsort(store.ids[store.live_slots])
+    slots = store.live_slots[order]
+    return (np.array(store.ids[slots]), np.array(store.elements[:, slots]),
+            np.array(store.residuals[:, slots]), np.array(store.j2_rates[:, slots]))
+
+
+def _assert_matches_fresh_build(store, snapshot, tmp_path):
+    fresh = CatalogStore.create(str(tmp_path / 'fresh'), MU_EARTH, len(snapshot))
+    fresh.update(snapshot)
+    for ours, theirs in zip(_by_id(store), _by_id(fresh)):
+        np.testing.assert_array_equal(ours, theirs)
+    assert _report(store) == _report(fresh)
+    # and the report survives reopening the store
+    assert _report(CatalogStore(store.path)) == _report(fresh)
+
+
+def test_first_update_builds_everything(tmp_path):
+    snapshot = _snapshot(np.arange(100, 150))
+    store = CatalogStore.create(str(tmp_path / 'store'), MU_EARTH, 10)
+    summary = store.update(snapshot)
+    assert (summary.new, summary.changed, summary.removed, summary.unchanged) == (50, 0, 0, 0)
+    assert len(store) == 50 and store.capacity >= 50
+    assert store.residuals.shape[0] == len(CHECKS)
+    assert store.update(snapshot).recomputed == 0
+    _assert_matches_fresh_build(store, snapshot, tmp_path)
+
+
+def test_churn_matches_fresh_build(tmp_path):
+    base = _snapshot(np.arange(1000, 1200), seed=1)
+    store = CatalogStore.create(str(tmp_path / 'store'), MU_EARTH, 250)
+    store.update(base)
+
+    # Drop 20 objects, move 30 (new state and epoch), add 20 new ones
+    keep = np.ones(len(base), dtype=bool)
+    keep[::10] = False
+    churn = _subset(base, keep)
+    moved = np.arange(1, len(churn), 6)
+    r, v = random_states(len(churn), seed=2)
+    churn.r[moved], churn.v[moved] = r[moved], v[moved]
+    churn.epochs[moved] = 60.0
+    added = _snapshot(np.arange(5000, 5020), seed=3, epoch=60.0)
+    snapshot = Snapshot(np.r_[churn.ids, added.ids], np.r_[churn.epochs, added.epochs],
+                        np.r_[churn.r, added.r], np.r_[churn.v, added.v])
+
+    removed_slots = store.slots(base.ids[~keep])
+    count = store.count
+    summary = store.update(snapshot)
+    assert (summary.new, summary.changed, summary.removed) == (20, len(moved), 20)
+    assert summary.unchanged == len(churn) - len(moved)
+    # The new objects took over exactly the slots the removed ones left
+    assert store.count == count
+    assert set(store.slots(added.ids).tolist()) == set(removed_slots.tolist())
+    assert (store.slots(base.ids[~keep]) == -1).all()
+    _assert_matches_fresh_build(store, snapshot, tmp_path)
+
+
+def test_removed_slots_are_blanked_then_reused(tmp_path):
+    base = _snapshot(np.arange(10))
+    store = CatalogStore.create(str(tmp_path / 'store'), MU_EARTH, 10)
+    store.update(base)
+    slot = int(store.slots(np.array([3]))[0])
+
+    store.update(_subset(base, base.ids != 3))
+    with open(f'{store.path}/{REPORT_FILE}', 'rb') as fh:
+        fh.seek(store.report_header + slot * store.slot_bytes)
+        assert fh.read(store.slot_bytes).strip() == b''
+
+    store.update(Snapshot(np.r_[base.ids[base.ids != 3], 42],
+                          np.zeros(10), np.r_[base.r[base.ids != 3], base.r[3:4]],
+                          np.r_[base.v[base.ids != 3], base.v[3:4]]))
+    assert int(store.slots(np.array([42]))[0]) == slot
+    assert store.count == 10
+
+
+def test_record_outgrowing_slots_rewrites_report(tmp_path):
+    base = _snapshot(np.arange(30))
+    store = CatalogStore.create(str(tmp_path / 'store'), MU_EARTH, 40)
+    store.update(base)
+    slot_bytes = store.slot_bytes
+
+    # Astronomically large numbers make one record far longer than a slot
+    grown = _subset(base, np.ones(len(base), dtype=bool))
+    grown.r[7] *= 1e60
+    grown.v[7] /= 1e30
+    summary = store.update(grown)
+    assert summary.changed == 1
+    assert store.slot_bytes > slot_bytes
+    assert CatalogStore(store.path).slot_bytes == store.slot_bytes
+    _assert_matches_fresh_build(store, grown, tmp_path)
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    snapshot = _snapshot(np.arange(7), seed=4, epoch=12.5)
+    write_snapshot(str(tmp_path / 'snap.bin'), snapshot)
+    back = read_snapshot(str(tmp_path / 'snap.bin'))
+    for name in ('ids', 'epochs', 'r', 'v'):
+        np.testing.assert_array_equal(getattr(back, name), getattr(snapshot, name))
@@ -0,0 +1,71 @@
+"""Checks for conjunction screening: empty results and a brute-force comparison."""
+
+import numpy as np
+import pytest
+
+from conjunction import MU_EARTH, screen_conjunctions
+from propagation import propagate
+
+R_GEO = 4.2164e7
+V_LEO = np.sqrt(MU_EARTH / 7e6)
+
+
+def _shell(n, seed):
+    """n circular orbits at 7000 +- 20 km with random planes and phases."""
+    rng = np.random.default_rng(seed)
+    radius = 7e6 + rng.uniform(-2e4, 2e4, n)
+    u = rng.normal(size=(n, 3))
+    u /= np.linalg.norm(u, axis=1)[:, np.newaxis]
+    w = np.cross(u, rng.normal(size=(n, 3)))
+    w /= np.linalg.norm(w, axis=1)[:, np.newaxis]
+    return u * radius[:, np.newaxis], w * np.sqrt(MU_EARTH / radius)[:, np.newaxis]
+
+
+NO_CANDIDATES = {
+    'no objects': (np.empty((0, 3)), np.empty((0, 3))),
+    'single object': ([[7e6, 0.0, 0.0]], [[0.0, V_LEO, 0.0]]),
+    'LEO and GEO': ([[7e6, 0.0, 0.0], [R_GEO, 0.0, 0.0]],
+                    [[0.0, V_LEO, 0.0], [0.0, np.sqrt(MU_EARTH / R_GEO), 0.0]]),
+    'same orbit, opposite sides': ([[7e6, 0.0, 0.0], [-7e6, 0.0, 0.0]],
+                                   [[0.0, V_LEO, 0.0], [0.0, -V_LEO, 0.0]]),
+}
+
+
+@pytest.mark.parametrize('name', NO_CANDIDATES)
+def test_no_close_approach_gives_empty_result(name):
+    r0, v0 = (np.array(x, dtype=np.float64) for x in NO_CANDIDATES[name])
+    result = screen_conjunctions(r0, v0, 0.0, 3600.0)
+    assert len(result) == 0
+    assert result.stats['conjunctions'] == 0
+
+
+def test_reversed_interval_is_rejected():
+    with pytest.raises(ValueError):
+        screen_conjunctions(*_shell(2, seed=0), 100.0, 100.0)
+
+
+def test_matches_brute_force():
+    n, threshold, sample = 200, 50e3, 0.25
+    r0, v0 = _shell(n, seed=0)
+    result = screen_conjunctions(r0, v0, 0.0, 600.0, threshold=threshold)
+
+    # Every pair's closest sampled distance on a fine grid. Sampling can only
+    # overestimate the miss distance, by at most sqrt(m^2 + (v dt/2)^2) - m
+    r, _ = propagate(r0, v0, np.arange(0.0, 600.0 + sample, sample), MU_EARTH)
+    i, j = np.triu_indices(n, 1)
+    sampled = np.full(len(i), np.inf)
+    for r_k in r.transpose(1, 0, 2).copy():
+        rho = r_k[i] - r_k[j]
+        np.minimum(sampled, np.einsum('ij,ij->i', rho, rho), out=sampled)
+    sampled = np.sqrt(sampled)
+    slack = 15e3 * sample / 2
+
+    found = dict(zip(zip(result.primary.tolist(), result.secondary.tolist()),
+                     result.miss_distance))
+    expected = {(a, b) for a, b, d in zip(i.tolist(), j.tolist(), sampled) if d <= threshold}
+    assert expected, "population should produce some close approaches"
+    assert expected <= set(found)
+    for (a, b), miss in found.items():
+        d = sampled[np.flatnonzero((i == a) & (j == b))[0]]
+        assert miss <= d + 1.0
+        assert d - miss <= slack
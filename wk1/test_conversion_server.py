@@ -0,0 +1,118 @@
+"""Micro-batching fallback and HTTP framing checks for the conversion server."""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from conversion_server import STATE_BYTES, Client, ConversionServer, MicroBatcher
+
+STATE = {'r': [7e6, 0.0, 0.0], 'v': [0.0, 7500.0, 0.0]}
+
+
+def _serve(scenario):
+    """Run scenario(address) against a server on a free local port."""
+    async def run():
+        server = await ConversionServer().start(('127.0.0.1', 0))
+        try:
+            return await scenario(server.sockets[0].getsockname()[:2])
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(run())
+
+
+async def _raw(address, data):
+    """Send raw bytes and read until the server closes the connection."""
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(data)
+    await writer.drain()
+    reply = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    return reply
+
+
+# ============================================================================
+# MICRO-BATCHING
+# ============================================================================
+
+def test_failed_batch_falls_back_to_single_items():
+    calls = []
+
+    def halve(items):
+        calls.append(list(items))
+        if 'bad' in items:
+            raise ValueError('bad item')
+        return [item / 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(halve, max_batch=4, max_delay=10.0)
+        futures = [batcher.submit(item) for item in (2, 'bad', 6, 8)]
+        return batcher, await asyncio.gather(*futures, return_exceptions=True)
+
+    batcher, results = asyncio.run(run())
+    assert results[0] == 1 and results[2] == 3 and results[3] == 4
+    assert isinstance(results[1], ValueError)
+    # One batch call, then one call per item
+    assert calls == [[2, 'bad', 6, 8], [2], ['bad'], [6], [8]]
+    assert batcher.stats()['batches'] == 1 and batcher.stats()['requests'] == 4
+
+
+def test_requests_are_batched_until_the_deadline():
+    async def run():
+        batcher = MicroBatcher(lambda items: [len(items)] * len(items),
+                               max_batch=100, max_delay=0.01)
+        return await asyncio.gather(*[batcher.submit(k) for k in range(5)])
+
+    assert asyncio.run(run()) == [5] * 5
+
+
+# ============================================================================
+# HTTP FRAMING
+# ============================================================================
+
+@pytest.mark.parametrize('path, body', [
+    ('/bulk/convert', b'\0' * (STATE_BYTES + 2)),        # not whole states
+    ('/bulk/convert?mu=-1', b'\0' * STATE_BYTES),          # bad mu
+    ('/bulk/convert?mu=abc', b'\0' * STATE_BYTES),         # unparsable mu
+], ids=['partial state', 'negative mu', 'unparsable mu'])
+def test_rejected_bulk_body_keeps_connection_usable(path, body):
+    async def scenario(address):
+        client = await Client.connect(address)
+        status, reply = await client.request('POST', path, body, 'application/octet-stream')
+        after = await client.call('/convert', STATE)
+        await client.close()
+        return status, json.loads(reply), after
+
+    status, reply, after = _serve(scenario)
+    assert status == 400 and 'error' in reply
+    assert after['elements']['a'] > 0
+
+
+def test_bulk_round_trip_matches_single_requests():
+    async def scenario(address):
+        client = await Client.connect(address)
+        rows = await client.bulk(np.array([STATE['r']]), np.array([STATE['v']]))
+        single = await client.call('/convert', STATE)
+        await client.close()
+        return rows, single
+
+    rows, single = _serve(scenario)
+    assert rows.shape == (1, 9)
+    assert rows[0, 0] == single['elements']['a']
+
+
+@pytest.mark.parametrize('head', [
+    b'GARBAGE\r\n\r\n',
+    b'POST /convert HTTP/1.1\r\nContent-Length: lots\r\n\r\n',
+    b'POST /convert HTTP/1.1\r\nContent-Length: -5\r\n\r\n',
+], ids=['one token', 'non-numeric length', 'negative length'])
+def test_malformed_head_gets_400_and_close(head):
+    # A second, valid request is queued behind the bad one; it must not be answered
+    valid = json.dumps(STATE).encode()
+    follow = b'POST /convert HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(valid) + valid
+    reply = _serve(lambda address: _raw(address, head + follow))
+    assert reply.startswith(b'HTTP/1.1 400 ')
+    assert reply.count(b'HTTP/1.1') == 1
+    assert b'malformed request' in reply
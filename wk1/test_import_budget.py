@@ -0,0 +1,29 @@
+"""Cold-start import checks: the compute modules stay light and never load matplotlib."""
+
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _run(code):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([HERE, os.environ.get('PYTHONPATH', '')]))
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                          cwd=HERE, env=env)
+
+
+def test_import_budget_passes():
+    proc = _run("import sys, benchmarks\n"
+                "rows = benchmarks.check_import_budget()\n"
+                "print(rows)\n"
+                "sys.exit(0 if all(row['passed'] for row in rows) else 1)")
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+
+
+def test_imports_do_not_load_matplotlib():
+    proc = _run("import sys\n"
+                "import orbit_geometry, hw1_solution, hw1_visualizations\n"
+                "print(sorted(m for m in sys.modules if m.split('.')[0] == 'matplotlib'))")
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == '[]'
@@ -0,0 +1,37 @@
+"""Regression checks for the J2 secular propagation mode."""
+
+import numpy as np
+import pytest
+
+from j2_secular import MU_EARTH
+from propagation import propagate
+
+V_CIRC = np.sqrt(MU_EARTH / 7e6)
+
+# r0, v0 pairs covering every branch of the element conventions
+STATES = {
+    'equatorial eccentric': ([0.0, 7e6, 0.0], [-8000.0, 0.0, 0.0]),
+    'equatorial eccentric retrograde': ([0.0, 7e6, 0.0], [8000.0, 0.0, 0.0]),
+    'equatorial eccentric, periapsis off-axis': ([5e6, 5e6, 0.0], [-6500.0, 4000.0, 0.0]),
+    'circular equatorial': ([7e6, 0.0, 0.0], [0.0, V_CIRC, 0.0]),
+    'circular equatorial retrograde': ([0.0, 7e6, 0.0], [V_CIRC, 0.0, 0.0]),
+    'inclined eccentric': ([-464836.978606, -6191644.716805, -2961635.481039],
+                           [7322.77235464, 406.01896116, -1910.89281450]),
+    'inclined circular': ([7e6, 0.0, 0.0], [0.0, V_CIRC * np.cos(0.9), V_CIRC * np.sin(0.9)]),
+}
+
+
+@pytest.mark.parametrize('name', STATES)
+def test_j2_starts_at_initial_state(name):
+    r0, v0 = (np.array([x]) for x in STATES[name])
+    r, v = propagate(r0, v0, np.array([0.0]), MU_EARTH, method='j2')
+    assert np.max(np.abs(r[0, 0] - r0[0])) < 1e-3
+    assert np.max(np.abs(v[0, 0] - v0[0])) < 1e-6
+
+
+def test_j2_batch_of_mixed_rows_starts_at_initial_states():
+    r0 = np.array([state[0] for state in STATES.values()])
+    v0 = np.array([state[1] for state in STATES.values()])
+    r, v = propagate(r0, v0, np.array([0.0]), MU_EARTH, method='j2')
+    assert np.max(np.abs(r[:, 0] - r0)) < 1e-3
+    assert np.max(np.abs(v[:, 0] - v0)) < 1e-6
@@ -0,0 +1,54 @@
+"""Regression checks for the result cache's LRU tables."""
+
+import numpy as np
+
+from result_cache import ROW_WIDTH, LRUTable, ResultCache, state_keys
+
+
+def _keys(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return state_keys(rng.normal(size=(n, 3)) * 7e6, rng.normal(size=(n, 3)) * 7e3, 3.986e14)
+
+
+def _rows(n, start=0):
+    return np.arange(start, start + n, dtype=np.float64)[:, np.newaxis] * np.ones(ROW_WIDTH)
+
+
+def test_overflowing_partly_full_table_keeps_every_new_key():
+    table = LRUTable.in_memory(10)
+    old = _keys(5, seed=1)
+    table.put(old, _rows(5), tick=1)
+    new = _keys(8, seed=2)
+    table.put(new, _rows(8, start=100), tick=2)
+
+    hit, rows = table.get(new, tick=3)
+    assert hit.all()
+    assert np.array_equal(rows[:, 0], np.arange(100, 108))
+    # 5 free slots were used first, then the 3 oldest entries were evicted
+    assert table.evictions == 3
+    assert len(table) == 10
+    assert table.get(old, tick=3)[0].sum() == 2
+
+
+def test_evictions_keep_remaining_entries_reachable():
+    table = LRUTable.in_memory(64)
+    keys = _keys(1000, seed=3)
+    for start in range(0, 1000, 37):
+        block = keys[start:start + 37]
+        table.put(block, _rows(len(block), start), tick=start)
+        hit, rows = table.get(block, tick=start)
+        assert hit.all()
+        assert np.array_equal(rows[:, 0], np.arange(start, start + len(block)))
+    assert len(table) == 64
+    assert table.get(keys, tick=10_000)[0].sum() == 64
+
+
+def test_cache_hit_mask_and_stats():
+    cache = ResultCache(None, memory_entries=16)
+    keys = _keys(12)
+    hit, _ = cache.lookup(keys)
+    assert not hit.any()
+    cache.insert(keys, _rows(12))
+    hit, rows = cache.lookup(keys)
+    assert hit.all() and np.array_equal(rows[:, 0], np.arange(12))
+    assert cache.stats.hit_rate == 0.5
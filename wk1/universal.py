@@ -0,0 +1,284 @@
+"""
+Universal-Variable Propagation (All Conic Types)
+SPCE 5025 - Fundamentals of Astronautics - Class 2
+
+The f and g propagator in `propagation.py` works in eccentric anomaly, which
+only exists for ellipses — a = -mu/(2*energy) blows up at zero energy and
+there's no period for an escape trajectory. The universal variable chi
+(Vallado Sec. 2.3, Algorithm 8) sidesteps all of that: with the Stumpff
+functions c2(psi) and c3(psi), one set of equations covers ellipses
+(psi > 0), parabolas (psi = 0) and hyperbolas (psi < 0), so a mixed catalog
+goes through a single vectorized code path.
+"""
+
+import warnings
+import numpy as np
+from typing import Tuple
+
+from kepler_equation import BLOCK_SIZE, markley_starter
+
+TWO_PI = 2.0 * np.pi
+
+# |alpha| = |1/a| below this (in 1/m) is treated as parabolic
+PARABOLIC_ALPHA = 1e-12
+
+# Stumpff functions use their power series for |psi| below this
+SERIES_PSI = 1.0
+SERIES_TERMS = 12
+
+# Series coefficients: c2 = sum (-psi)^k/(2k+2)!, c3 = sum (-psi)^k/(2k+3)!
+_C2_COEFFS = np.array([1.0 / np.prod(np.arange(1, 2*k + 3, dtype=float))
+                       for k in range(SERIES_TERMS)])
+_C3_COEFFS = np.array([1.0 / np.prod(np.arange(1, 2*k + 4, dtype=float))
+                       for k in range(SERIES_TERMS)])
+
+
+# ============================================================================
+# STUMPFF FUNCTIONS
+# ============================================================================
+
+def stumpff(psi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stumpff functions c2(psi) and c3(psi), vectorized over all three regimes.
+
+    - psi > 0 (ellipse):   c2 = (1 - cos sqrt(psi))/psi,
+                           c3 = (sqrt(psi) - sin sqrt(psi))/sqrt(psi)^3
+    - psi < 0 (hyperbola): same with cosh/sinh of sqrt(-psi)
+    - |psi| small:         power series, which avoids the 0/0 cancellation
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (c2, c3), same shape as psi
+    """
+    psi = np.asarray(psi, dtype=np.float64)
+    c2 = np.empty_like(psi)
+    c3 = np.empty_like(psi)
+
+    small = np.abs(psi) < SERIES_PSI
+    pos = psi >= SERIES_PSI
+    neg = psi <= -SERIES_PSI
+
+    if small.any():
+        x = -psi[small]
+        s2 = np.full_like(x, _C2_COEFFS[-1])
+        s3 = np.full_like(x, _C3_COEFFS[-1])
+        for k in range(SERIES_TERMS - 2, -1, -1):   # Horner
+            s2 = s2*x + _C2_COEFFS[k]
+            s3 = s3*x + _C3_COEFFS[k]
+        c2[small], c3[small] = s2, s3
+
+    if pos.any():
+        p = psi[pos]
+        sp = np.sqrt(p)
+        c2[pos] = (1.0 - np.cos(sp)) / p
+        c3[pos] = (sp - np.sin(sp)) / (p*sp)
+
+    if neg.any():
+        p = -psi[neg]
+        sp = np.sqrt(p)
+        c2[neg] = (np.cosh(sp) - 1.0) / p
+        c3[neg] = (np.sinh(sp) - sp) / (p*sp)
+
+    return c2, c3
+
+
+# ============================================================================
+# PROPAGATION
+# ============================================================================
+
+def universal_constants(r0: np.ndarray, v0: np.ndarray, mu: float) -> dict:
+    """Per-object quantities for the universal-variable propagator (any energy)."""
+    r0_mag = np.sqrt(np.einsum('ij,ij->i', r0, r0))
+    v0_sq = np.einsum('ij,ij->i', v0, v0)
+    sigma0 = np.einsum('ij,ij->i', r0, v0) / np.sqrt(mu)
+
+    alpha = 2.0/r0_mag - v0_sq/mu     # 1/a: >0 ellipse, 0 parabola, <0 hyperbola
+    with np.errstate(divide='ignore', invalid='ignore'):
+        period = np.where(alpha > PARABOLIC_ALPHA,
+                          TWO_PI / np.sqrt(mu * np.abs(alpha)**3), np.inf)
+
+    # Semi-latus rectum, for the parabolic starting guess
+    h = np.cross(r0, v0)
+    p = np.einsum('ij,ij->i', h, h) / mu
+
+    return {'r0_mag': r0_mag, 'sigma0': sigma0, 'alpha': alpha,
+            'period': period, 'p': p, 'mu': mu}
+
+
+def _initial_chi(alpha: np.ndarray, r0: np.ndarray, sigma0: np.ndarray,
+                 p: np.ndarray, dt: np.ndarray, mu: float) -> np.ndarray:
+    """Starting guesses for chi, chosen per conic type (flat arrays)."""
+    sqrt_mu = np.sqrt(mu)
+
+    chi = np.empty_like(dt)
+    ell = alpha > PARABOLIC_ALPHA
+    hyp = alpha < -PARABOLIC_ALPHA
+    par = ~(ell | hyp)
+
+    # Ellipse: chi = sqrt(a)*dE exactly, so estimate dE with Markley's Kepler
+    # starter (e*cos E0 = 1 - r0/a, e*sin E0 = sigma0/sqrt(a)). Much closer
+    # than Vallado's chi ~ sqrt(mu)*dt/a, and it's what keeps the elliptic
+    # part of a mixed catalog down to one or two iterations.
+    if ell.any():
+        al = alpha[ell]
+        sqrt_al = np.sqrt(al)
+        e_cos = 1.0 - r0[ell]*al
+        e_sin = sigma0[ell]*sqrt_al
+        e = np.minimum(np.hypot(e_cos, e_sin), 1.0 - 1e-12)
+        E0 = np.arctan2(e_sin, e_cos)
+        dM = sqrt_mu * al * sqrt_al * dt[ell]
+        M = E0 - e_sin + dM
+        M = M - TWO_PI*np.rint(M / TWO_PI)
+        E = np.copysign(markley_starter(np.abs(M), e), M)
+        dE = E - E0
+        dE += TWO_PI * np.rint((dM - dE) / TWO_PI)
+        chi[ell] = dE / sqrt_al
+
+    # Hyperbola: Vallado's logarithmic guess
+    if hyp.any():
+        a = 1.0 / alpha[hyp]
+        t = dt[hyp]
+        s = np.where(t >= 0, 1.0, -1.0)
+        num = -2.0 * mu * alpha[hyp] * t
+        den = sigma0[hyp]*sqrt_mu + s*np.sqrt(-mu*a)*(1.0 - r0[hyp]*alpha[hyp])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            guess = s * np.sqrt(-a) * np.log(num / den)
+            # The log form is only meaningful once dt is large compared with the
+            # time scale near periapsis; otherwise fall back to chi ~ sqrt(mu)*dt/r0
+            # (at dt = 0 the guess is inf or NaN, and inf * 0 would warn)
+            usable = np.isfinite(guess) & (guess * t > 0)
+        chi[hyp] = np.where(usable, guess, sqrt_mu * t / r0[hyp])
+
+    # Parabola: Barker's equation via cot(2s) = 3 sqrt(mu/p^3) dt, tan^3(w) = tan(s)
+    if par.any():
+        pp = p[par]
+        s = 0.5 * np.arctan2(1.0, 3.0*np.sqrt(mu / pp**3)*dt[par])
+        w = np.arctan(np.cbrt(np.tan(s)))
+        chi[par] = np.sqrt(pp) * 2.0 / np.tan(2.0*w)
+
+    return chi
+
+
+def _solve_block(alpha: np.ndarray, r0: np.ndarray, sigma0: np.ndarray,
+                 p: np.ndarray, dt: np.ndarray, mu: float, tol: float,
+                 max_iter: int) -> Tuple[np.ndarray, ...]:
+    """
+    Laguerre-Conway iteration for one cache-sized block; returns
+    (chi, psi, c2, c3, r) and the number of elements that hadn't converged
+    after max_iter steps.
+    """
+    sqrt_mu = np.sqrt(mu)
+    chi = _initial_chi(alpha, r0, sigma0, p, dt, mu)
+    out = chi.copy()
+    active = np.arange(chi.size)
+    unconverged = 0
+    alpha_all, r0_all, sigma0_all = alpha, r0, sigma0
+
+    for _ in range(max_iter):
+        chi2 = chi*chi
+        psi = chi2 * alpha
+        c2, c3 = stumpff(psi)
+        one_psi_c3 = 1.0 - psi*c3
+        one_psi_c2 = 1.0 - psi*c2
+
+        # F(chi) = t(chi) - sqrt(mu)*dt, F' = r, F'' = dr/dchi
+        F = chi2*chi*c3 + sigma0*chi2*c2 + r0*chi*one_psi_c3 - sqrt_mu*dt
+        dF = chi2*c2 + sigma0*chi*one_psi_c3 + r0*one_psi_c2
+        d2F = sigma0*one_psi_c2 + (1.0 - r0*alpha)*chi*one_psi_c3
+
+        # Laguerre step with n = 5, sign of the root term matching F'
+        n = 5.0
+        root = np.sqrt(np.abs((n - 1.0)**2 * dF*dF - n*(n - 1.0)*F*d2F))
+        dchi = -n*F / (dF + np.copysign(root, dF))
+        chi = chi + dchi
+        out[active] = chi
+
+        done = np.abs(dchi) < tol * np.maximum(1.0, np.abs(chi))
+        if done.all():
+            break
+        keep = ~done
+        active = active[keep]
+        chi, alpha, r0, sigma0, dt = chi[keep], alpha[keep], r0[keep], sigma0[keep], dt[keep]
+    else:
+        unconverged = active.size
+
+    # Stumpff values and radius at the converged chi
+    chi2 = out*out
+    psi = chi2 * alpha_all
+    c2, c3 = stumpff(psi)
+    r = chi2*c2 + sigma0_all*out*(1.0 - psi*c3) + r0_all*(1.0 - psi*c2)
+    return (out, psi, c2, c3, r), unconverged
+
+
+def solve_universal(consts: dict, dt: np.ndarray, tol: float = 1e-9,
+                    max_iter: int = 30) -> Tuple[np.ndarray, ...]:
+    """
+    Solve the universal Kepler equation for every (object, epoch).
+
+    Uses the Laguerre-Conway iteration (degree 5) rather than plain Newton:
+    t(chi) grows exponentially on hyperbolas, and Newton from a low starting
+    guess can overshoot by orders of magnitude, while Laguerre converges from
+    practically anywhere at about the same cost per step. Elements that have
+    converged (|dchi| < tol * max(1, |chi|)) drop out of the active set, and
+    the grid is worked through in cache-sized blocks, same as `solve_kepler`.
+    Elements still moving after max_iter steps are returned as-is, with a
+    RuntimeWarning.
+
+    Parameters
+    ----------
+    consts : dict
+        Output of `universal_constants` for N objects
+    dt : np.ndarray
+        Time offsets, shape (N, T) [s]
+
+    Returns
+    -------
+    (chi, psi, c2, c3, r)
+        All of shape (N, T)
+    """
+    col = lambda x: np.broadcast_to(x[:, np.newaxis], dt.shape).ravel()
+    alpha, r0 = col(consts['alpha']), col(consts['r0_mag'])
+    sigma0, p = col(consts['sigma0']), col(consts['p'])
+    dt_flat = np.ascontiguousarray(dt).ravel()
+
+    results = np.empty((5, dt_flat.size))
+    unconverged = 0
+    for start in range(0, dt_flat.size, BLOCK_SIZE):
+        blk = slice(start, start + BLOCK_SIZE)
+        results[:, blk], count = _solve_block(alpha[blk], r0[blk], sigma0[blk], p[blk],
+                                              dt_flat[blk], consts['mu'], tol, max_iter)
+        unconverged += count
+    if unconverged:
+        warnings.warn(f"solve_universal: {unconverged} of {dt_flat.size} elements did not "
+                      f"converge in {max_iter} iterations", RuntimeWarning, stacklevel=2)
+    return tuple(x.reshape(dt.shape) for x in results)
+
+
+def universal_block(r0: np.ndarray, v0: np.ndarray, consts: dict,
+                    times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Universal-variable f and g propagation for one (objects x epochs) block.
+
+    Elliptic objects get their time offsets reduced modulo the period first,
+    so a week-long propagation costs the same as a single revolution. times
+    is shared by every object, shape (T,), or per object, (N, T).
+    """
+    period = consts['period'][:, np.newaxis]
+    times = times if times.ndim == 2 else times[np.newaxis, :]
+    dt = np.broadcast_to(times, (len(r0), times.shape[-1]))
+    dt = np.where(np.isfinite(period), np.fmod(dt, period), dt)
+
+    chi, psi, c2, c3, r_mag = solve_universal(consts, dt)
+    r0_mag = consts['r0_mag'][:, np.newaxis]
+    sqrt_mu = np.sqrt(consts['mu'])
+    chi2 = chi*chi
+
+    f = 1.0 - chi2/r0_mag * c2
+    g = dt - chi2*chi/sqrt_mu * c3
+    fdot = sqrt_mu/(r_mag*r0_mag) * chi * (psi*c3 - 1.0)
+    gdot = 1.0 - chi2/r_mag * c2
+
+    r = f[..., None] * r0[:, None, :] + g[..., None] * v0[:, None, :]
+    v = fdot[..., None] * r0[:, None, :] + gdot[..., None] * v0[:, None, :]
+    return r, v
@@ -0,0 +1,332 @@
+"""
+Ground-Station Visibility Windows
+SPCE 5025 - Fundamentals of Astronautics
+
+Access windows (rise and set times) between many satellites and many ground
+stations. Sampling elevation on a fine grid (say every second) and looking
+for sign changes is simple but spends nearly all of its time confirming
+that a satellite is still below the horizon. Here it's done in two passes:
+
+1. Coarse sweep. Propagate every satellite on a coarse time grid
+   (`DEFAULT_COARSE_STEP`), rotate to Earth-fixed, and compute the elevation
+   margin sin(el) - sin(mask) against every station at once. Rows where the
+   margin changes sign between two samples bracket a rise or a set.
+2. Refinement. Only the bracketed crossings are refined, all of them
+   together, with Illinois false position (a bisection-safe secant). Each
+   iteration propagates each active bracket to its own trial time with
+   `propagate_to`, and converged brackets drop out.
+
+The cost is the coarse sweep (objects x stations x T/step) plus a handful of
+two-body evaluations per crossing, instead of objects x stations x T/1 s.
+
+A pass shorter than the coarse step can fall between two samples and be
+missed — for LEO above a 10 deg mask the shortest useful passes are a few
+minutes, so 60 s is a safe default; drop it for low masks or grazing passes.
+"""
+
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence, Tuple
+
+from ground_track import J2000_JD, earth_rotation_angle, eci_to_ecef, geodetic_to_ecef
+from propagation import CHUNK_EPOCHS, propagate_chunks, propagate_to
+
+MU_EARTH = 3.986004418e14  # m^3/s^2
+
+DEFAULT_COARSE_STEP = 60.0   # [s]
+DEFAULT_TOLERANCE = 1e-3     # rise/set time accuracy [s]
+MAX_REFINE_ITERATIONS = 60
+
+# Satellites per sweep block. The margin block is (objects, epochs, stations),
+# so with dozens of stations this is kept well below propagate's default.
+CHUNK_OBJECTS = 64
+
+
+# ============================================================================
+# STATIONS AND WINDOWS
+# ============================================================================
+
+@dataclass
+class GroundStations:
+    """Station locations (WGS84) and elevation masks, one entry per station."""
+    lat_deg: np.ndarray
+    lon_deg: np.ndarray
+    alt_m: np.ndarray = 0.0
+    min_elevation_deg: np.ndarray = 0.0
+    names: Optional[Sequence[str]] = None
+
+    def __post_init__(self):
+        self.lat_deg, self.lon_deg, self.alt_m, self.min_elevation_deg = (
+            np.array(x, dtype=np.float64) for x in np.broadcast_arrays(
+                np.atleast_1d(self.lat_deg), self.lon_deg, self.alt_m,
+                self.min_elevation_deg))
+        self.position, self.up = geodetic_to_ecef(np.radians(self.lat_deg),
+                                                  np.radians(self.lon_deg), self.alt_m)
+        self.sin_mask = np.sin(np.radians(self.min_elevation_deg))
+
+    def __len__(self) -> int:
+        return len(self.lat_deg)
+
+
+@dataclass
+class AccessWindows:
+    """
+    Visibility windows as parallel arrays, sorted by (satellite, station, rise).
+
+    Times are seconds from the search's reference epoch. A window that is
+    already open at the start of the search has rise = start, and one
+    still open at the end has set = stop.
+    """
+    satellite: np.ndarray   # row in the r0/v0 arrays
+    station: np.ndarray     # index into the GroundStations
+    rise: np.ndarray        # [s]
+    set: np.ndarray         # [s]
+    stats: dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.satellite)
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.set - self.rise
+
+    def select(self, mask: np.ndarray) -> 'AccessWindows':
+        return AccessWindows(self.satellite[mask], self.station[mask],
+                             self.rise[mask], self.set[mask], self.stats)
+
+    def for_station(self, station: int) -> 'AccessWindows':
+        return self.select(self.station == station)
+
+    def for_satellite(self, satellite: int) -> 'AccessWindows':
+        return self.select(self.satellite == satellite)
+
+
+# ============================================================================
+# ELEVATION
+# ============================================================================
+
+def elevation_margin(r_ecef: np.ndarray, stations: GroundStations) -> np.ndarray:
+    """
+    sin(elevation) - sin(mask) of ECEF positions seen from every station.
+
+    Positions of shape (..., 3) give margins of shape (..., S). The range
+    vector is never formed: r.up, r.station and |r|^2 are enough, so the
+    work is two small matrix products.
+    """
+    pos, up = stations.position, stations.up
+    r_up = r_ecef @ up.T
+    r_pos = r_ecef @ pos.T
+    r2 = np.einsum('...i,...i->...', r_ecef, r_ecef)[..., None]
+    range2 = r2 - 2.0*r_pos + np.einsum('ij,ij->i', pos, pos)
+    return (r_up - np.einsum('ij,ij->i', pos, up)) / np.sqrt(range2) - stations.sin_mask
+
+
+def _pair_margin(r_ecef: np.ndarray, stations: GroundStations,
+                 station: np.ndarray) -> np.ndarray:
+    """Elevation margin of row i of r_ecef from station[i] only, shape (M,)."""
+    rho = r_ecef - stations.position[station]
+    sin_el = np.einsum('ij,ij->i', rho, stations.up[station]) / \
+        np.sqrt(np.einsum('ij,ij->i', rho, rho))
+    return sin_el - stations.sin_mask[station]
+
+
+# ============================================================================
+# COARSE SWEEP
+# ============================================================================
+
+def _coarse_sweep(r0, v0, stations, times, theta, mu, chunk_objects, chunk_epochs, method):
+    """
+    Bracket every sign change of the elevation margin on the coarse grid.
+
+    Returns the brackets (satellite, station, t_a, t_b, f_a, f_b, kind) with
+    kind +1 for a rise and -1 for a set, and the windows open at either end
+    of the grid as (satellite, station, time, kind) "edge" events.
+    """
+    # Empty leading entries keep an empty catalog from breaking the concatenates
+    none, empty = np.empty(0, dtype=np.intp), np.empty(0)
+    brackets = [(none, none, empty, empty, empty, empty, empty)]
+    edges = [(none, none, empty, empty)]
+    carry = None
+    for objs, epochs, r, _ in propagate_chunks(r0, v0, times, mu, chunk_objects,
+                                               chunk_epochs, method):
+        margin = elevation_margin(eci_to_ecef(r, theta[epochs]), stations)  # (n, T, S)
+        first = epochs.start
+        if epochs.start == 0:
+            sat, st = np.nonzero(margin[:, 0, :] > 0)
+            edges.append((objs.start + sat, st, np.full(len(sat), times[0]), np.ones(len(sat))))
+        else:
+            # The previous block's last column closes the gap between blocks
+            margin = np.concatenate([carry[:, None, :], margin], axis=1)
+            first -= 1
+
+        visible = margin > 0
+        for kind, crossing in ((1, ~visible[:, :-1] & visible[:, 1:]),
+                               (-1, visible[:, :-1] & ~visible[:, 1:])):
+            i, j, k = np.nonzero(crossing)
+            brackets.append((objs.start + i, k, times[first + j], times[first + j + 1],
+                             margin[i, j, k], margin[i, j + 1, k], np.full(len(i), kind)))
+
+        if epochs.stop == len(times):
+            sat, st = np.nonzero(visible[:, -1, :])
+            edges.append((objs.start + sat, st, np.full(len(sat), times[-1]), -np.ones(len(sat))))
+        carry = margin[:, -1, :]
+
+    brackets = tuple(np.concatenate(column) for column in zip(*brackets))
+    edges = tuple(np.concatenate(column) for column in zip(*edges))
+    return brackets, edges
+
+
+# ============================================================================
+# ROOT REFINEMENT
+# ============================================================================
+
+def bracketed_roots(func: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                    t_a: np.ndarray, t_b: np.ndarray, f_a: np.ndarray, f_b: np.ndarray,
+                    tolerance: float = DEFAULT_TOLERANCE,
+                    max_iterations: int = MAX_REFINE_ITERATIONS) -> Tuple[np.ndarray, int]:
+    """
+    Roots of many scalar functions at once, each inside its own sign-change bracket.
+
+    Illinois false position: each step tries the secant point, keeps the
+    sub-interval with the sign change, and halves the stale end's value when
+    the same end survives twice (which is what stops plain false position
+    from stalling on a curved function). Brackets leave the active set once
+    narrower than `tolerance`, so the work tracks the slowest few.
+
+    Parameters
+    ----------
+    func : callable
+        func(rows, t) evaluates the functions numbered `rows` at times t
+        (both shape (M,)) and returns shape (M,)
+    t_a, t_b : np.ndarray
+        Bracket ends, shape (K,)
+    f_a, f_b : np.ndarray
+        Function values there, of opposite signs
+
+    Returns
+    -------
+    (roots, evaluations)
+        Roots of shape (K,), and the total number of function evaluations
+    """
+    a, b = np.array(t_a, dtype=np.float64), np.array(t_b, dtype=np.float64)
+    fa, fb = np.array(f_a, dtype=np.float64), np.array(f_b, dtype=np.float64)
+    side = np.zeros(len(a), dtype=np.int8)   # which end was kept last time
+    active = np.flatnonzero(np.abs(b - a) > tolerance)
+    evaluations = 0
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        A, B, FA, FB = a[active], b[active], fa[active], fb[active]
+        t = (A*FB - B*FA) / (FB - FA)
+        # Guard against round-off pushing the secant point out of the bracket
+        t = np.where((t > np.minimum(A, B)) & (t < np.maximum(A, B)), t, 0.5*(A + B))
+        ft = func(active, t)
+        evaluations += active.size
+
+        # The sign change is in [t, b] if f(t) and f(a) agree, else in [a, t]
+        same = np.sign(ft) == np.sign(FA)
+        stale = np.where(same, side[active] == 1, side[active] == -1)
+        a[active] = np.where(same, t, A)
+        fa[active] = np.where(same, ft, np.where(stale, 0.5*FA, FA))
+        b[active] = np.where(same, B, t)
+        fb[active] = np.where(same, np.where(stale, 0.5*FB, FB), ft)
+        side[active] = np.where(same, 1, -1)
+
+        exact = ft == 0
+        a[active[exact]] = b[active[exact]] = t[exact]
+        active = active[np.abs(b[active] - a[active]) > tolerance]
+
+    return 0.5*(a + b), evaluations
+
+
+def refine_crossings(r0: np.ndarray, v0: np.ndarray, stations: GroundStations,
+                     satellite: np.ndarray, station: np.ndarray,
+                     t_a: np.ndarray, t_b: np.ndarray, f_a: np.ndarray, f_b: np.ndarray,
+                     jd_ut1: float = J2000_JD, mu: float = MU_EARTH,
+                     tolerance: float = DEFAULT_TOLERANCE, method: str = 'kepler'
+                     ) -> Tuple[np.ndarray, int]:
+    """
+    Horizon-crossing times inside brackets [t_a, t_b] where the margin changes sign.
+
+    Each evaluation propagates the bracket's satellite to its own trial time
+    with `propagate_to`. Returns (times, propagations).
+    """
+    def margin(rows, t):
+        sat = satellite[rows]
+        r, _ = propagate_to(r0[sat], v0[sat], t, mu, method)
+        return _pair_margin(eci_to_ecef(r, earth_rotation_angle(jd_ut1, t)),
+                            stations, station[rows])
+
+    return bracketed_roots(margin, t_a, t_b, f_a, f_b, tolerance)
+
+
+# ============================================================================
+# WINDOW SEARCH
+# ============================================================================
+
+def find_access_windows(r0: np.ndarray, v0: np.ndarray, stations: GroundStations,
+                        start: float, stop: float, jd_ut1: float = J2000_JD,
+                        mu: float = MU_EARTH, coarse_step: float = DEFAULT_COARSE_STEP,
+                        tolerance: float = DEFAULT_TOLERANCE, method: str = 'kepler',
+                        chunk_objects: int = CHUNK_OBJECTS,
+                        chunk_epochs: int = CHUNK_EPOCHS) -> AccessWindows:
+    """
+    All visibility windows between N satellites and S stations in [start, stop].
+
+    Parameters
+    ----------
+    r0, v0 : np.ndarray
+        ECI states at the reference epoch, shape (N, 3) [m, m/s]
+    stations : GroundStations
+        Where the stations are and their elevation masks
+    start, stop : float
+        Search interval, as offsets from the reference epoch [s]
+    jd_ut1 : float
+        Julian date (UT1) of the reference epoch
+    mu : float
+        Gravitational parameter [m^3/s^2]
+    coarse_step : float
+        Sweep step [s]; passes shorter than this can be missed
+    tolerance : float
+        Rise/set time accuracy [s]
+    method : str
+        'kepler' or 'universal' (see `propagation`)
+    chunk_objects, chunk_epochs : int
+        Sweep block size
+
+    Returns
+    -------
+    AccessWindows
+        Windows plus `stats` (crossings refined, propagations spent)
+    """
+    if not stop > start:
+        raise ValueError(f"stop ({stop!r}) must be after start ({start!r})")
+    if not coarse_step > 0:
+        raise ValueError(f"coarse_step must be positive, got {coarse_step!r}")
+    r0 = np.atleast_2d(np.asarray(r0, dtype=np.float64))
+    v0 = np.atleast_2d(np.asarray(v0, dtype=np.float64))
+    times = np.arange(start, stop, coarse_step, dtype=np.float64)
+    if times[-1] < stop:
+        times = np.append(times, stop)
+    theta = earth_rotation_angle(jd_ut1, times)
+
+    (sat, st, t_a, t_b, f_a, f_b, kind), (edge_sat, edge_st, edge_t, edge_kind) = \
+        _coarse_sweep(r0, v0, stations, times, theta, mu, chunk_objects, chunk_epochs, method)
+    crossing_t, evaluations = refine_crossings(r0, v0, stations, sat, st, t_a, t_b, f_a, f_b,
+                                               jd_ut1, mu, tolerance, method)
+
+    # Every (satellite, station) now has alternating rise/set events, so
+    # after sorting, rises and sets are simply the even and odd entries
+    sat = np.concatenate([sat, edge_sat])
+    st = np.concatenate([st, edge_st])
+    t = np.concatenate([crossing_t, edge_t])
+    kind = np.concatenate([kind, edge_kind])
+    order = np.lexsort((-kind, t, st, sat))
+    sat, st, t = sat[order], st[order], t[order]
+
+    return AccessWindows(
+        satellite=sat[0::2].astype(np.int32), station=st[0::2].astype(np.int32),
+        rise=t[0::2], set=t[1::2],
+        stats={'samples': len(r0) * len(times) * len(stations),
+               'crossings': len(crossing_t), 'refine_propagations': evaluations})